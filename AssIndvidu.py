@@ -1,5 +1,7 @@
 import streamlit as st
 
+import crime_lazy  # noqa: F401  (starts the import profiler's clock on the first run)
+
 st.set_page_config(page_title="Crime Analytics Dashboard")
 
 # Import pages
@@ -3,12 +3,32 @@
 # Enhanced Version — by Nurul Ain Maisarah Hamidin (2025)
 # =========================================================
 
+import os
+
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
+
+from crime_backend import get_backend, melt_profile
+from crime_charts import PAYLOAD_ENCODING, adaptive_scatter, point_details
+from crime_data import dataset_digest, derived_path, load_crime_data, read_snapshot, shared_matrix, stream_summary
+from crime_figures import figure_cache, figure_key
+from crime_index import cross_filter, filter_index, intersect, take
+from crime_lazy import lazy_import, mark_first_paint
+from crime_models import (
+    CLUSTER_ENGINES, DEFAULT_K_RANGE, DEFAULT_N_INIT, PCA_ENGINES, array_chunks, array_digest,
+    default_engine, elbow_sweep, fit_clusters, fit_pca, pca_diagnostics, write_projection,
+)
+from crime_perf import PagePerf
+from crime_pipeline import load_artifact
+from crime_progress import BackgroundRun, checkpoint, publish
+from crime_selection import SELECTION_METHODS, KSelection, select_k
+
+# Heavy libraries load on first use, after the page header has rendered.
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objects")
+plotly_subplots = lazy_import("plotly.subplots")
+sklearn_preprocessing = lazy_import("sklearn.preprocessing")
 
 # ---------------------------------------------------------
 # PAGE SETTINGS
@@ -18,6 +38,7 @@ st.set_page_config(
     page_icon="📊",
     layout="wide"
 )
+perf = PagePerf("Objectives1")
 
 # Sidebar
 with st.sidebar:
@@ -38,13 +59,21 @@ st.markdown("""
 The objective of this visualization is to identify **patterns in urban crime** by grouping similar crime profiles.  
 This helps reveal hidden patterns across regions and demographics — guiding urban safety strategies.
 """)
+mark_first_paint()
 
 # ---------------------------------------------------------
 # LOAD DATA
 # ---------------------------------------------------------
-url = "https://raw.githubusercontent.com/s22a0064-AinMaisarah/Crime/refs/heads/main/df_crime_cleaned.csv"
-df = pd.read_csv(url)
+features = ['violent_crime', 'property_crime', 'whitecollar_crime', 'social_crime']
+with perf.section("load"):
+    df = load_crime_data(columns=features + ['city_cat', 'state'])
+    summary = stream_summary()
 st.success("✅ Dataset Loaded Successfully")
+if summary is not None:
+    st.info(summary.caption(len(df)))
+# Clusters and PCA are fitted on every row; the cross-filter narrows what the charts show.
+with perf.section("filter_index"):
+    rows, where = cross_filter(filter_index())
 
 # ---------------------------------------------------------
 # ABOUT DATASET
@@ -67,9 +96,24 @@ st.dataframe(df.head(), use_container_width=True)
 # ---------------------------------------------------------
 # DATA PREPROCESSING
 # ---------------------------------------------------------
-features = ['violent_crime', 'property_crime', 'whitecollar_crime', 'social_crime']
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(df[features])
+# Fitted models and derived columns are cached per dataset digest (and engine),
+# so widget changes elsewhere on the page reuse them instead of refitting.
+data_key = dataset_digest()
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def scale_features(data_key, _df, _scaler=None):
+    # A streamed dataset brings a scaler fitted on every row, not just the sample.
+    # The matrix is published once per host and mapped read-only by every session.
+    def compute():
+        scaler = _scaler or sklearn_preprocessing.StandardScaler().fit(_df[features])
+        return scaler.transform(_df[features])
+
+    return shared_matrix(data_key, f"scaled.{'stream' if _scaler is not None else 'fit'}", compute)
+
+
+with perf.section("scale"):
+    X_scaled = scale_features(data_key, df, summary.scaler if summary is not None else None)
 
 # ---------------------------------------------------------
 # KPI METRICS
@@ -77,59 +121,307 @@ X_scaled = scaler.fit_transform(df[features])
 st.markdown("### 📊 Key Dataset Metrics")
 col1, col2, col3, col4 = st.columns(4)
 col1.metric("Crime Features Used", "4", help="Violent, Property, White-Collar, Social")
-col2.metric("Optimal Clusters (k)", "3", help="Determined using elbow method")
+# col2 shows the selected k once the background selection below has finished.
+k_metric = col2.empty()
+k_metric.metric("Optimal Clusters (k)", "…", help="Estimating elbow, silhouette and gap statistic")
 col3.metric("PCA Components", "2", help="Dimensionality reduction")
-col4.metric("Total Records", f"{df.shape[0]}", help="Total cities/locations")
+col4.metric("Total Records", f"{summary.n_rows if summary is not None else df.shape[0]}", help="Total cities/locations")
 st.markdown("---")
 
+# Chosen here, on the script thread: it imports the backend's library before any task runs.
+backend = get_backend()
+# Model fits run in the background; their sections fill in once the text below has rendered.
+bg = BackgroundRun(perf)
+# Background tasks read this copy, since the script thread adds columns to ``df``.
+feature_frame = df[features]
+
 # ---------------------------------------------------------
 # 1️⃣ ELBOW METHOD — OPTIMAL K
 # ---------------------------------------------------------
 st.header("1️⃣ Elbow Method — Optimal Clusters")
-wcss = []
-for k in range(2, 10):
-    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-    kmeans.fit(X_scaled)
-    wcss.append(kmeans.inertia_)
-
-fig_elbow = px.line(
-    x=range(2, 10),
-    y=wcss,
-    markers=True,
-    title="📈 Elbow Curve for Optimal k",
-    labels={"x": "Number of Clusters (k)", "y": "WCSS (Within-Cluster Sum of Squares)"},
-    color_discrete_sequence=['#0077b6']
-)
-fig_elbow.update_traces(mode="lines+markers", marker=dict(size=8))
-st.plotly_chart(fig_elbow, use_container_width=True)
-st.info("✅ *k = 3 chosen as optimal — indicating three distinct urban crime pattern groups.*")
+with st.expander("⚙️ Elbow Settings"):
+    k_min, k_max = st.slider("k range", min_value=2, max_value=15, value=(2, 9))
+    selection_method = st.radio(
+        "Sample used to choose k", options=list(SELECTION_METHODS), format_func=SELECTION_METHODS.get,
+        horizontal=True, help="Elbow, silhouette and gap statistic are estimated on bounded samples of the data",
+    )
+    exact_sweep = st.checkbox("Also run the exact elbow sweep on every row", value=False,
+                              help="Fits every k on the full data; slow on large datasets")
+    n_init = st.number_input("K-Means initialisations (n_init)", min_value=1, max_value=50, value=10,
+                             disabled=not exact_sweep)
+    show_silhouette = st.checkbox("Compute silhouette scores", value=False, disabled=not exact_sweep)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def choose_k(data_key, k_range, method, _X_scaled, _strata):
+    """``KSelection`` for the k range; the pipeline's artifact covers the default settings."""
+    k_range = range(k_range[0], k_range[1] + 1)
+    if k_range == DEFAULT_K_RANGE and method == "coreset":
+        scores, meta = load_artifact("k_selection")
+        if scores is not None:
+            return KSelection(scores=scores, **{name: meta[name] for name in KSelection._fields if name != "scores"})
+    return select_k(_X_scaled, k_range, method, strata=_strata)
+
+
+def selection_figure(selection):
+    scores = selection.scores
+    fig = plotly_subplots.make_subplots(
+        rows=1, cols=3, subplot_titles=("WCSS (elbow)", "Silhouette", "Gap statistic")
+    )
+    for col, (name, color) in enumerate([('wcss', '#0077b6'), ('silhouette', '#2a9d8f'), ('gap', '#e76f51')], 1):
+        fig.add_trace(go.Scatter(
+            x=scores['k'], y=scores[name], error_y=dict(type="data", array=scores[f'{name}_se']),
+            mode="lines+markers", marker=dict(size=8, color=color), line=dict(color=color),
+            name=name, showlegend=False,
+        ), row=1, col=col)
+        fig.add_vline(x=selection.k, line_dash="dash", line_color="grey", row=1, col=col)
+    fig.update_xaxes(title_text="Number of Clusters (k)", dtick=1)
+    fig.update_layout(title=f"📈 Estimated Elbow, Silhouette and Gap — k = {selection.k} chosen")
+    return fig
+
+
+def describe_selection(selection):
+    k_metric.metric("Optimal Clusters (k)", int(selection.k),
+                    help="Most criteria agree on it: elbow, silhouette and gap statistic")
+    st.caption(
+        f"🎯 {SELECTION_METHODS[selection.method]} of {selection.sample_size:,} rows, {selection.replicates} "
+        f"replicate(s), {selection.seconds:.2f}s — elbow k = {selection.picks['elbow']}, silhouette k = "
+        f"{selection.picks['silhouette']}, gap k = {selection.picks['gap']}. Error bars are ±1 standard error."
+    )
+
+
+selection_task = bg.submit("k_selection", choose_k, data_key, (k_min, k_max), selection_method, X_scaled,
+                           df['city_cat'])
+selection_key = figure_key("k_selection", data_key, k_range=(k_min, k_max), method=selection_method)
+bg.chart("k_selection", selection_key, selection_figure, "Estimating elbow, silhouette and gap statistic",
+         deps=(selection_task,), use_container_width=True)
+bg.render(selection_task, describe_selection, "Choosing k")
+
+
+def elbow_figure(points, title="📈 Elbow Curve for Optimal k"):
+    ks = sorted(points)
+    fig_elbow = px.line(
+        x=ks,
+        y=[points[i][0] for i in ks],
+        markers=True,
+        title=title,
+        labels={"x": "Number of Clusters (k)", "y": "WCSS (Within-Cluster Sum of Squares)"},
+        color_discrete_sequence=['#0077b6']
+    )
+    fig_elbow.update_traces(mode="lines+markers", marker=dict(size=8))
+    fig_elbow.update_xaxes(range=[k_min - 0.5, k_max + 0.5])
+    return fig_elbow
+
+
+def artifact_points(default_sweep):
+    elbow_artifact, _ = load_artifact("elbow") if default_sweep else (None, None)
+    if elbow_artifact is None:
+        return None
+    return {int(k): (wcss, None) for k, wcss in zip(elbow_artifact['k'], elbow_artifact['wcss'])}
+
+
+def sweep_points(default_sweep):
+    """Every k's (WCSS, silhouette); a cancelled run stops between fits.
+
+    The points fitted so far are published after each k, so the charts grow
+    while the sweep runs.
+    """
+    points = artifact_points(default_sweep)
+    if points is None:
+        points = {}
+        for k, inertia, silhouette in elbow_sweep(X_scaled, range(k_min, k_max + 1), int(n_init), show_silhouette):
+            checkpoint()
+            points[k] = (inertia, silhouette)
+            publish(dict(points))
+    return points
+
+
+def partial_chart(figure, title):
+    # Titled with the progress, so it is never the same element as the final chart.
+    def preview(points):
+        st.plotly_chart(figure(points, f"{title} — {len(points)} of {k_max - k_min + 1} k fitted"), width="stretch")
+    return preview
+
+
+def silhouette_figure(points, title="📐 Silhouette Score by k"):
+    ks = sorted(points)
+    fig_silhouette = px.line(
+        x=ks,
+        y=[points[i][1] for i in ks],
+        markers=True,
+        title=title,
+        labels={"x": "Number of Clusters (k)", "y": "Silhouette Score"},
+        color_discrete_sequence=['#2a9d8f']
+    )
+    return fig_silhouette
+
+
+if exact_sweep:
+    elbow_params = {"k_range": (k_min, k_max), "n_init": int(n_init)}
+    elbow_key = figure_key("elbow", data_key, **elbow_params)
+    silhouette_key = figure_key("silhouette", data_key, **elbow_params)
+    default_sweep = (
+        (k_min, k_max + 1) == (DEFAULT_K_RANGE.start, DEFAULT_K_RANGE.stop)
+        and n_init == DEFAULT_N_INIT and not show_silhouette
+    )
+
+    def exact_sweep_points():
+        if figure_cache.get(elbow_key) is not None and (not show_silhouette or figure_cache.get(silhouette_key)):
+            return None  # both curves are cached: no sweep and no figure to build
+        return sweep_points(default_sweep)
+
+    # The sweep fits every k on every row in the background; each curve grows as a k finishes
+    # and is replaced by the cached chart of the full result.
+    sweep_task = bg.submit("elbow", exact_sweep_points)
+    bg.chart("elbow", elbow_key, lambda points: elbow_figure(points or sweep_points(default_sweep)),
+             "Running the exact elbow sweep", deps=(sweep_task,),
+             preview=partial_chart(elbow_figure, "📈 Elbow Curve"), use_container_width=True)
+    if show_silhouette:
+        bg.chart("silhouette", silhouette_key, lambda points: silhouette_figure(points or sweep_points(default_sweep)),
+                 "Scoring silhouettes for every k", deps=(sweep_task,),
+                 preview=partial_chart(silhouette_figure, "📐 Silhouette Score"), use_container_width=True)
+
+bg.render(selection_task,
+          lambda selection: st.info(f"✅ *k = {selection.k} chosen as optimal — indicating {selection.k} "
+                                    f"distinct urban crime pattern groups.*"),
+          "Choosing k")
 
 # ---------------------------------------------------------
 # 2️⃣ PCA CLUSTER VISUALIZATION
 # ---------------------------------------------------------
 st.header("2️⃣ PCA Cluster Visualization")
-pca = PCA(n_components=2)
-pca_data = pca.fit_transform(X_scaled)
-df['PC1'], df['PC2'] = pca_data[:, 0], pca_data[:, 1]
-
-kmeans = KMeans(n_clusters=3, random_state=42, n_init=10)
-df['crime_cluster'] = kmeans.fit_predict(X_scaled)
-
-# Interactive filter
-selected_cluster = st.selectbox("🔍 Filter by Cluster:", options=["All"] + list(map(str, sorted(df['crime_cluster'].unique()))))
-filtered_df = df if selected_cluster == "All" else df[df['crime_cluster'] == int(selected_cluster)]
-
-fig_pca = px.scatter(
-    filtered_df,
-    x='PC1',
-    y='PC2',
-    color='crime_cluster',
-    hover_data=['city_cat', 'state'] + features,
-    title="🌐 PCA Scatter Plot — Crime Clusters",
-    color_continuous_scale='Viridis'
+with st.expander("⚙️ PCA Engine"):
+    pca_engine = st.radio("PCA engine", options=list(PCA_ENGINES), format_func=PCA_ENGINES.get,
+                          help="Auto picks an engine from the row count and available memory")
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def project_pca(data_key, pca_engine, _X_scaled):
+    """PC1/PC2 for every row and the engine diagnostics."""
+    pca_artifact, pca_check = load_artifact("pca") if pca_engine == "auto" else (None, None)
+    if pca_artifact is not None and len(pca_artifact) == len(_X_scaled):
+        return pca_artifact[['PC1', 'PC2']].to_numpy(), pca_check
+    scaled_source = array_chunks(_X_scaled)
+    pca_fit = fit_pca(scaled_source, n_rows=len(_X_scaled), n_features=len(features), engine=pca_engine)
+    projection_path = derived_path(array_digest(_X_scaled), f"pca-{pca_fit.engine}")
+    try:
+        if not os.path.exists(projection_path):
+            write_projection(scaled_source, pca_fit.model, projection_path)
+        pcs = read_snapshot(projection_path).to_numpy()
+    except OSError:
+        # Read-only snapshot store: project in memory instead.
+        pcs = pca_fit.model.transform(_X_scaled)
+    pca_check = pca_diagnostics(pca_fit, scaled_source)
+    pca_check["fit_seconds"] = pca_fit.fit_seconds
+    return pcs, pca_check
+
+
+def describe_pca(projection):
+    pcs, pca_check = projection
+    df[['PC1', 'PC2']] = pcs
+    st.caption(
+        f"🧮 {PCA_ENGINES[pca_check['engine']]} — explained variance "
+        f"{', '.join(f'{v:.1%}' for v in pca_check['explained_variance_ratio'])} "
+        f"(max error vs exact PCA {pca_check['max_abs_error']:.2e}), fit time {pca_check['fit_seconds']:.2f}s"
+    )
+
+
+pca_task = bg.submit("pca", project_pca, data_key, pca_engine, X_scaled)
+bg.render(pca_task, describe_pca, "Projecting onto the principal components")
+
+with st.expander("⚙️ Clustering Engine"):
+    engine_keys = list(CLUSTER_ENGINES)
+    engine = st.radio(
+        "K-Means engine",
+        options=engine_keys,
+        index=engine_keys.index(default_engine(len(df))),
+        format_func=CLUSTER_ENGINES.get,
+        help="Mini-batch streams over chunks and keeps memory bounded on very large datasets",
+    )
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def assign_clusters(data_key, engine, n_clusters, _df):
+    """Cluster labels, fit metadata, row positions per cluster and whether the labels came from the pipeline."""
+    cluster_artifact, cluster_meta = load_artifact("clusters")
+    from_artifact = (
+        cluster_artifact is not None and cluster_meta["engine"] == engine
+        and cluster_meta.get("n_clusters") == n_clusters and len(cluster_artifact) == len(_df)
+    )
+    if from_artifact:
+        labels = cluster_artifact['crime_cluster'].to_numpy()
+    else:
+        cluster_fit = fit_clusters(array_chunks(_df[features].to_numpy()), n_clusters=n_clusters, engine=engine)
+        labels = cluster_fit.labels
+        cluster_meta = {"engine": cluster_fit.engine, "inertia": cluster_fit.inertia, "fit_seconds": cluster_fit.fit_seconds}
+    members = {int(c): np.flatnonzero(labels == c) for c in np.unique(labels)}
+    return labels, cluster_meta, members, from_artifact
+
+
+def describe_clusters(clusters):
+    labels, cluster_meta, _, _ = clusters
+    df['crime_cluster'] = pd.Categorical(labels)
+    st.caption(
+        f"⏱️ {CLUSTER_ENGINES[cluster_meta['engine']]} — fit time {cluster_meta['fit_seconds']:.2f}s, "
+        f"inertia {cluster_meta['inertia']:,.1f}"
+    )
+
+
+# K-Means starts as soon as k is chosen, alongside the PCA projection.
+kmeans_task = bg.submit(
+    "kmeans", lambda selection: assign_clusters(data_key, engine, int(selection.k), feature_frame), selection_task
 )
-fig_pca.update_traces(marker=dict(size=10, line=dict(width=1, color='DarkSlateGrey')))
-st.plotly_chart(fig_pca, use_container_width=True)
+bg.render(kmeans_task, describe_clusters, "Fitting K-Means")
+
+
+PCA_HOVER = ['city_cat', 'state'] + features
+
+
+def pca_figure(view, members, rows, selected_cluster):
+    with perf.section("filter"):
+        cluster_rows = None if selected_cluster == "All" else members[int(selected_cluster)]
+        filtered_df = take(view, intersect(rows, cluster_rows))
+
+    fig_pca, _ = adaptive_scatter(
+        filtered_df,
+        x='PC1',
+        y='PC2',
+        mode="auto",
+        color='crime_cluster',
+        hover_data=PCA_HOVER,
+        title="🌐 PCA Scatter Plot — Crime Clusters",
+        color_discrete_sequence=px.colors.qualitative.Set2
+    )
+    fig_pca.update_traces(marker=dict(size=10, line=dict(width=1, color='DarkSlateGrey')))
+    return fig_pca
+
+
+@st.fragment
+def cluster_explorer(view, members, rows, figure_params):
+    """Cluster filter and PCA scatter; changing the filter reruns only this block."""
+    selected_cluster = st.selectbox("🔍 Filter by Cluster:", options=["All"] + list(map(str, members)))
+    key = figure_key("pca_scatter", data_key, cluster=selected_cluster, **figure_params)
+    if PAYLOAD_ENCODING != "compact":
+        perf.cached_chart("pca_scatter", key, lambda: pca_figure(view, members, rows, selected_cluster),
+                          use_container_width=True)
+        return
+    # Compact payloads carry row ids only; hover fields load for the selected points.
+    event = perf.cached_chart("pca_scatter", key, lambda: pca_figure(view, members, rows, selected_cluster),
+                              use_container_width=True, key="pca_scatter_select", on_select="rerun")
+    details = point_details(view, event, PCA_HOVER + ['PC1', 'PC2'])
+    if len(details):
+        st.dataframe(details, use_container_width=True)
+    else:
+        st.caption("Click or lasso points to see their details.")
+
+
+# Figures depend on the dataset, the engines, the k selection settings (which determine k) and the cross-filter.
+figure_params = {"pca_engine": pca_engine, "engine": engine, "k_range": (k_min, k_max),
+                 "selection_method": selection_method, "where": where}
+
+# Interactive filter; ``describe_pca`` and ``describe_clusters`` have added PC1/PC2 and the labels to ``df`` by then.
+bg.render([pca_task, kmeans_task], lambda _, clusters: cluster_explorer(df, clusters[2], rows, figure_params),
+          "Drawing the PCA scatter plot")
 
 st.info("📌 *PCA shows clear separation between high, medium & low crime regions.*")
 
@@ -137,22 +429,34 @@ st.info("📌 *PCA shows clear separation between high, medium & low crime regio
 # 3️⃣ CRIME TYPE PROFILE BY CLUSTER
 # ---------------------------------------------------------
 st.header("3️⃣ Crime Type Profile by Cluster")
-cluster_profile = df.groupby('crime_cluster')[features].mean().reset_index()
-cluster_profile = cluster_profile.melt(id_vars='crime_cluster', var_name='Crime Type', value_name='Average Crime Score')
-
-fig_bar = px.bar(
-    cluster_profile,
-    x='Crime Type',
-    y='Average Crime Score',
-    color='crime_cluster',
-    barmode='group',
-    title="🔎 Average Crime Scores by Cluster",
-    color_discrete_sequence=px.colors.qualitative.Set2
-)
-fig_bar.update_layout(xaxis_title="Crime Category", yaxis_title="Average Normalized Score")
-st.plotly_chart(fig_bar, use_container_width=True)
 
-st.success("🎉 Visualizations Generated Successfully!")
+
+def cluster_bar_figure(clusters):
+    labels, _, _, from_artifact = clusters
+    with perf.section("aggregation"):
+        cluster_profile, _ = load_artifact("cluster_profile") if from_artifact and rows is None else (None, None)
+        if cluster_profile is None:
+            frame = backend.from_frame(take(feature_frame.assign(crime_cluster=pd.Categorical(labels)), rows))
+            profiles = backend.group_means(frame, features, ['crime_cluster'])
+            cluster_profile = melt_profile(profiles['crime_cluster'], 'crime_cluster')
+
+    fig_bar = px.bar(
+        cluster_profile,
+        x='Crime Type',
+        y='Average Crime Score',
+        color='crime_cluster',
+        barmode='group',
+        title="🔎 Average Crime Scores by Cluster",
+        color_discrete_sequence=px.colors.qualitative.Set2
+    )
+    fig_bar.update_layout(xaxis_title="Crime Category", yaxis_title="Average Normalized Score")
+    return fig_bar
+
+
+bg.chart("cluster_bar", figure_key("cluster_bar", data_key, **figure_params), cluster_bar_figure,
+         "Averaging crime scores by cluster", deps=(kmeans_task,), use_container_width=True)
+
+bg.render(bg.tasks, lambda *_: st.success("🎉 Visualizations Generated Successfully!"), "Generating visualizations")
 
 # ---------------------------------------------------------
 # INSIGHTS
@@ -164,13 +468,57 @@ st.markdown("""
 The **K-Means + PCA analysis** reveals structured, non-random crime behavior across cities.
 
 ### 🔍 Key Findings
+""")
 
-| Cluster | Crime Characteristics | Interpretation |
-|----------|----------------------|----------------|
-| **0** | High violent & property crime | Social instability, unemployment, weak law enforcement |
-| **1** | Moderate crime across all types | Transitional, mixed socioeconomic cities |
-| **2** | Consistently low crime | Strong governance, education, and social stability |
+CRIME_NAMES = {'violent_crime': "violent", 'property_crime': "property",
+               'whitecollar_crime': "white-collar", 'social_crime': "social"}
+TIER_INTERPRETATION = {
+    "High": "Social instability, unemployment, weak law enforcement",
+    "Moderate": "Transitional, mixed socioeconomic cities",
+    "Low": "Strong governance, education, and social stability",
+}
+
+
+def cluster_findings(clusters):
+    """Key-findings rows for the chosen k: each cluster's crime level and its standout crime types."""
+    labels = np.asarray(clusters[0])
+    X = feature_frame.to_numpy(dtype=float)
+    counts = np.bincount(labels)
+    means = np.stack([np.bincount(labels, weights=X[:, i], minlength=len(counts)) for i in range(X.shape[1])],
+                     axis=1) / np.maximum(counts, 1)[:, None]
+    # Cluster means in standard deviations from the overall mean, per crime type.
+    scale = X.std(axis=0)
+    z = (means - X.mean(axis=0)) / np.where(scale > 0, scale, 1)
+    rank = np.argsort(np.argsort(-z.mean(axis=1)))  # 0 = highest overall crime
+    rows = []
+    for cluster in np.flatnonzero(counts):
+        tier = "High" if rank[cluster] == 0 else "Low" if rank[cluster] == len(counts) - 1 else "Moderate"
+        standout = [CRIME_NAMES[features[i]] for i in np.argsort(-z[cluster]) if z[cluster, i] > 0.25][:2]
+        if tier == "Low":
+            characteristics = "Consistently low crime"
+        elif standout:
+            characteristics = f"{tier} {' & '.join(standout)} crime"
+        else:
+            characteristics = f"{tier} crime across all types"
+        rows.append((int(cluster), characteristics, TIER_INTERPRETATION[tier], int(counts[cluster])))
+    return rows
+
+
+def draw_findings(rows):
+    table = "\n".join(
+        f"| **{cluster}** | {characteristics} | {interpretation} | {count:,} |"
+        for cluster, characteristics, interpretation, count in rows
+    )
+    st.markdown(
+        "| Cluster | Crime Characteristics | Interpretation | Records |\n"
+        "|----------|----------------------|----------------|---------|\n" + table
+    )
+    st.caption(f"Profiles of the k = {len(rows)} clusters fitted above, ranked by average crime score.")
+
+
+bg.render(bg.submit("findings", cluster_findings, kmeans_task), draw_findings, "Summarising the clusters")
 
+st.markdown("""
 ### 🔬 PCA Insights
 - Two main dimensions explain most variance in urban crime  
 - Distinct grouping supports theories like **Social Disorganization** and **Strain Theory**  
@@ -206,3 +554,6 @@ The **K-Means + PCA analysis** reveals structured, non-random crime behavior acr
 > 🧩 **Conclusion:** Urban crime reflects deep-rooted socio-economic structures.  
 Machine learning tools like **K-Means + PCA** can transform raw crime data into actionable, policy-driven insights.
 """)
+
+bg.drain()
+perf.finish()
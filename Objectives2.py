@@ -1,6 +1,20 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+
+from crime_charts import PAYLOAD_ENCODING, adaptive_scatter, add_trendlines, point_details, render_mode, rows_in_bin
+from crime_data import dataset_digest, load_crime_data, stream_summary
+from crime_figures import figure_key
+from crime_index import cross_filter, filter_index, take
+from crime_lazy import lazy_import, mark_first_paint
+from crime_perf import PagePerf
+from crime_pipeline import load_artifact
+from crime_progress import BackgroundRun
+from crime_regression import fit_ols_batch
+
+# Heavy libraries load on first use, after the page header has rendered.
+px = lazy_import("plotly.express")
+
+perf = PagePerf("Objectives2")
 
 # ---------------------------------------------------------
 # PAGE HEADER
@@ -13,14 +27,28 @@ st.markdown("""
 To investigate how income levels and poverty rates influence overall crime incidence across different city categories.  
 This analysis aims to determine whether socioeconomic disparities serve as predictors of crime intensity, providing insights into how economic conditions shape urban crime dynamics.
 """)
+mark_first_paint()
 
 # ---------------------------------------------------------
 # LOAD DATA
 # ---------------------------------------------------------
-url = "https://raw.githubusercontent.com/s22a0064-AinMaisarah/Crime/refs/heads/main/df_crime_cleaned.csv"
-df = pd.read_csv(url)
+PAGE_COLUMNS = ['city_cat', 'income', 'poverty', 'offense_count', 'violent_crime',
+                'property_crime', 'whitecollar_crime', 'social_crime', 'state', 'age']
+with perf.section("load"):
+    df = load_crime_data(columns=PAGE_COLUMNS)
+    summary = stream_summary()
 
 st.success("✅ Dataset Loaded Successfully")
+if summary is not None:
+    st.info(summary.caption(len(df)))
+# Every chart and fit below uses the rows selected in the cross-filter sidebar.
+with perf.section("filter_index"):
+    rows, where = cross_filter(filter_index())
+    df = take(df, rows)
+data_key = dataset_digest()
+# crime_schema stores city_cat as a category; the charts plot its values as numbers,
+# keeping the continuous colour scale and the single overall trendline.
+plot_df = df.assign(city_cat=df['city_cat'].astype(float))
 
 # ===================== DATASET INFORMATION =====================
 with st.expander("📂 About This Dataset"):
@@ -107,86 +135,161 @@ col3.metric(
 
 col4.metric(
     "Total Observations",
-    str(df.shape[0]),
+    str(summary.n_rows if summary is not None and rows is None else df.shape[0]),
     help="Number of city-level data points analyzed",
     border=True
 )
 
 
 
+# Fits and figures run in the background; each chart fills in once the text below has rendered.
+bg = BackgroundRun(perf)
+
+# One batched OLS pass for every predictor × city category (precomputed when available).
+TREND_PREDICTORS = ['income', 'poverty']
+
+
+def fit_trendlines():
+    trendlines, _ = load_artifact("trendlines") if rows is None else (None, None)
+    if trendlines is None and summary is not None and rows is None:
+        # Fitted on every streamed row, not just the plotted sample.
+        trendlines = summary.trendlines()
+    if trendlines is None:
+        trendlines = fit_ols_batch(df, TREND_PREDICTORS, ['offense_count'], group='city_cat')
+    return trendlines
+
+
+trendlines_task = bg.submit("regression", fit_trendlines)
+# Plotly draws one line per discrete colour group, or one overall for a numeric colour.
+trend_grouped = not pd.api.types.is_numeric_dtype(plot_df['city_cat'])
+
+
+def show_details(event):
+    details = point_details(df, event, PAGE_COLUMNS)
+    if len(details):
+        st.dataframe(details, use_container_width=True)
+    else:
+        st.caption("Click or lasso points to see their details.")
+
+
+def show_scatter(build, x, y, key, deps=()):
+    # Figures are cached per dataset and cross-filter selection; build(*deps) runs on a miss only.
+    cache_key = figure_key(key, data_key, where=where)
+    label = f"Plotting {x} against {y}"
+    # Large datasets are drawn as server-side density; let users drill into a bin.
+    if render_mode(len(df)) == "density":
+        bg.chart(key, cache_key, build, label, deps=deps, use_container_width=True)
+        with st.expander("🔎 Drill down into a density bin"):
+            c1, c2 = st.columns(2)
+            x_value = c1.number_input(x, value=float(df[x].astype(float).median()), key=f"{key}_x")
+            y_value = c2.number_input(y, value=float(df[y].astype(float).median()), key=f"{key}_y")
+            st.dataframe(rows_in_bin(df, x, y, x_value, y_value), use_container_width=True)
+    elif PAYLOAD_ENCODING == "compact":
+        # Points carry row ids only; their hover fields load once selected.
+        bg.chart(key, cache_key, build, label, deps=deps, then=show_details, use_container_width=True,
+                 key=f"{key}_select", on_select="rerun")
+    else:
+        bg.chart(key, cache_key, build, label, deps=deps, use_container_width=True)
+
+
 # ==============================================
 # ✅ Income vs Offense Count
 # ==============================================
 st.subheader("Income vs Offense Count by City Category")
 
-fig_income_offense = px.scatter(
-    df,
-    x='income',
-    y='offense_count',
-    color='city_cat',
-    hover_data=['city_cat', 'income', 'offense_count', 'violent_crime', 
-                'property_crime', 'whitecollar_crime', 'social_crime', 'state', 'age'],
-    title='Interactive Scatter Plot: Income vs Offense Count by City Category',
-    labels={'city_cat': 'City Category (0: Group II, 1: Group I)'},
-    trendline='ols'
-)
-st.plotly_chart(fig_income_offense, use_container_width=True)
+
+def income_offense_figure(trendlines):
+    fig_income_offense, _ = adaptive_scatter(
+        plot_df,
+        x='income',
+        y='offense_count',
+        color='city_cat',
+        hover_data=['city_cat', 'income', 'offense_count', 'violent_crime', 
+                    'property_crime', 'whitecollar_crime', 'social_crime', 'state', 'age'],
+        title='Interactive Scatter Plot: Income vs Offense Count by City Category',
+        labels={'city_cat': 'City Category (0: Group II, 1: Group I)'}
+    )
+    add_trendlines(fig_income_offense, trendlines, 'income', 'offense_count', trend_grouped)
+    return fig_income_offense
+
+
+show_scatter(income_offense_figure, 'income', 'offense_count', 'fig_income_offense', deps=(trendlines_task,))
 
 # ==============================================
 # ✅ Poverty vs Offense Count
 # ==============================================
 st.subheader("Poverty % vs Offense Count by City Category")
 
-fig_poverty_offense = px.scatter(
-    df,
-    x='poverty',
-    y='offense_count',
-    color='city_cat',
-    hover_data=['city_cat', 'poverty', 'offense_count', 'violent_crime', 
-                'property_crime', 'whitecollar_crime', 'social_crime', 'state', 'age'],
-    title='Interactive Scatter Plot: Poverty % vs Offense Count by City Category',
-    labels={'city_cat': 'City Category (0: Group II, 1: Group I)'},
-    trendline='ols'
-)
-st.plotly_chart(fig_poverty_offense, use_container_width=True)
+
+def poverty_offense_figure(trendlines):
+    fig_poverty_offense, _ = adaptive_scatter(
+        plot_df,
+        x='poverty',
+        y='offense_count',
+        color='city_cat',
+        hover_data=['city_cat', 'poverty', 'offense_count', 'violent_crime', 
+                    'property_crime', 'whitecollar_crime', 'social_crime', 'state', 'age'],
+        title='Interactive Scatter Plot: Poverty % vs Offense Count by City Category',
+        labels={'city_cat': 'City Category (0: Group II, 1: Group I)'}
+    )
+    add_trendlines(fig_poverty_offense, trendlines, 'poverty', 'offense_count', trend_grouped)
+    return fig_poverty_offense
+
+
+show_scatter(poverty_offense_figure, 'poverty', 'offense_count', 'fig_poverty_offense', deps=(trendlines_task,))
+
+with st.expander("📐 Regression Summary (OLS)"):
+    bg.render(trendlines_task, lambda trendlines: st.dataframe(trendlines, use_container_width=True),
+              "Fitting the trendlines")
 
 # ==============================================
 # ✅ Income vs City Category — Yellow Theme
 # ==============================================
 st.subheader("Income vs City Category")
 
-fig_income_citycat = px.scatter(
-    df,
-    x='income',
-    y='city_cat',
-    color='city_cat',
-    color_discrete_sequence=['gold', 'yellow'],
-    hover_data=['city_cat', 'income', 'offense_count', 'violent_crime', 
-                'property_crime', 'whitecollar_crime', 'social_crime'],
-    title='Income vs City Category',
-    labels={'city_cat': 'City Category (0: Group II, 1: Group I)'}
-)
-st.plotly_chart(fig_income_citycat, use_container_width=True)
+
+def income_citycat_figure():
+    fig_income_citycat, _ = adaptive_scatter(
+        plot_df,
+        x='income',
+        y='city_cat',
+        color='city_cat',
+        color_discrete_sequence=['gold', 'yellow'],
+        hover_data=['city_cat', 'income', 'offense_count', 'violent_crime', 
+                    'property_crime', 'whitecollar_crime', 'social_crime'],
+        title='Income vs City Category',
+        labels={'city_cat': 'City Category (0: Group II, 1: Group I)'}
+    )
+    return fig_income_citycat
+
+
+show_scatter(income_citycat_figure, 'income', 'city_cat', 'fig_income_citycat')
 
 # ==============================================
 # ✅ Poverty vs City Category — Yellow Theme
 # ==============================================
 st.subheader("Poverty % vs City Category")
 
-fig_poverty_citycat = px.scatter(
-    df,
-    x='poverty',
-    y='city_cat',
-    color='city_cat',
-    color_discrete_sequence=['gold', 'yellow'],
-    hover_data=['city_cat', 'poverty', 'offense_count', 'violent_crime', 
-                'property_crime', 'whitecollar_crime', 'social_crime'],
-    title='Poverty % vs City Category',
-    labels={'city_cat': 'City Category (0: Group II, 1: Group I)'}
-)
-st.plotly_chart(fig_poverty_citycat, use_container_width=True)
 
-st.success("✅ Updated interactive charts successfully loaded!")
+def poverty_citycat_figure():
+    fig_poverty_citycat, _ = adaptive_scatter(
+        plot_df,
+        x='poverty',
+        y='city_cat',
+        color='city_cat',
+        color_discrete_sequence=['gold', 'yellow'],
+        hover_data=['city_cat', 'poverty', 'offense_count', 'violent_crime', 
+                    'property_crime', 'whitecollar_crime', 'social_crime'],
+        title='Poverty % vs City Category',
+        labels={'city_cat': 'City Category (0: Group II, 1: Group I)'}
+    )
+    return fig_poverty_citycat
+
+
+show_scatter(poverty_citycat_figure, 'poverty', 'city_cat', 'fig_poverty_citycat')
+
+bg.render(bg.tasks, lambda *_: st.success("✅ Updated interactive charts successfully loaded!"),
+          "Loading the interactive charts")
 
 # ===================== INTERPRETATION =====================
 st.markdown("""
@@ -265,3 +368,5 @@ Further research may integrate time-series crime trends, migration indicators, a
 ---
 """)
 
+bg.drain()
+perf.finish()
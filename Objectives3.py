@@ -1,10 +1,25 @@
+import functools
+import threading
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+
+from crime_charts import violin_summary_figure
+from crime_backend import get_backend, melt_profile
+from crime_data import dataset_digest, load_crime_data, stream_summary
+from crime_figures import figure_key
+from crime_index import cross_filter, filter_index, take
+from crime_lazy import lazy_import, mark_first_paint
+from crime_perf import PagePerf
+from crime_pipeline import load_artifact
+from crime_progress import BackgroundRun
+
+# Heavy libraries load on first use, after the page header has rendered.
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objects")
 
 # ===================== PAGE CONFIG =====================
 st.set_page_config(page_title="Male Population, Age and Education Level Influence Crime Patterns", layout="wide")
+perf = PagePerf("Objectives3")
 
 # ===================== PAGE HEADER =====================
 st.title("🚨 Male Population, Age and Education Level Influence Crime Patterns")
@@ -17,14 +32,25 @@ shape the distribution of various crime categories within urban settings.
 This investigation aims to uncover **socio-structural drivers of crime**, providing a foundation for  
 evidence-based urban policy and targeted community safety interventions.  
 """)
+mark_first_paint()
 
 # ---------------------------------------------------------
 # LOAD DATA
 # ---------------------------------------------------------
-url = "https://raw.githubusercontent.com/s22a0064-AinMaisarah/Crime/refs/heads/main/df_crime_cleaned.csv"
-df = pd.read_csv(url)
+crime_cols = ['violent_crime', 'property_crime', 'whitecollar_crime', 'social_crime']
+education_cols = ['high_school_below', 'high_school', 'some_college', 'bachelors_degree']
+with perf.section("load"):
+    df = load_crime_data(columns=['male', 'age'] + crime_cols + education_cols)
+    summary = stream_summary()
 
 st.success("✅ Dataset Loaded Successfully")
+if summary is not None:
+    st.info(summary.caption(len(df)))
+# Every chart below uses the rows selected in the cross-filter sidebar.
+with perf.section("filter_index"):
+    rows, where = cross_filter(filter_index())
+    view = take(df, rows)
+data_key = dataset_digest()
 
 # ===================== DATASET INFORMATION =====================
 with st.expander("📂 About This Dataset"):
@@ -78,7 +104,7 @@ Crimes involving moral, social, or public-order violations:
 
 
 st.subheader("🧾 Dataset Preview")
-st.dataframe(df.head(), use_container_width=True)
+st.dataframe(view.head(), use_container_width=True)
 
 # ===================== SUMMARY METRICS =====================
 st.subheader("📊 Summary Metrics")
@@ -87,28 +113,70 @@ col1, col2, col3, col4 = st.columns(4)
 
 col1.metric("Crime Variables", "4", help="violent, property, white-collar, social crime", border=True)
 col2.metric("Demographic Dimensions", "3", help="Gender, Age, Education", border=True)
-col3.metric("Dataset Size", str(df.shape[0]), help="Total city-level observations analyzed", border=True)
+col3.metric("Dataset Size", str(summary.n_rows if summary is not None and rows is None else view.shape[0]), help="Total city-level observations analyzed", border=True)
 col4.metric("Education Groups", "4", help="High school below, high school, college, bachelor’s", border=True)
 
-# Common crime columns
-crime_cols = ['violent_crime', 'property_crime', 'whitecollar_crime', 'social_crime']
-
 st.markdown("---")
 
+# Chosen here, on the script thread: it imports the backend's library before any task runs.
+backend = get_backend()
+# Figures are built in the background; each fills in once the text below has rendered.
+bg = BackgroundRun(perf)
+
 # ===================== GENDER ANALYSIS =====================
 st.subheader("👥 Crime Patterns by Male Population Category")
 
-df['male_category'] = pd.qcut(df['male'], q=3, labels=['Low-Male', 'Balanced-Gender', 'High-Male'])
-male_means = df.groupby('male_category')[crime_cols].mean().reset_index()
-melted = male_means.melt(id_vars='male_category', var_name='Crime Type', value_name='Average Crime Score')
-
-fig_gender = px.bar(
-    melted,
-    x='Crime Type', y='Average Crime Score',
-    color='male_category',
-    title='Average Crime Scores by Male Population Groups'
-)
-st.plotly_chart(fig_gender, use_container_width=True)
+# The gender and radar figures may both be built at once; they share one computation.
+profiles_lock = threading.Lock()
+
+
+def demographic_profiles():
+    """Gender and age profiles; only computed when one of their figures is not cached."""
+    with profiles_lock:
+        return compute_profiles()
+
+
+@functools.cache
+def compute_profiles():
+    with perf.section("aggregation"):
+        melted, _ = load_artifact("male_means") if rows is None else (None, None)
+        age_means, _ = load_artifact("age_means") if rows is None else (None, None)
+        if summary is not None and rows is None:
+            # Exact profiles over every streamed row, from the online group sums.
+            melted = summary.male_means() if melted is None else melted
+            age_means = summary.means('age') if age_means is None else age_means
+        if melted is None or age_means is None:
+            # One query serves every per-group profile on this page.
+            if rows is None:
+                frame = backend.scan(['male', 'age'] + crime_cols)
+            else:
+                frame = backend.from_frame(df[['male', 'age'] + crime_cols])
+            frame = backend.with_quantile_bins(frame, 'male', ['Low-Male', 'Balanced-Gender', 'High-Male'], 'male_category')
+            if rows is not None:
+                # Tertiles of every row, so a filtered group keeps the page-wide meaning.
+                frame = backend.from_frame(take(backend.collect(frame), rows))
+            profiles = backend.group_means(frame, crime_cols, ['male_category', 'age'])
+            if melted is None:
+                melted = melt_profile(profiles['male_category'], 'male_category')
+            if age_means is None:
+                age_means = profiles['age']
+    return melted, age_means
+
+
+def gender_figure():
+    melted, _ = demographic_profiles()
+    fig_gender = px.bar(
+        melted,
+        x='Crime Type', y='Average Crime Score',
+        color='male_category',
+        title='Average Crime Scores by Male Population Groups'
+    )
+    return fig_gender
+
+
+# Figures are cached per dataset and cross-filter selection.
+bg.chart("gender_bar", figure_key("gender_bar", data_key, where=where), gender_figure,
+         "Averaging crime scores by male population group", use_container_width=True)
 
 st.info("📍 *Cities with higher male ratios tend to show greater violent and property crime scores.*")
 
@@ -117,19 +185,24 @@ st.markdown("---")
 # ===================== AGE ANALYSIS (RADAR CHART) =====================
 st.subheader("📅 Crime Distribution Across Age Groups")
 
-age_means = df.groupby('age')[crime_cols].mean().reset_index()
 
-fig = go.Figure()
-for _, row in age_means.iterrows():
-    fig.add_trace(go.Scatterpolar(
-        r=row[crime_cols].tolist(),
-        theta=crime_cols,
-        fill='toself',
-        name=f"Age {row['age']}"
-    ))
+def radar_figure():
+    _, age_means = demographic_profiles()
+    fig = go.Figure()
+    for age, scores in zip(age_means['age'], age_means[crime_cols].to_numpy()):
+        fig.add_trace(go.Scatterpolar(
+            r=scores.tolist(),
+            theta=crime_cols,
+            fill='toself',
+            name=f"Age {age}"
+        ))
 
-fig.update_layout(title='Radar Chart: Crime Scores by Age Group', showlegend=True)
-st.plotly_chart(fig, use_container_width=True)
+    fig.update_layout(title='Radar Chart: Crime Scores by Age Group', showlegend=True)
+    return fig
+
+
+bg.chart("age_radar", figure_key("age_radar", data_key, where=where), radar_figure,
+         "Averaging crime scores by age group", use_container_width=True)
 
 st.info("📍 *Younger-population cities tend to have higher social and property crime trends.*")
 
@@ -138,35 +211,30 @@ st.markdown("---")
 # ===================== EDUCATION VS CRIME =====================
 st.subheader("🎓 Education Level vs Crime Distribution")
 
-education_cols = ['high_school_below', 'high_school', 'some_college', 'bachelors_degree']
+show_points = st.checkbox("Overlay a sample of city points", value=False)
+
 
-crime_melted = df.melt(
-    value_vars=crime_cols,
-    var_name='Crime Type',
-    value_name='Crime Score',
-    id_vars=education_cols
-)
-
-education_crime_melted = crime_melted.melt(
-    id_vars=['Crime Type', 'Crime Score'],
-    value_vars=education_cols,
-    var_name='Education Level',
-    value_name='Education Percentage'
-)
-
-fig_violin = px.violin(
-    education_crime_melted,
-    x='Education Level',
-    y='Crime Score',
-    color='Crime Type',
-    box=True,
-    points="all",
-    hover_data=['Crime Type', 'Crime Score', 'Education Level', 'Education Percentage'],
-    title='Distribution of Crime Scores by Education Level and Crime Type'
-)
-
-fig_violin.update_layout(xaxis_title='Education Level', yaxis_title='Crime Score')
-st.plotly_chart(fig_violin, use_container_width=True)
+def violin_figure():
+    with perf.section("violin_summary"):
+        fig_violin = violin_summary_figure(
+            view,
+            value_cols=crime_cols,
+            categories=education_cols,
+            category_label='Education Level',
+            value_label='Crime Score',
+            series_label='Crime Type',
+            hover_label='Education Percentage',
+            title='Distribution of Crime Scores by Education Level and Crime Type',
+            sample_points=500 if show_points else 0,
+        )
+
+    fig_violin.update_layout(xaxis_title='Education Level', yaxis_title='Crime Score')
+    return fig_violin
+
+
+violin_key = figure_key("education_violin", data_key, where=where, show_points=show_points)
+bg.chart("education_violin", violin_key, violin_figure, "Summarising crime scores by education level",
+         use_container_width=True)
 
 st.info("📍 *Higher education levels correlate with lower violent crime but mixed trends for white-collar crime.*")
 
@@ -217,3 +285,6 @@ Research Recommendations
 """)
 
 st.success("📎 This demographic-crime analysis strengthens the urban planning, criminology, and public-policy nexus through data-driven insight.")
+
+bg.drain()
+perf.finish()
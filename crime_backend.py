@@ -0,0 +1,259 @@
+# =========================================================
+# 🔌 Pluggable Dataframe Backends for the Crime Dashboard
+# =========================================================
+"""Run the pages' scans, filters and group profiles on pandas or Polars.
+
+The pages only need a handful of dataframe operations: scan a projection of
+the dataset with optional filters, add a derived column (cluster labels,
+quantile bins), and compute per-group means of the crime columns.  Both
+backends implement them with the same signatures:
+
+* ``pandas`` — the reference implementation: the cached, projected frame
+  from ``load_crime_data``, filtered through the ``FilterIndex`` (boolean
+  masks for other columns); group means come from one ``AggregationCube``
+  for every dimension;
+* ``polars`` — a lazy query over the memory-mapped Arrow snapshot, so
+  projection and filters are pushed down to the scan, and all group profiles
+  are collected together on Polars' thread pool.
+
+Results come back as pandas frames with the compact dtypes of
+``crime_schema``, so chart code does not care which backend ran.  Pick one
+with ``CRIME_BACKEND`` (default ``pandas``); Polars is optional and the pandas
+backend is used when it is not installed.
+
+``python -m crime_backend check`` runs the page computations on both
+backends and reports any difference in the resulting chart inputs.
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from crime_cube import AggregationCube
+from crime_data import dataset_snapshot, load_crime_data
+from crime_index import CATEGORICAL_DIMENSIONS, NUMERIC_DIMENSIONS, filter_index, take
+from crime_lazy import lazy_import, timed_import
+from crime_schema import CRIME_FEATURES, apply_schema
+
+pl = lazy_import("polars")
+
+BACKENDS = {
+    "pandas": "pandas (reference)",
+    "polars": "Polars lazy query",
+}
+DEFAULT_BACKEND = os.environ.get("CRIME_BACKEND", "pandas")
+FILTER_DIMENSIONS = CATEGORICAL_DIMENSIONS + NUMERIC_DIMENSIONS
+
+
+def available_backends():
+    """Backends whose libraries are installed."""
+    return [name for name in BACKENDS if name == "pandas" or importlib.util.find_spec(name) is not None]
+
+
+def get_backend(name=None):
+    """Backend instance for ``name`` (default ``CRIME_BACKEND``), falling back to pandas.
+
+    Pages call it on the script thread, before submitting background tasks.
+    """
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"unknown backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    if name not in available_backends():
+        name = "pandas"
+    if name == "polars":
+        # Import on the caller's thread: libraries that probe ``sys.modules``
+        # (narwhals, via plotly) must never see a half-initialised polars
+        # while a background task is still importing it.
+        timed_import("polars")
+        return PolarsBackend()
+    return PandasBackend()
+
+
+def _finish_profile(frame, by):
+    """Sort groups and restore the schema dtypes, like ``AggregationCube.means``."""
+    frame = apply_schema(frame, infer=False)
+    keys = frame[by]
+    if isinstance(keys.dtype, pd.CategoricalDtype) and not keys.cat.ordered:
+        # Polars keeps categories in order of appearance; pandas sorts them.
+        frame[by] = keys.cat.reorder_categories(sorted(keys.cat.categories))
+    return frame.sort_values(by, ignore_index=True)
+
+
+def melt_profile(profile, by, var_name='Crime Type', value_name='Average Crime Score'):
+    """Long-format group means for bar charts (same as ``AggregationCube.melted``)."""
+    return profile.melt(id_vars=by, var_name=var_name, value_name=value_name)
+
+
+# ---------------------------------------------------------
+# PANDAS (REFERENCE)
+# ---------------------------------------------------------
+class PandasBackend:
+    """Eager pandas/NumPy implementation every other backend is checked against."""
+
+    name = "pandas"
+
+    def scan(self, columns, where=None, source=None):
+        """Columns of the dataset, restricted to rows matching ``where``.
+
+        Conditions on indexed dimensions are resolved by the ``FilterIndex``
+        instead of a mask over every row.
+        """
+        where = where or {}
+        index = filter_index(source) if where and set(where) <= set(FILTER_DIMENSIONS) else None
+        if index is not None:
+            return take(load_crime_data(columns=list(columns), source=source), index.select(where))
+        needed = list(dict.fromkeys(list(columns) + list(where)))
+        return self.filter(load_crime_data(columns=needed, source=source), where)[list(columns)]
+
+    def from_frame(self, df):
+        return df
+
+    def filter(self, frame, where):
+        """Keep rows where each column equals a value, is in a list or lies in a ``(low, high)`` range."""
+        mask = np.ones(len(frame), dtype=bool)
+        for column, condition in (where or {}).items():
+            if isinstance(condition, tuple):
+                mask &= frame[column].between(*condition).to_numpy()
+            elif isinstance(condition, list):
+                mask &= frame[column].isin(condition).to_numpy()
+            else:
+                mask &= (frame[column] == condition).to_numpy()
+        return frame if mask.all() else frame[mask]
+
+    def with_column(self, frame, name, values):
+        return frame.assign(**{name: values})
+
+    def with_quantile_bins(self, frame, column, labels, name):
+        """``pd.qcut`` of ``column`` into ``len(labels)`` equal-count bins."""
+        return frame.assign(**{name: pd.qcut(frame[column], q=len(labels), labels=labels)})
+
+    def group_means(self, frame, value_cols, by):
+        """``{dimension: groupby(dimension)[value_cols].mean()}`` for every name in ``by``."""
+        cube = AggregationCube(frame, value_cols, list(by))
+        return {name: _finish_profile(cube.means(name), name) for name in by}
+
+    def collect(self, frame):
+        return frame.reset_index(drop=True)
+
+
+# ---------------------------------------------------------
+# POLARS (LAZY)
+# ---------------------------------------------------------
+class PolarsBackend:
+    """Lazy Polars queries; nothing runs until ``group_means`` or ``collect``."""
+
+    name = "polars"
+
+    def scan(self, columns, where=None, source=None):
+        snapshot = dataset_snapshot(source)
+        if isinstance(snapshot, pd.DataFrame):
+            frame = pl.from_pandas(snapshot).lazy()
+        elif isinstance(snapshot, list):
+            # Appended versions are stored as segments with their own integer widths.
+            frame = pl.concat([pl.scan_ipc(path) for path in snapshot], how="vertical_relaxed")
+        else:
+            frame = pl.scan_ipc(snapshot)
+        return self.filter(frame, where).select(list(columns))
+
+    def from_frame(self, df):
+        return pl.from_pandas(df).lazy()
+
+    def filter(self, frame, where):
+        for column, condition in (where or {}).items():
+            if isinstance(condition, tuple):
+                frame = frame.filter(pl.col(column).is_between(*condition))
+            elif isinstance(condition, list):
+                frame = frame.filter(pl.col(column).cast(pl.String).is_in([str(value) for value in condition]))
+            else:
+                frame = frame.filter(pl.col(column) == condition)
+        return frame
+
+    def with_column(self, frame, name, values):
+        return frame.with_columns(pl.Series(name, np.asarray(values)))
+
+    def with_quantile_bins(self, frame, column, labels, name):
+        """Same bins as ``pd.qcut``: linear-interpolated quantiles, right-closed."""
+        value = pl.col(column).cast(pl.Float64)
+        edges = [value.quantile(q, interpolation="linear") for q in np.linspace(0, 1, len(labels) + 1)[1:-1]]
+        binned = pl.when(value.is_null()).then(None)
+        for edge, label in zip(edges, labels):
+            binned = binned.when(value <= edge).then(pl.lit(label))
+        return frame.with_columns(binned.otherwise(pl.lit(labels[-1])).cast(pl.Enum(list(labels))).alias(name))
+
+    def group_means(self, frame, value_cols, by):
+        queries = [
+            frame.filter(pl.col(name).is_not_null())
+            .group_by(name)
+            .agg([pl.col(col).cast(pl.Float64).mean() for col in value_cols])
+            for name in by
+        ]
+        results = pl.collect_all(queries)
+        return {name: _finish_profile(result.to_pandas(), name) for name, result in zip(by, results)}
+
+    def collect(self, frame):
+        return apply_schema(frame.collect().to_pandas(), infer=False)
+
+
+# ---------------------------------------------------------
+# EQUIVALENCE CHECK
+# ---------------------------------------------------------
+def page_inputs(backend, source=None):
+    """The chart inputs the pages derive through a backend, keyed by name."""
+    state = load_crime_data(columns=['state'], source=source)['state'].mode().iloc[0]
+    frame = backend.scan(['male', 'age', 'state'] + CRIME_FEATURES, source=source)
+    frame = backend.with_quantile_bins(frame, 'male', ['Low-Male', 'Balanced-Gender', 'High-Male'], 'male_category')
+    profiles = backend.group_means(frame, CRIME_FEATURES, ['male_category', 'age', 'state'])
+    filtered = backend.scan(['state', 'income', 'offense_count'], where={'state': state}, source=source)
+    banded = backend.scan(['income', 'poverty'], where={'poverty': (10.0, 20.0)}, source=source)
+    crossed = backend.scan(
+        ['state', 'age', 'income'], where={'age': [25, 30], 'income': (40000.0, 80000.0)}, source=source,
+    )
+    return {
+        **{f"means_by_{name}": profile for name, profile in profiles.items()},
+        "filter_state": backend.collect(filtered),
+        "filter_poverty_range": backend.collect(banded),
+        "filter_age_income": backend.collect(crossed),
+    }
+
+
+def compare_backends(candidate="polars", reference="pandas", source=None, rtol=1e-6):
+    """Run ``page_inputs`` on both backends; one row per input with any difference."""
+    expected = page_inputs(get_backend(reference), source)
+    actual = page_inputs(get_backend(candidate), source)
+    rows = []
+    for name, frame in expected.items():
+        try:
+            pd.testing.assert_frame_equal(
+                frame.reset_index(drop=True), actual[name].reset_index(drop=True),
+                check_dtype=False, check_categorical=False, rtol=rtol,
+            )
+            difference = None
+        except AssertionError as exc:
+            difference = str(exc).splitlines()[0]
+        rows.append({"input": name, "rows": len(frame), "equal": difference is None, "difference": difference})
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m crime_backend", description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    check_cmd = sub.add_parser("check", help="compare a backend's chart inputs with the pandas reference")
+    check_cmd.add_argument("--backend", default="polars", choices=list(BACKENDS))
+    check_cmd.add_argument("--source", help="URL or CSV path (default: configured sources)")
+    args = parser.parse_args(argv)
+
+    if args.command == "check":
+        if args.backend not in available_backends():
+            raise SystemExit(f"{args.backend} is not installed")
+        report = compare_backends(args.backend, source=args.source)
+        print(report.to_string(index=False))
+        if not report["equal"].all():
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+# =========================================================
+# ⏱️ Headless Benchmark Suite for the Crime Dashboard
+# =========================================================
+"""Measure the three pages against synthetic datasets, without network access.
+
+    python -m crime_benchmark --sizes 1000 100000 --out bench.json
+
+For every size a synthetic CSV following the ``df_crime_cleaned.csv`` schema
+is generated, then each target runs in a fresh subprocess with its own
+snapshot, artifact, figure-cache and mirror directories (so in-memory and
+on-disk caches and peak RSS are isolated):
+
+* ``sections``       — the page computations called directly, timed one by
+  one: load, scale, elbow (exact sweep), k selection (coreset), pca,
+  kmeans, aggregation (also on the Polars backend when installed),
+  regression, figure build (with the browser payload size of both
+  ``full`` and ``compact`` point encodings);
+* ``Objectives*.py`` — the page run headlessly through Streamlit's
+  ``AppTest``, for end-to-end wall time and peak RSS, with section timings
+  taken from the page's ``crime_perf`` instrumentation (timing only: its
+  opt-in memory tracing would slow every allocation and inflate them).
+
+Results are written as JSON so runs can be compared over time.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PAGES = ["Objectives1.py", "Objectives2.py", "Objectives3.py"]
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+CRIME_FEATURES = ['violent_crime', 'property_crime', 'whitecollar_crime', 'social_crime']
+EDUCATION_COLS = ['high_school_below', 'high_school', 'some_college', 'bachelors_degree']
+STATES = ['CA', 'TX', 'NY', 'FL', 'IL', 'PA', 'OH', 'GA', 'NC', 'MI', 'WA', 'AZ']
+
+
+# ---------------------------------------------------------
+# SYNTHETIC DATA
+# ---------------------------------------------------------
+def synthetic_crime_frame(n_rows, seed=0):
+    """Random frame with the columns and rough ranges of ``df_crime_cleaned.csv``."""
+    rng = np.random.default_rng(seed)
+    latent = rng.normal(size=(n_rows, 1))
+    crime = latent + rng.normal(scale=0.8, size=(n_rows, len(CRIME_FEATURES)))
+    education = rng.dirichlet([2, 4, 4, 3], size=n_rows) * 100
+    frame = pd.DataFrame({
+        'city': np.char.add('city_', np.arange(n_rows).astype(str)),
+        'state': rng.choice(STATES, n_rows),
+        'city_cat': rng.integers(0, 2, n_rows),
+        'offense_count': np.maximum(0, (2000 + 1500 * latent[:, 0] + rng.normal(0, 500, n_rows))).astype(int),
+        'income': rng.normal(55_000, 12_000, n_rows).round(2),
+        'poverty': rng.uniform(4, 35, n_rows).round(2),
+        'male': rng.normal(49, 1.5, n_rows).round(2),
+        'age': rng.choice([25, 30, 35, 40, 45, 50], n_rows),
+    })
+    for i, col in enumerate(CRIME_FEATURES):
+        frame[col] = crime[:, i].round(4)
+    for i, col in enumerate(EDUCATION_COLS):
+        frame[col] = education[:, i].round(2)
+    return frame
+
+
+# ---------------------------------------------------------
+# TARGETS (run inside a subprocess)
+# ---------------------------------------------------------
+@contextlib.contextmanager
+def timed(timings, name):
+    start = time.perf_counter()
+    yield
+    timings[name] = round(time.perf_counter() - start, 4)
+
+
+def run_sections(csv_path):
+    """Time each page computation on the dataset at ``csv_path``."""
+    from sklearn.preprocessing import StandardScaler
+
+    from crime_backend import available_backends, get_backend
+    from crime_charts import adaptive_scatter, violin_summary_figure
+    from crime_cube import AggregationCube
+    from crime_data import load_crime_data
+    from crime_models import array_chunks, default_engine, elbow_sweep, fit_clusters, fit_pca
+    from crime_regression import fit_ols_batch
+    from crime_selection import select_k
+
+    timings = {}
+    with timed(timings, "load"):
+        df = load_crime_data(source=csv_path)
+    with timed(timings, "load_warm"):
+        load_crime_data(source=csv_path)
+    with timed(timings, "scale"):
+        X_scaled = StandardScaler().fit_transform(df[CRIME_FEATURES])
+    with timed(timings, "elbow"):
+        list(elbow_sweep(X_scaled))
+    with timed(timings, "k_selection"):
+        select_k(X_scaled, strata=df['city_cat'])
+    with timed(timings, "pca"):
+        pca_fit = fit_pca(array_chunks(X_scaled), n_rows=len(X_scaled), n_features=len(CRIME_FEATURES))
+        pcs = pca_fit.model.transform(X_scaled)
+    with timed(timings, "kmeans"):
+        labels = fit_clusters(array_chunks(df[CRIME_FEATURES].to_numpy()), 3, default_engine(len(df))).labels
+    with timed(timings, "aggregation"):
+        cube = AggregationCube(df, CRIME_FEATURES, {
+            'crime_cluster': labels,
+            'male_category': pd.qcut(df['male'], q=3, labels=['Low-Male', 'Balanced-Gender', 'High-Male']),
+            'age': df['age'],
+        })
+        cube.melted('crime_cluster'), cube.melted('male_category'), cube.means('age')
+    if "polars" in available_backends():
+        with timed(timings, "aggregation_polars"):
+            backend = get_backend("polars")
+            frame = backend.with_quantile_bins(
+                backend.scan(['male', 'age'] + CRIME_FEATURES, source=csv_path),
+                'male', ['Low-Male', 'Balanced-Gender', 'High-Male'], 'male_category',
+            )
+            backend.group_means(frame, CRIME_FEATURES, ['male_category', 'age'])
+    with timed(timings, "regression"):
+        fit_ols_batch(df, ['income', 'poverty'], ['offense_count'], group='city_cat')
+    frame = df.assign(PC1=pcs[:, 0], PC2=pcs[:, 1], crime_cluster=labels)
+    hover_data = ['city_cat', 'state', 'age'] + CRIME_FEATURES
+    payloads = {}
+    for encoding in ("full", "compact"):
+        with timed(timings, "figure_build" if encoding == "compact" else f"figure_build_{encoding}"):
+            figures = [
+                adaptive_scatter(frame, 'PC1', 'PC2', encoding=encoding, color='crime_cluster',
+                                 hover_data=hover_data)[0],
+                adaptive_scatter(frame, 'income', 'offense_count', encoding=encoding, color='city_cat',
+                                 hover_data=hover_data)[0],
+                violin_summary_figure(df, CRIME_FEATURES, EDUCATION_COLS, 'Education Level', 'Crime Score',
+                                      'violin', sample_points=500, encoding=encoding),
+            ]
+            payloads[encoding] = sum(len(fig.to_json()) for fig in figures)
+    return {"sections": timings, "figure_bytes": payloads["compact"], "figure_bytes_by_encoding": payloads,
+            "exceptions": []}
+
+
+def run_page(page):
+    """Run one page headlessly through Streamlit's AppTest.
+
+    The page's own instrumentation (``crime_perf``) is switched on and its
+    log record supplies the per-section timings.  Memory tracing stays off:
+    tracemalloc hooks every allocation in the process, so the wall and
+    section times would no longer be those of an uninstrumented run.
+    """
+    log_path = os.path.join(tempfile.mkdtemp(prefix="crime-perf-"), "perf_log.jsonl")
+    os.environ.update(CRIME_PERF="1", CRIME_PERF_MEMORY="0", CRIME_PERF_LOG=log_path)
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(HERE, page), default_timeout=3600)
+    app.run()
+    result = {"exceptions": [e.message for e in app.exception]}
+    try:
+        with open(log_path) as fh:
+            entry = json.loads(fh.readlines()[-1])
+    except (OSError, IndexError, ValueError):
+        return result
+    sections = {}
+    for record in entry["sections"]:
+        sections[record["section"]] = round(sections.get(record["section"], 0) + record["seconds"], 5)
+    result["sections"] = sections
+    result["figure_bytes"] = sum(r.get("payload_bytes", 0) for r in entry["sections"])
+    return result
+
+
+def run_target(target, csv_path):
+    start = time.perf_counter()
+    result = run_sections(csv_path) if target == "sections" else run_page(target)
+    result["wall_seconds"] = round(time.perf_counter() - start, 4)
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return result
+
+
+# ---------------------------------------------------------
+# DRIVER
+# ---------------------------------------------------------
+def benchmark(sizes, targets, workdir):
+    results = []
+    for size in sizes:
+        size_dir = os.path.join(workdir, str(size))
+        os.makedirs(size_dir, exist_ok=True)
+        csv_path = os.path.join(size_dir, "df_crime_cleaned.csv")
+        synthetic_crime_frame(size).to_csv(csv_path, index=False)
+        for target in targets:
+            env = dict(
+                os.environ,
+                CRIME_DATA_SOURCE=csv_path,
+                CRIME_SNAPSHOT_DIR=os.path.join(size_dir, f"snapshots-{target}"),
+                CRIME_ARTIFACT_DIR=os.path.join(size_dir, f"artifacts-{target}"),
+                # Cold caches: no figure specs or dataset mirror left over from earlier runs.
+                CRIME_FIGURE_DIR=os.path.join(size_dir, f"figures-{target}"),
+                CRIME_SYNC_DIR=os.path.join(size_dir, f"sync-{target}"),
+            )
+            proc = subprocess.run(
+                [sys.executable, "-m", "crime_benchmark", "_run", target, csv_path],
+                cwd=HERE, env=env, capture_output=True, text=True,
+            )
+            try:
+                record = json.loads(proc.stdout.strip().splitlines()[-1])
+            except (IndexError, ValueError):
+                record = {"exceptions": [proc.stderr.strip()[-2000:] or f"exit code {proc.returncode}"]}
+            record.update(size=size, target=target)
+            results.append(record)
+            print(f"{size:>10,} {target:<16} {record.get('wall_seconds', float('nan')):>9.2f}s "
+                  f"{record.get('peak_rss_mb', float('nan')):>8.1f} MB", file=sys.stderr)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m crime_benchmark", description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="row counts to generate")
+    parser.add_argument("--targets", nargs="+", default=["sections"] + PAGES, help="sections and/or page files")
+    parser.add_argument("--out", default="bench_output.json", help="where to write the JSON results")
+    parser.add_argument("--workdir", help="keep generated data here instead of a temporary directory")
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["_run"]:
+        # Internal entry point used by ``benchmark`` for each subprocess.
+        print(json.dumps(run_target(argv[1], argv[2])))
+        return
+    args = parser.parse_args(argv)
+
+    with contextlib.ExitStack() as stack:
+        workdir = args.workdir or stack.enter_context(tempfile.TemporaryDirectory(prefix="crime-bench-"))
+        results = benchmark(args.sizes, args.targets, workdir)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    with open(args.out, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"wrote {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+# =========================================================
+# 🎨 Chart Helpers for the Crime Dashboard
+# =========================================================
+"""Figure builders whose browser payload stays bounded as the data grows.
+
+Scatter plots pick a rendering mode from the row count:
+
+* ``svg``     — regular ``px.scatter`` (small data, crisp markers);
+* ``webgl``   — ``px.scatter(render_mode="webgl")`` (``scattergl``);
+* ``density`` — server-side 2D binning drawn as a heatmap, so only the bin
+  counts are sent to the browser.  ``rows_in_bin`` drills down to the
+  underlying rows on demand.
+
+``add_trendlines`` overlays fitted lines from ``crime_regression`` on any of
+these figures, replacing ``trendline='ols'``.
+
+``violin_summary_figure`` draws violins and box plots from per-column
+summaries (binned KDE, quartiles, whiskers) computed on the wide frame, so
+neither the data nor a long-format copy of it is sent to the browser.
+
+Point payloads follow ``CRIME_PAYLOAD`` (default ``compact``):
+
+* ``full``    — every point carries its ``hover_data`` as JSON numbers and
+  strings;
+* ``compact`` — ``compact_figure`` casts numeric arrays to typed binary
+  buffers (floats to ``CRIME_PAYLOAD_PRECISION``, ``float32`` by default;
+  integers to the narrowest type), and scatter points carry only a typed
+  row id instead of their hover fields.  Strings such as ``state`` never
+  travel per point: they stay category-coded in the server-side frame and
+  ``point_details`` looks the fields up for the points a user selects.
+"""
+
+import os
+
+import numpy as np
+
+from crime_lazy import lazy_import
+
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objects")
+
+WEBGL_THRESHOLD = 5_000
+DENSITY_THRESHOLD = 200_000
+DENSITY_BINS = (120, 60)
+KDE_GRID = 128
+
+PAYLOAD_ENCODING = os.environ.get("CRIME_PAYLOAD", "compact")
+PAYLOAD_PRECISION = os.environ.get("CRIME_PAYLOAD_PRECISION", "float32")
+ROW_ID = "row_id"
+DETAILS_HINT = "<i>select for details</i>"
+# Integer types plotly.js can decode from a typed buffer, narrowest first.
+TYPED_INTEGERS = [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32]
+
+
+def render_mode(n_rows, webgl_threshold=WEBGL_THRESHOLD, density_threshold=DENSITY_THRESHOLD):
+    """Choose ``svg``, ``webgl`` or ``density`` for a scatter of ``n_rows`` points."""
+    if n_rows > density_threshold:
+        return "density"
+    if n_rows > webgl_threshold:
+        return "webgl"
+    return "svg"
+
+
+def bin_edges(values, bins):
+    values = np.asarray(values, dtype=float)
+    low, high = np.nanmin(values), np.nanmax(values)
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+def density_figure(df, x, y, title, labels=None, bins=DENSITY_BINS):
+    """Bin ``x``/``y`` on the server and draw the counts as a heatmap."""
+    labels = labels or {}
+    # Numeric copies, so categorical axes (e.g. ``city_cat``) bin by their values.
+    xs, ys = np.asarray(df[x], dtype=float), np.asarray(df[y], dtype=float)
+    x_edges, y_edges = bin_edges(xs, bins[0]), bin_edges(ys, bins[1])
+    counts, _, _ = np.histogram2d(xs, ys, bins=[x_edges, y_edges])
+    fig = go.Figure(go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        z=np.where(counts.T > 0, counts.T, np.nan),
+        colorscale="Viridis",
+        colorbar=dict(title="Rows"),
+        hovertemplate=f"{labels.get(x, x)}≈%{{x:.4g}}<br>{labels.get(y, y)}≈%{{y:.4g}}<br>rows=%{{z}}<extra></extra>",
+    ))
+    fig.update_layout(title=f"{title} (density)", xaxis_title=labels.get(x, x), yaxis_title=labels.get(y, y))
+    fig.layout.meta = {"x_edges": x_edges.tolist(), "y_edges": y_edges.tolist()}
+    return fig
+
+
+def rows_in_bin(df, x, y, x_value, y_value, bins=DENSITY_BINS, limit=500):
+    """Rows of ``df`` that fall in the density bin containing ``(x_value, y_value)``.
+
+    The edges are recomputed from ``df`` exactly as ``density_figure`` bins
+    it, so the drill-down does not need the (possibly cached) figure.
+    """
+    x_edges = bin_edges(df[x], bins[0])
+    y_edges = bin_edges(df[y], bins[1])
+    i = int(np.clip(np.searchsorted(x_edges, x_value, side="right") - 1, 0, len(x_edges) - 2))
+    j = int(np.clip(np.searchsorted(y_edges, y_value, side="right") - 1, 0, len(y_edges) - 2))
+    x_hi_op = np.less_equal if i == len(x_edges) - 2 else np.less
+    y_hi_op = np.less_equal if j == len(y_edges) - 2 else np.less
+    xs, ys = np.asarray(df[x], dtype=float), np.asarray(df[y], dtype=float)
+    mask = (
+        (xs >= x_edges[i]) & x_hi_op(xs, x_edges[i + 1])
+        & (ys >= y_edges[j]) & y_hi_op(ys, y_edges[j + 1])
+    )
+    return df[mask].head(limit)
+
+
+def adaptive_scatter(df, x, y, mode=None, encoding=None, **kwargs):
+    """``px.scatter`` that switches to WebGL or server-side density by size.
+
+    ``kwargs`` are passed to ``px.scatter``; in density mode only ``title``
+    and ``labels`` are used.  In ``compact`` encoding ``hover_data`` is
+    replaced by row ids (see ``point_details``).  Returns ``(figure, mode)``.
+    """
+    mode = mode or render_mode(len(df))
+    encoding = encoding or PAYLOAD_ENCODING
+    if mode == "density":
+        fig = density_figure(df, x, y, kwargs.get("title", ""), kwargs.get("labels"))
+    elif encoding == "compact":
+        kwargs.pop("hover_data", None)
+        fig = lazy_hover(px.scatter(with_row_ids(df), x=x, y=y, render_mode=mode, custom_data=[ROW_ID], **kwargs))
+    else:
+        fig = px.scatter(df, x=x, y=y, render_mode=mode, **kwargs)
+    return (compact_figure(fig) if encoding == "compact" else fig), mode
+
+
+# ---------------------------------------------------------
+# PAYLOAD ENCODING
+# ---------------------------------------------------------
+def typed_array(values, precision=None):
+    """``values`` as a numpy array Plotly sends as a typed binary buffer.
+
+    Floats become ``precision`` (default ``PAYLOAD_PRECISION``) and integers
+    the narrowest type holding their range; anything else (strings, mixed
+    objects) is returned unchanged.
+    """
+    array = np.asarray(values)
+    if array.dtype.kind == "f":
+        return array.astype(precision or PAYLOAD_PRECISION, copy=False)
+    if array.dtype.kind in "iu" and array.size:
+        low, high = array.min(), array.max()
+        for dtype in TYPED_INTEGERS:
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return array.astype(dtype, copy=False)
+        return array.astype(np.float64)
+    return values
+
+
+def compact_figure(fig, precision=None):
+    """Cast every numeric data array of ``fig`` with ``typed_array``, in place.
+
+    A single-column ``customdata`` (the row ids of ``with_row_ids``) is
+    flattened so it goes out as one typed array too.
+    """
+    for trace in fig.data:
+        for name in ("x", "y", "z", "customdata"):
+            values = getattr(trace, name, None)
+            if values is None or isinstance(values, str) or np.ndim(values) == 0:
+                continue
+            if name == "customdata" and np.ndim(values) == 2 and np.shape(values)[1] == 1:
+                values = np.asarray(values)[:, 0]
+            trace[name] = typed_array(values, precision)
+        marker = getattr(trace, "marker", None)
+        if marker is not None and marker.color is not None and np.ndim(marker.color) == 1:
+            marker.color = typed_array(marker.color, precision)
+    return fig
+
+
+def with_row_ids(df):
+    """``df`` plus a ``ROW_ID`` column holding its index labels."""
+    return df.assign(**{ROW_ID: df.index.to_numpy()})
+
+
+def lazy_hover(fig, hint=DETAILS_HINT):
+    """Point ``fig``'s hover at the selection details instead of per-point fields."""
+    for trace in fig.data:
+        template = trace.hovertemplate
+        if template and "<extra>" in template:
+            head, tail = template.split("<extra>", 1)
+            trace.hovertemplate = f"{head}<br>{hint}<extra>{tail}"
+    return fig
+
+
+def selected_row_ids(event):
+    """Row ids of the points selected in a ``with_row_ids`` chart's ``on_select`` event."""
+    points = ((event or {}).get("selection") or {}).get("points") or []
+    ids = []
+    for point in points:
+        value = point.get("customdata")
+        if isinstance(value, (list, tuple)):
+            value = value[0] if value else None
+        if value is not None:
+            ids.append(int(value))
+    return list(dict.fromkeys(ids))
+
+
+def point_details(df, event, columns, limit=500):
+    """Rows of ``df`` behind the selected points, restricted to ``columns``."""
+    ids = [row for row in selected_row_ids(event) if row in df.index][:limit]
+    return df.loc[ids, [col for col in columns if col in df.columns]]
+
+
+def add_trendlines(fig, fits, predictor, target, grouped=True):
+    """Overlay OLS lines for ``predictor`` → ``target`` from ``fit_ols_batch`` results.
+
+    ``grouped`` draws one line per group (plotly's behaviour for a discrete
+    colour); otherwise only the overall fit is drawn.
+    """
+    rows = fits[(fits['predictor'] == predictor) & (fits['target'] == target)]
+    rows = rows[rows['group'] != 'all'] if grouped else rows[rows['group'] == 'all']
+    for row in rows.itertuples():
+        xs = [row.x_min, row.x_max]
+        fig.add_trace(go.Scatter(
+            x=xs, y=[row.intercept + row.slope * x for x in xs], mode='lines',
+            name=f"OLS trend ({row.group})",
+            hovertemplate=f"slope={row.slope:.4g}<br>R²={row.r2:.3f}<extra></extra>",
+        ))
+    return fig
+
+
+# ---------------------------------------------------------
+# DISTRIBUTION SUMMARIES
+# ---------------------------------------------------------
+def distribution_summary(values, grid_size=KDE_GRID):
+    """Quartiles, Tukey whiskers and a binned Gaussian KDE of ``values``.
+
+    The KDE uses Silverman's bandwidth (as plotly's violin does) and is
+    computed by histogramming onto a fixed grid and convolving with the
+    kernel, so its cost is O(rows + grid) rather than O(rows × grid).  With
+    no values the statistics are NaN and the grid and density empty.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {
+            "q1": np.nan, "median": np.nan, "q3": np.nan, "lowerfence": np.nan, "upperfence": np.nan,
+            "grid": np.empty(0), "density": np.empty(0),
+        }
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    lower, upper = (inside.min(), inside.max()) if len(inside) else (q1, q3)
+
+    spread = min(values.std(), iqr / 1.349) or values.std() or 1.0
+    bandwidth = 0.9 * spread * len(values) ** -0.2
+    grid = np.linspace(values.min() - 2 * bandwidth, values.max() + 2 * bandwidth, grid_size)
+    step = grid[1] - grid[0]
+    counts, _ = np.histogram(values, bins=grid_size, range=(grid[0] - step / 2, grid[-1] + step / 2))
+    # Offsets beyond the grid cannot reach another bin, so the kernel is at
+    # most 2·grid − 1 long; the centred crop of the full convolution keeps
+    # each bin aligned with its grid point whatever the kernel length.
+    half_width = min(int(np.ceil(4 * bandwidth / step)), grid_size - 1)
+    offsets = np.arange(-half_width, half_width + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    density = np.convolve(counts, kernel)[half_width:half_width + grid_size]
+    density /= density.sum() * step
+
+    return {
+        "q1": q1, "median": median, "q3": q3, "lowerfence": lower, "upperfence": upper,
+        "grid": grid, "density": density,
+    }
+
+
+def violin_summary_figure(df, value_cols, categories, category_label, value_label, title,
+                          series_label=None, hover_label=None, sample_points=0, random_state=42, encoding=None):
+    """Grouped violin + box chart built from summaries of the wide frame.
+
+    Each category is an x position showing the distribution of every column
+    in ``value_cols`` — what ``px.violin`` draws after melting the value
+    columns against the category columns.  ``sample_points`` > 0 adds a
+    jittered layer of that many sampled rows; their hover shows the row's
+    value in the category column under ``hover_label``.
+    """
+    summaries = {col: distribution_summary(df[col]) for col in value_cols}
+    slot = 0.8 / len(value_cols)
+    sample = df.sample(min(sample_points, len(df)), random_state=random_state) if sample_points else None
+    rng = np.random.default_rng(random_state)
+
+    palette = px.colors.qualitative.Plotly
+    fig = go.Figure()
+    for j, col in enumerate(value_cols):
+        stats = summaries[col]
+        color = palette[j % len(palette)]
+        half = stats["density"] / (stats["density"].max(initial=0) or 1.0) * slot * 0.45
+        for i, category in enumerate(categories):
+            center = i - 0.4 + slot * (j + 0.5)
+            fig.add_trace(go.Scatter(
+                x=np.concatenate([center + half, center - half[::-1]]),
+                y=np.concatenate([stats["grid"], stats["grid"][::-1]]),
+                fill="toself", mode="lines", line=dict(color=color, width=1),
+                name=col, legendgroup=col, showlegend=i == 0, hoverinfo="skip",
+            ))
+            fig.add_trace(go.Box(
+                x=[center], q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+                lowerfence=[stats["lowerfence"]], upperfence=[stats["upperfence"]],
+                width=slot * 0.2, marker_color=color, line=dict(color=color),
+                fillcolor="rgba(255,255,255,0.6)", legendgroup=col, showlegend=False,
+                name=f"{col} · {category}",
+            ))
+            if sample is not None:
+                fig.add_trace(go.Scatter(
+                    x=center + rng.uniform(-slot * 0.3, slot * 0.3, len(sample)),
+                    y=sample[col], mode="markers", marker=dict(color=color, size=3, opacity=0.5),
+                    customdata=sample[category], legendgroup=col, showlegend=False,
+                    hovertemplate=(
+                        f"{col}<br>{category}<br>{value_label}=%{{y:.4g}}"
+                        f"<br>{hover_label or category}=%{{customdata:.4g}}<extra></extra>"
+                    ),
+                ))
+
+    fig.update_layout(
+        title=title, xaxis_title=category_label, yaxis_title=value_label,
+        legend_title_text=series_label,
+        xaxis=dict(tickmode="array", tickvals=list(range(len(categories))), ticktext=list(categories)),
+    )
+    return compact_figure(fig) if (encoding or PAYLOAD_ENCODING) == "compact" else fig
@@ -0,0 +1,145 @@
+# =========================================================
+# 🧊 Group-by Aggregation Cube for the Crime Dashboard
+# =========================================================
+"""Count / sum / sum-of-squares of the crime features per grouping dimension.
+
+The pages draw several per-group crime profiles (by ``crime_cluster``,
+``male_category``, ``age``, ...).  ``AggregationCube`` squares the value matrix
+once and reduces it into every dimension with ``np.bincount``; means,
+variances and the melted views used by the bar and radar charts are then
+derived from those sufficient statistics without rescanning the data.
+Adding a dimension such as ``state`` or ``city_cat`` costs one ``bincount``
+per value column.
+
+Cubes are additive: ``merge`` folds in a cube built from another chunk of
+rows, so a dataset can be aggregated one chunk at a time, and ``regroup``
+coarsens a dimension (e.g. exact ``male`` values into tertiles) without
+revisiting the rows.  A pickled (or deep-copied) cube keeps only these
+statistics, not the rows it was built from.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class AggregationCube:
+    """Per-group count, sum and sum of squares of ``value_cols``.
+
+    ``dimensions`` is a list of column names of ``df`` or a mapping of
+    dimension name to a Series/array of keys aligned with ``df``.
+    """
+
+    def __init__(self, df, value_cols, dimensions=()):
+        self.value_cols = list(value_cols)
+        values = df[self.value_cols].to_numpy(dtype=float)
+        self._present = ~np.isnan(values)
+        self._values = np.where(self._present, values, 0.0)
+        self._squares = self._values ** 2
+        self._stats = {}
+        if not isinstance(dimensions, dict):
+            dimensions = {name: df[name] for name in dimensions}
+        for name, keys in dimensions.items():
+            self.add_dimension(name, keys)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_present=None, _values=None, _squares=None)
+        return state
+
+    def add_dimension(self, name, keys):
+        """Reduce the value matrix into the groups of ``keys``."""
+        if self._values is None:
+            raise ValueError("this cube was restored from its statistics; its rows are gone")
+        keys = keys if isinstance(keys, pd.Series) else pd.Series(keys)
+        codes, uniques = pd.factorize(keys, sort=True)
+        valid = codes >= 0
+        codes = codes[valid]
+        size = len(uniques)
+
+        def reduce(matrix):
+            return np.column_stack([
+                np.bincount(codes, weights=matrix[valid, i], minlength=size)
+                for i in range(matrix.shape[1])
+            ])
+
+        self._stats[name] = {
+            "keys": uniques,
+            "count": reduce(self._present.astype(float)),
+            "sum": reduce(self._values),
+            "sumsq": reduce(self._squares),
+        }
+        return self
+
+    def merge(self, other):
+        """Add the statistics of ``other`` (built on other rows) into this cube."""
+        for name, theirs in other._stats.items():
+            mine = self._stats.get(name)
+            if mine is None:
+                self._stats[name] = {field: value.copy() for field, value in theirs.items()}
+                continue
+            keys = pd.Index(np.concatenate([np.asarray(mine["keys"]), np.asarray(theirs["keys"])])).unique()
+            keys = keys.sort_values()
+            ours_at, theirs_at = keys.get_indexer(mine["keys"]), keys.get_indexer(theirs["keys"])
+            merged = {"keys": keys}
+            for field in ("count", "sum", "sumsq"):
+                total = np.zeros((len(keys), len(self.value_cols)))
+                total[ours_at] += mine[field]
+                total[theirs_at] += theirs[field]
+                merged[field] = total
+            self._stats[name] = merged
+        return self
+
+    def regroup(self, name, new_name, key_map):
+        """Add dimension ``new_name`` by mapping the groups of ``name`` through ``key_map``.
+
+        ``key_map`` receives the keys of ``name`` and returns one new key per
+        group (e.g. ``pd.cut`` into bins); the statistics of groups that share a
+        new key are summed.
+        """
+        stats = self._stats[name]
+        new_keys = key_map(stats["keys"])
+        codes, uniques = pd.factorize(new_keys if isinstance(new_keys, pd.Series) else pd.Series(new_keys), sort=True)
+        valid = codes >= 0
+        regrouped = {"keys": uniques}
+        for field in ("count", "sum", "sumsq"):
+            total = np.zeros((len(uniques), len(self.value_cols)))
+            np.add.at(total, codes[valid], stats[field][valid])
+            regrouped[field] = total
+        self._stats[new_name] = regrouped
+        return self
+
+    @property
+    def dimensions(self):
+        return list(self._stats)
+
+    def _frame(self, name, matrix):
+        stats = self._stats[name]
+        keys = stats["keys"]
+        frame = pd.DataFrame(matrix, columns=self.value_cols)
+        frame.insert(0, name, keys if not isinstance(keys, pd.Index) else keys.to_numpy())
+        if isinstance(keys, pd.CategoricalIndex):
+            frame[name] = pd.Categorical(frame[name], categories=keys.categories, ordered=keys.ordered)
+        # Drop groups with no rows (unobserved categories), like groupby(observed=True).
+        return frame[stats["count"].sum(axis=1) > 0].reset_index(drop=True)
+
+    def counts(self, name):
+        return self._frame(name, self._stats[name]["count"])
+
+    def means(self, name):
+        """Equivalent of ``df.groupby(name)[value_cols].mean().reset_index()``."""
+        stats = self._stats[name]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self._frame(name, stats["sum"] / stats["count"])
+
+    def variances(self, name, ddof=1):
+        """Equivalent of ``df.groupby(name)[value_cols].var(ddof=ddof).reset_index()``."""
+        stats = self._stats[name]
+        n = stats["count"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = stats["sum"] / n
+            var = (stats["sumsq"] - n * mean ** 2) / (n - ddof)
+        return self._frame(name, np.maximum(var, 0.0))
+
+    def melted(self, name, var_name='Crime Type', value_name='Average Crime Score'):
+        """Long-format group means for bar charts."""
+        return self.means(name).melt(id_vars=name, var_name=var_name, value_name=value_name)
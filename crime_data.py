@@ -0,0 +1,573 @@
+# =========================================================
+# 📦 Shared Data Access for the Crime Analytics Dashboard
+# =========================================================
+"""Load ``df_crime_cleaned.csv`` once per server process for every page.
+
+Streamlit reruns each page script on every widget interaction, so reading the
+CSV at module top level re-downloads and re-parses it each time.  The loader
+below keeps a process-wide cache:
+
+* sources are revalidated at most once per ``ttl`` seconds; a URL is
+  mirrored by ``crime_sync``, which asks the server whether it changed
+  (``ETag`` / ``If-Modified-Since``) and downloads, verifies and swaps in
+  the file only when it did;
+* each distinct file version (sha256 of the bytes) is ingested once into a
+  typed Arrow IPC snapshot under ``data/snapshots/<digest>.v<schema>.arrow``,
+  with the compact dtypes of ``crime_schema`` (float32, narrow ints,
+  categoricals);
+* pages ask for the columns they use and get them from a memory-mapped read
+  of the snapshot, so parse time and memory scale with the projection rather
+  than with the width of the dataset;
+* sessions share those mapped columns (and matrices published with
+  ``shared_matrix``, such as the scaled features) zero-copy, so a new viewer
+  costs its UI state and filtered views, not another copy of the dataset;
+* ``invalidate_cache()`` drops everything (or one source) explicitly.
+
+Sources larger than ``CRIME_STREAM_THRESHOLD`` bytes (or every source, with
+``CRIME_STREAMING=1``) are not read into memory: ``crime_stream`` streams them
+once in chunks into online statistics, and the cached "dataset" is a uniform
+row sample; ``stream_summary()`` returns the statistics for pages to render
+exact profiles and trendlines from.
+
+The remote URL is ``CRIME_DATA_URL``.  When it is unreachable the last good
+mirror is served; without one the loader falls back to a local copy
+(``CRIME_DATA_PATH`` or ``data/df_crime_cleaned.csv``) so the dashboard still
+starts offline.
+
+``append_rows(rows)`` appends to the local dataset file and serves the new
+version without re-reading the old bytes: the sha256 state of each version
+is kept, and the new snapshot is the old one's segments plus a delta segment
+holding only the rows (``<digest>.v<schema>.segments.json`` lists them).
+Past ``CRIME_MAX_SEGMENTS`` segments (default 16) they are compacted into one
+file.  Files only the superseded version used are removed.
+
+Run ``python -m crime_data ingest [SOURCE]`` to build the snapshot ahead of
+time, ``python -m crime_data sync [URL]`` to revalidate the mirror, and
+``python -m crime_data schema [SOURCE]`` to see the memory saved per column.
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from crime_schema import SCHEMA_VERSION, apply_schema, memory_report
+from crime_stream import SAMPLE_ROWS, summarize
+from crime_sync import dataset_sync
+
+# ---------------------------------------------------------
+# SOURCES
+# ---------------------------------------------------------
+DATASET_URL = os.environ.get(
+    "CRIME_DATA_URL",
+    "https://raw.githubusercontent.com/s22a0064-AinMaisarah/Crime/refs/heads/main/df_crime_cleaned.csv",
+)
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+LOCAL_DATASET = os.environ.get("CRIME_DATA_PATH", os.path.join(DATA_DIR, "df_crime_cleaned.csv"))
+SNAPSHOT_DIR = os.environ.get("CRIME_SNAPSHOT_DIR", os.path.join(DATA_DIR, "snapshots"))
+CACHE_TTL = float(os.environ.get("CRIME_DATA_TTL", 3600))
+FETCH_TIMEOUT = 15
+RETRY_AFTER = 60
+# "auto" streams sources above STREAM_THRESHOLD bytes; "1"/"0" force it on/off.
+STREAMING = os.environ.get("CRIME_STREAMING", "auto")
+STREAM_THRESHOLD = int(os.environ.get("CRIME_STREAM_THRESHOLD", 512 * 2 ** 20))
+MAX_SEGMENTS = int(os.environ.get("CRIME_MAX_SEGMENTS", 16))
+
+if int(pd.__version__.split(".")[0]) < 3:
+    # Default from pandas 3 on; session frames share the cached columns.
+    pd.set_option("mode.copy_on_write", True)
+
+_lock = threading.Lock()
+_fetched = {}    # source -> (fetched_at, digest)
+_failed = {}     # source -> failed_at, so an offline URL isn't retried every rerun
+_snapshots = {}  # digest -> snapshot path, list of segment paths, or a DataFrame if it couldn't be written
+_frames = {}     # (digest, columns) -> projected DataFrame
+_summaries = {}  # digest -> StreamSummary for streamed sources
+_hashers = {}    # digest -> sha256 state of its bytes, so appends hash only the new rows
+
+
+def is_remote(source):
+    """Return True for http(s) sources."""
+    return str(source).startswith(("http://", "https://"))
+
+
+def open_source(source):
+    """Open a URL or local file path for binary reading."""
+    if is_remote(source):
+        return urllib.request.urlopen(source, timeout=FETCH_TIMEOUT)
+    return open(source, "rb")
+
+
+def read_source_bytes(source):
+    """Read the raw bytes of a URL or local file path."""
+    with open_source(source) as fh:
+        return fh.read()
+
+
+def source_size(source, handle):
+    """Size in bytes of an opened source, or None if the server doesn't say."""
+    if is_remote(source):
+        length = handle.headers.get("Content-Length")
+        return int(length) if length else None
+    return os.fstat(handle.fileno()).st_size
+
+
+def use_streaming(size):
+    if STREAMING == "auto":
+        return size is not None and size > STREAM_THRESHOLD
+    return STREAMING == "1"
+
+
+def default_sources():
+    """Sources tried in order: explicit override, remote URL, local copy."""
+    override = os.environ.get("CRIME_DATA_SOURCE")
+    sources = [override] if override else []
+    sources += [DATASET_URL, LOCAL_DATASET]
+    return sources
+
+
+# ---------------------------------------------------------
+# COLUMNAR SNAPSHOTS
+# ---------------------------------------------------------
+def snapshot_path(digest):
+    return os.path.join(SNAPSHOT_DIR, f"{digest}.v{SCHEMA_VERSION}.arrow")
+
+
+def segments_path(digest):
+    return os.path.join(SNAPSHOT_DIR, f"{digest}.v{SCHEMA_VERSION}.segments.json")
+
+
+def delta_path(digest):
+    return os.path.join(SNAPSHOT_DIR, f"{digest}.v{SCHEMA_VERSION}.delta.arrow")
+
+
+def derived_path(key, name):
+    """Location of a derived columnar artifact (e.g. a PCA projection)."""
+    return os.path.join(SNAPSHOT_DIR, f"{key}.{name}.arrow")
+
+
+def write_snapshot(df, path):
+    """Write ``df`` as an uncompressed Arrow IPC file (memory-mappable)."""
+    _write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+
+
+def _write_table(table, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def read_snapshot(path, columns=None):
+    """Memory-map a snapshot and materialise only ``columns``.
+
+    ``split_blocks`` keeps one block per column, so numeric columns are
+    read-only views of the mapped file rather than a consolidated copy.
+    """
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    if columns is not None:
+        table = table.select(list(columns))
+    return table.to_pandas(split_blocks=True)
+
+
+def read_segments(parts, columns=None):
+    """Read a snapshot path, or concatenate a list of segment paths (oldest first)."""
+    if isinstance(parts, str):
+        return read_snapshot(parts, columns)
+    frames = [read_snapshot(path, columns) for path in parts]
+    if len(frames) == 1:
+        return frames[0]
+    # Segments infer their own integer widths and categories; reconcile them.
+    return apply_schema(pd.concat(frames, ignore_index=True))
+
+
+def append_segment(parts, rows, path, max_segments=MAX_SEGMENTS):
+    """Write ``rows`` to ``path`` as the segment after ``parts``; returns the new segment list.
+
+    Only ``rows`` are written.  Once there would be more than
+    ``max_segments`` segments, everything is compacted into one file at
+    ``path`` instead and the old segments are removed.
+    """
+    parts = [parts] if isinstance(parts, str) else list(parts)
+    if len(parts) < max_segments:
+        write_snapshot(rows, path)
+        return parts + [path]
+    write_snapshot(apply_schema(pd.concat([read_segments(parts), rows], ignore_index=True)), path)
+    remove_files(parts)
+    return [path]
+
+
+def remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def write_matrix(X, path):
+    """Write a 2-D float matrix row-major as one fixed-size-list Arrow column."""
+    X = np.ascontiguousarray(X)
+    values = pa.FixedSizeListArray.from_arrays(pa.array(X.reshape(-1)), X.shape[1])
+    _write_table(pa.table({"row": values}), path)
+
+
+def read_matrix(path):
+    """Zero-copy, read-only view of a matrix written by ``write_matrix``."""
+    column = pa.ipc.open_file(pa.memory_map(path, "r")).read_all().column("row").combine_chunks()
+    return column.values.to_numpy(zero_copy_only=True).reshape(len(column), column.type.list_size)
+
+
+def shared_matrix(key, name, compute):
+    """Matrix ``name`` derived from dataset ``key``, published once per host.
+
+    The first caller runs ``compute()`` and writes the result next to the
+    snapshots; every session and server process then maps the same file, so
+    the pages share one copy in the OS page cache.  Falls back to the
+    in-memory (read-only) result when the snapshot store is not writable.
+    """
+    path = derived_path(key, f"v{SCHEMA_VERSION}.{name}")
+    if not os.path.exists(path):
+        X = compute()
+        try:
+            write_matrix(X, path)
+        except OSError:
+            X = np.array(X)
+            X.setflags(write=False)
+            return X
+    return read_matrix(path)
+
+
+def _store(df, path):
+    try:
+        write_snapshot(df, path)
+    except OSError:
+        # Read-only deployment: keep the parsed frame in memory instead.
+        return df
+    return path
+
+
+def stored_snapshot(digest):
+    """Snapshot of ``digest`` already on disk (a path or a segment list), or None."""
+    path = snapshot_path(digest)
+    if os.path.exists(path):
+        return path
+    try:
+        with open(segments_path(digest), encoding="utf-8") as fh:
+            parts = [os.path.join(SNAPSHOT_DIR, name) for name in json.load(fh)]
+    except (OSError, ValueError):
+        return None
+    return parts if all(os.path.exists(part) for part in parts) else None
+
+
+def write_segments(digest, parts):
+    path = segments_path(digest)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump([os.path.relpath(part, SNAPSHOT_DIR) for part in parts], fh)
+    os.replace(tmp, path)
+
+
+def ingest(raw, digest):
+    """Convert raw CSV bytes into a snapshot once per content digest."""
+    stored = stored_snapshot(digest)
+    if stored is not None:
+        return stored
+    return _store(apply_schema(pd.read_csv(io.BytesIO(raw))), snapshot_path(digest))
+
+
+def ingest_sample(summary, digest):
+    """Snapshot the row sample of a streamed source."""
+    path = derived_path(digest, f"v{SCHEMA_VERSION}.sample{SAMPLE_ROWS}")
+    if os.path.exists(path):
+        return path
+    return _store(summary.sample.frame, path)
+
+
+# ---------------------------------------------------------
+# CACHE
+# ---------------------------------------------------------
+def _fetch(source, ttl):
+    """Return the digest of ``source``, ingesting a new version if needed."""
+    now = time.monotonic()
+    with _lock:
+        entry = _fetched.get(source)
+        if entry is not None and now - entry[0] < ttl and entry[1] in _snapshots:
+            return entry[1]
+        failed_at = _failed.get(source)
+        if failed_at is not None and now - failed_at < RETRY_AFTER:
+            raise OSError("source failed recently; retry pending")
+
+    raw = summary = hasher = None
+    try:
+        path, digest = _resolve(source)
+        with _lock:
+            snapshot = _snapshots.get(digest)
+        if snapshot is None and digest is not None and not use_streaming(os.path.getsize(path)):
+            # Unchanged mirror whose snapshot is already on disk: nothing to re-read.
+            snapshot = stored_snapshot(digest)
+        if snapshot is None:
+            hasher = hashlib.sha256()
+            with open_source(path) as handle:
+                if use_streaming(source_size(path, handle)):
+                    digest, summary = summarize(handle, hasher=hasher)
+                else:
+                    raw = handle.read()
+                    hasher.update(raw)
+                    digest = hasher.hexdigest()
+    except OSError:
+        with _lock:
+            _failed[source] = now
+        raise
+
+    with _lock:
+        if hasher is not None:
+            _hashers[digest] = hasher
+        if summary is not None:
+            _summaries[digest] = summary
+        if digest not in _snapshots:
+            if snapshot is None:
+                snapshot = ingest(raw, digest) if summary is None else ingest_sample(summary, digest)
+            _snapshots[digest] = snapshot
+        previous = _fetched.get(source)
+        if previous is not None and previous[1] != digest:
+            _forget_digest(previous[1])
+        _fetched[source] = (now, digest)
+        _failed.pop(source, None)
+    return digest
+
+
+def _resolve(source):
+    """``(path to read, known digest or None)`` for ``source``.
+
+    A URL is synced into its local mirror first; the mirror's digest is
+    known from the sync, so an unchanged source keeps its digest (and every
+    cache keyed by it) without re-reading the file.
+    """
+    if not is_remote(source):
+        return source, None
+    sync = dataset_sync(source, timeout=FETCH_TIMEOUT, retry_after=RETRY_AFTER)
+    if not sync.writable() and sync.last_good() is None:
+        # Read-only deployment without a mirror: read the URL itself.
+        return source, None
+    result = sync.sync()
+    return result.path, result.sha256
+
+
+def _forget_digest(digest):
+    _snapshots.pop(digest, None)
+    _summaries.pop(digest, None)
+    _hashers.pop(digest, None)
+    for key in [k for k in _frames if k[0] == digest]:
+        del _frames[key]
+
+
+def _projected(digest, columns):
+    key = (digest, None if columns is None else tuple(columns))
+    with _lock:
+        frame = _frames.get(key)
+        if frame is not None:
+            return frame
+        snapshot = _snapshots[digest]
+    if isinstance(snapshot, pd.DataFrame):
+        frame = snapshot if columns is None else snapshot[list(columns)]
+    else:
+        frame = read_segments(snapshot, columns)
+    with _lock:
+        _frames[key] = frame
+    return frame
+
+
+def load_crime_data(columns=None, source=None, ttl=CACHE_TTL):
+    """Return a private copy of the crime dataset, served from the process cache.
+
+    ``columns`` limits the result to the columns a page declares.  If
+    ``source`` is None the default sources are tried in order and the first
+    one that can be read wins.  Pages receive a shallow copy: its columns are
+    the cached (memory-mapped) ones, and copy-on-write copies a column only if
+    the page modifies it, so adding derived columns never touches the cached
+    frame.  For a streamed source this is the uniform row sample (see
+    ``stream_summary``).
+    """
+    digest = dataset_digest(source, ttl)
+    return _projected(digest, columns).copy(deep=False)
+
+
+def dataset_digest(source=None, ttl=CACHE_TTL):
+    """Content hash of the dataset currently served for ``source``."""
+    sources = [source] if source is not None else default_sources()
+    errors = []
+    for candidate in sources:
+        try:
+            return _fetch(candidate, ttl)
+        except (OSError, ValueError) as exc:
+            errors.append(f"{candidate}: {exc}")
+    raise RuntimeError("Could not load the crime dataset from any source:\n" + "\n".join(errors))
+
+
+def stream_summary(source=None, ttl=CACHE_TTL):
+    """``StreamSummary`` of the current dataset if it was streamed, else None."""
+    digest = dataset_digest(source, ttl)
+    with _lock:
+        return _summaries.get(digest)
+
+
+def dataset_snapshot(source=None, ttl=CACHE_TTL):
+    """Snapshot of the current dataset: a path, a list of segment paths, or the in-memory frame."""
+    digest = dataset_digest(source, ttl)
+    with _lock:
+        return _snapshots[digest]
+
+
+def invalidate_cache(source=None):
+    """Forget cached bytes and frames for one source, or for all sources."""
+    with _lock:
+        if source is None:
+            _fetched.clear()
+            _failed.clear()
+            _snapshots.clear()
+            _frames.clear()
+            _summaries.clear()
+            _hashers.clear()
+            return
+        _failed.pop(source, None)
+        entry = _fetched.pop(source, None)
+        if entry is not None and all(d != entry[1] for _, d in _fetched.values()):
+            _forget_digest(entry[1])
+
+
+# ---------------------------------------------------------
+# APPENDS
+# ---------------------------------------------------------
+def local_source():
+    """First configured source that is a local file (the one appends go to)."""
+    for source in default_sources():
+        if not is_remote(source):
+            return source
+    raise ValueError("no local dataset file is configured")
+
+
+def append_rows(rows, path=None):
+    """Append ``rows`` to a local CSV dataset and serve the new version.
+
+    Only the new lines are written and, while the previous version's hash
+    state is cached, only they are hashed.  The new snapshot is the previous
+    one's segments plus a segment of ``rows`` (for a streamed source, the
+    summary absorbs ``rows``).  Returns ``(old_digest, new_digest)``.
+    """
+    path = path or local_source()
+    if is_remote(path):
+        raise ValueError(f"can only append to a local dataset file, not {path}")
+    old = dataset_digest(path)
+    with open(path, "rb") as fh:
+        header = next(csv.reader([fh.readline().decode()]))
+        needs_newline = False
+        if fh.seek(0, os.SEEK_END) > 0:
+            fh.seek(-1, os.SEEK_END)
+            needs_newline = fh.read(1) != b"\n"
+    missing = [column for column in header if column not in rows.columns]
+    if missing:
+        raise ValueError(f"appended rows lack columns: {', '.join(missing)}")
+    if rows.empty:
+        return old, old
+    payload = (b"\n" if needs_newline else b"") + rows[header].to_csv(header=False, index=False).encode()
+
+    with open(path, "ab") as fh:
+        fh.write(payload)
+    with _lock:
+        hasher = _hashers.get(old)
+        snapshot = _snapshots.get(old)
+        summary = _summaries.get(old)
+    if hasher is None:
+        hasher = hashlib.sha256(read_source_bytes(path))
+    else:
+        hasher = hasher.copy()
+        hasher.update(payload)
+    new = hasher.hexdigest()
+
+    added = apply_schema(rows[header].reset_index(drop=True), infer=False)
+    if summary is not None:
+        snapshot = ingest_sample(summary.update(added), new)
+    elif isinstance(snapshot, pd.DataFrame):
+        snapshot = apply_schema(pd.concat([snapshot, added], ignore_index=True))
+    else:
+        try:
+            snapshot = append_segment(snapshot, added, delta_path(new))
+            write_segments(new, snapshot)
+        except OSError:
+            snapshot = apply_schema(pd.concat([read_segments(snapshot), added], ignore_index=True))
+    _remove_superseded(old, snapshot)
+    with _lock:
+        _forget_digest(old)
+        _snapshots[new] = snapshot
+        _hashers[new] = hasher
+        if summary is not None:
+            _summaries[new] = summary
+        _fetched[path] = (time.monotonic(), new)
+    return old, new
+
+
+def _remove_superseded(digest, snapshot):
+    """Delete the files of version ``digest`` that ``snapshot`` (its successor) does not use."""
+    keep = set(snapshot) if isinstance(snapshot, list) else {snapshot} if isinstance(snapshot, str) else set()
+    remove_files(path for path in (
+        snapshot_path(digest), delta_path(digest), segments_path(digest),
+        derived_path(digest, f"v{SCHEMA_VERSION}.sample{SAMPLE_ROWS}"),
+    ) if path not in keep)
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m crime_data", description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest_cmd = sub.add_parser("ingest", help="convert the CSV into a columnar snapshot")
+    ingest_cmd.add_argument("source", nargs="?", help="URL or CSV path (default: configured sources)")
+    sync_cmd = sub.add_parser("sync", help="revalidate the local mirror of the remote dataset")
+    sync_cmd.add_argument("url", nargs="?", default=DATASET_URL, help="dataset URL (default: CRIME_DATA_URL)")
+    sync_cmd.add_argument("--force", action="store_true", help="ignore the retry back-off after a failure")
+    schema_cmd = sub.add_parser("schema", help="show the compact dtypes and the memory saved per column")
+    schema_cmd.add_argument("source", nargs="?", help="URL or CSV path (default: configured sources)")
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        digest = dataset_digest(args.source, ttl=0)
+        snapshot = _snapshots[digest]
+        print(snapshot if isinstance(snapshot, str) else f"in-memory only ({digest})")
+    elif args.command == "sync":
+        result = dataset_sync(args.url, timeout=FETCH_TIMEOUT, retry_after=RETRY_AFTER).sync(force=args.force)
+        print(f"{result.status}: {result.path} (sha256 {result.sha256})")
+        if result.error:
+            print(f"source error: {result.error}")
+    elif args.command == "schema":
+        sources = [args.source] if args.source else default_sources()
+        for candidate in sources:
+            try:
+                raw = read_source_bytes(candidate)
+                break
+            except OSError:
+                continue
+        else:
+            raise SystemExit("Could not read the crime dataset from any source")
+        inferred = pd.read_csv(io.BytesIO(raw))
+        report = memory_report(inferred, apply_schema(inferred))
+        print(report.to_string(index=False))
+        total_before, total_after = report['bytes_before'].sum(), report['bytes_after'].sum()
+        print(f"\ntotal: {total_before:,} → {total_after:,} bytes "
+              f"({100 * (total_before - total_after) / max(total_before, 1):.1f}% saved)")
+
+
+if __name__ == "__main__":
+    main()
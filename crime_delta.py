@@ -0,0 +1,228 @@
+# =========================================================
+# ➕ Incremental Updates for Appended Rows
+# =========================================================
+"""Absorb a batch of new rows without recomputing the dashboard from scratch.
+
+``IncrementalState`` holds the statistics the pages derive from the dataset,
+and none of its rows:
+
+* the online statistics of ``crime_stream.StreamSummary`` — scaler moments,
+  the group-sum cube behind the gender/age profiles, the male-share sketch
+  and the OLS moments behind the trendlines (not its row sample);
+* the K-Means fit (scaler + centroids) and a cube of crime sums per cluster;
+* the PCA model and the scatter matrix used to check it against exact PCA.
+
+``append(rows, history)`` folds the rows into the statistics, labels them
+against the existing centroids and projects them with the existing PCA model,
+so its cost grows with the batch, not with the history.  It then measures
+drift:
+
+* the mean squared distance of rows appended since the last fit to their
+  centroid, relative to the same cost at fit time, and
+* how far the feature means have moved, in standard deviations of the fit.
+
+When either crosses ``drift_threshold`` (``CRIME_DRIFT_THRESHOLD``, default
+0.25) the clusters and PCA are refitted on every row, which ``history()``
+reads back from the dataset.  The labels and projection of the rows the last
+fit or append touched are in ``row_labels``/``row_projection``; they are
+written out as artifacts, never saved with the state.
+
+States are pickled next to the snapshots, keyed by dataset digest, so
+``python -m crime_pipeline append`` can chain appends across processes; the
+pickle stays the same size however many rows have been appended.
+"""
+
+import copy
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from crime_cube import AggregationCube
+from crime_data import SNAPSHOT_DIR, remove_files
+from crime_models import (
+    array_chunks, default_engine, explained_variance_from_moments, fit_clusters, fit_pca, nearest_centers,
+    scatter_moments,
+)
+from crime_schema import CRIME_FEATURES, SCHEMA_VERSION, TREND_TARGET, apply_schema
+from crime_stream import STREAM_CHUNK_ROWS, Reservoir, StreamSummary
+
+DRIFT_THRESHOLD = float(os.environ.get("CRIME_DRIFT_THRESHOLD", 0.25))
+N_CLUSTERS = 3
+
+
+class IncrementalState:
+    """Dataset-derived statistics that absorb appended rows in O(batch)."""
+
+    def __init__(self, df, summary=None, n_clusters=N_CLUSTERS, drift_threshold=DRIFT_THRESHOLD):
+        """Fit on ``df``; for a streamed source pass its ``StreamSummary`` as ``summary``.
+
+        With a summary, ``df`` is the row sample: clusters and PCA are fitted
+        on it (as the pipeline does) and the aggregates start from a copy of
+        the summary, which covers every row.
+        """
+        self.n_clusters = n_clusters
+        self.drift_threshold = drift_threshold
+        if summary is not None:
+            # The row sample stays with crime_data, which serves it to the pages.
+            self.summary = copy.deepcopy(summary, {id(summary.sample): Reservoir(0)})
+        else:
+            self.summary = StreamSummary(sample_rows=0)
+            for start in range(0, len(df), STREAM_CHUNK_ROWS):
+                self.summary.update(df.iloc[start:start + STREAM_CHUNK_ROWS])
+        self.refits = 0
+        self._fit(np.asarray(df[CRIME_FEATURES], dtype=np.float32))
+
+    def __getstate__(self):
+        # Per-row outputs go to the artifacts; the saved state is statistics only.
+        state = self.__dict__.copy()
+        state.update(row_labels=None, row_projection=None)
+        return state
+
+    # -----------------------------------------------------
+    # FULL FIT
+    # -----------------------------------------------------
+    @property
+    def n_rows(self):
+        return self.summary.n_rows
+
+    def _fit(self, X):
+        fit = fit_clusters(array_chunks(X), n_clusters=self.n_clusters, engine=default_engine(len(X)))
+        labels = fit.labels.astype(np.int32)
+        self.cluster_fit = fit._replace(labels=None)
+        X_scaled = fit.scaler.transform(X)
+        self.pca_fit = fit_pca(array_chunks(X_scaled), n_rows=len(X), n_features=len(CRIME_FEATURES))
+        self.scatter = scatter_moments(array_chunks(X_scaled))
+        self.cluster_cube = AggregationCube(
+            pd.DataFrame(X, columns=CRIME_FEATURES), CRIME_FEATURES, {'crime_cluster': labels}
+        )
+        self.inertia = fit.inertia
+        self.fit_cost = fit.inertia / len(X)
+        self.fit_means = fit.scaler.mean_.copy()
+        self.fit_scales = fit.scaler.scale_.copy()
+        self._delta_rows, self._delta_cost = 0, 0.0
+        self.row_labels, self.row_projection = labels, self.pca_fit.model.transform(X_scaled)
+        self.rows_appended = False
+
+    # -----------------------------------------------------
+    # APPEND
+    # -----------------------------------------------------
+    def _assign(self, X_scaled):
+        labels, distances = nearest_centers(X_scaled, self.cluster_fit.centers)
+        return labels.astype(np.int32), self.pca_fit.model.transform(X_scaled), distances
+
+    def relabel(self, X):
+        """Label and project feature rows ``X`` (e.g. a resampled row sample) under the current fit."""
+        X_scaled = self.cluster_fit.scaler.transform(np.asarray(X, dtype=np.float32))
+        self.row_labels, self.row_projection, _ = self._assign(X_scaled)
+        self.rows_appended = False
+
+    def drift(self):
+        """Largest of the centroid-cost increase and the feature-mean shift."""
+        cost_drift = 0.0
+        if self._delta_rows:
+            cost_drift = self._delta_cost / self._delta_rows / self.fit_cost - 1
+        mean_shift = np.max(np.abs(self.summary.scaler.mean_ - self.fit_means) / self.fit_scales)
+        return float(max(cost_drift, mean_shift))
+
+    def append(self, rows, history):
+        """Fold ``rows`` into every statistic; refit if drift crosses the threshold.
+
+        ``history()`` returns the crime features of every row, ``rows``
+        included, and is only called for a refit.  Returns a report with the
+        batch size, new labels, drift and whether a refit ran.
+        """
+        start = time.perf_counter()
+        rows = apply_schema(rows.reset_index(drop=True), infer=False)
+        self.summary.update(rows)
+        X_scaled = self.cluster_fit.scaler.transform(rows[CRIME_FEATURES].to_numpy(dtype=np.float32))
+        labels, projection, distances = self._assign(X_scaled)
+        n, total, scatter = self.scatter
+        X_wide = X_scaled.astype(np.float64)
+        self.scatter = (n + len(X_wide), total + X_wide.sum(axis=0), scatter + X_wide.T @ X_wide)
+        self.cluster_cube.merge(AggregationCube(rows, CRIME_FEATURES, {'crime_cluster': labels}))
+        self.inertia += float(distances.sum())
+        self._delta_rows += len(rows)
+        self._delta_cost += float(distances.sum())
+        self.row_labels, self.row_projection, self.rows_appended = labels, projection, True
+
+        drift = self.drift()
+        refit = drift > self.drift_threshold
+        if refit:
+            self._fit(np.asarray(history(), dtype=np.float32))
+            self.refits += 1
+        return {
+            "rows": len(rows),
+            "total_rows": self.n_rows,
+            "labels": np.bincount(labels, minlength=self.n_clusters).tolist(),
+            "drift": round(drift, 4),
+            "refit": refit,
+            "seconds": round(time.perf_counter() - start, 4),
+        }
+
+    # -----------------------------------------------------
+    # ARTIFACTS
+    # -----------------------------------------------------
+    def artifacts(self):
+        """``{name: (frame, meta)}`` in the format of the pipeline builders.
+
+        ``pca`` and ``clusters`` cover the rows of the last fit or append:
+        only the appended batch when ``rows_appended`` is True.
+        """
+        cluster_meta = {
+            "n_clusters": self.n_clusters,
+            "engine": self.cluster_fit.engine,
+            "inertia": self.inertia,
+            "fit_seconds": self.cluster_fit.fit_seconds,
+        }
+        # The model is only refitted on drift; compare it with exact PCA on every row so far.
+        fitted = self.pca_fit.explained_variance_ratio
+        exact = explained_variance_from_moments(*self.scatter)[:len(fitted)]
+        pca_meta = {
+            "engine": self.pca_fit.engine,
+            "explained_variance_ratio": [float(v) for v in fitted],
+            "exact_explained_variance_ratio": [float(v) for v in exact],
+            "max_abs_error": float(np.max(np.abs(fitted - exact))),
+            "fit_seconds": self.pca_fit.fit_seconds,
+        }
+        projection = self.row_projection
+        return {
+            "pca": (pd.DataFrame({'PC1': projection[:, 0], 'PC2': projection[:, 1]}), pca_meta),
+            "clusters": (pd.DataFrame({'crime_cluster': self.row_labels}), cluster_meta),
+            "cluster_profile": (self.cluster_cube.melted('crime_cluster'), {}),
+            "trendlines": (self.summary.trendlines(), {"target": TREND_TARGET}),
+            "male_means": (self.summary.male_means(), {}),
+            "age_means": (self.summary.means('age'), {}),
+        }
+
+
+# ---------------------------------------------------------
+# PERSISTENCE
+# ---------------------------------------------------------
+def state_path(digest):
+    return os.path.join(SNAPSHOT_DIR, f"{digest}.v{SCHEMA_VERSION}.state.pkl")
+
+
+def save_state(digest, state):
+    path = state_path(digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        pickle.dump(state, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return path
+
+
+def remove_state(digest):
+    remove_files([state_path(digest)])
+
+
+def load_state(digest):
+    """The saved ``IncrementalState`` for ``digest``, or None."""
+    try:
+        with open(state_path(digest), "rb") as fh:
+            return pickle.load(fh)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
@@ -0,0 +1,245 @@
+# =========================================================
+# 🖼️ Persistent Figure Cache for the Crime Dashboard
+# =========================================================
+"""Serialize each Plotly figure once per dataset version and parameters.
+
+Most charts depend only on the dataset and a few widget values, yet every
+rerun rebuilds them and ``st.plotly_chart`` re-serializes them to JSON.
+``FigureCache`` keeps the serialized spec instead:
+
+* keys come from ``figure_key(name, data_key, **params)`` — the chart name,
+  the dataset digest, the parameters it depends on (engine, selected
+  cluster, cross-filter, ...), ``FIGURE_VERSION`` and the Plotly version;
+* an in-memory LRU of ``CRIME_FIGURE_ENTRIES`` specs (default 64) sits in
+  front of ``data/figures/<key>.json`` (``CRIME_FIGURE_DIR``), which is
+  trimmed, least recently used first, to ``CRIME_FIGURE_BYTES`` (default
+  256 MiB) and survives restarts;
+* ``show_figure`` sends a cached spec to the browser as is, so a hit skips
+  both figure construction and serialization; with ``on_select`` it returns
+  the selection event like ``st.plotly_chart``.  If this Streamlit build
+  does not expose the chart internals it relies on, the spec is parsed back
+  into a figure and drawn with ``st.plotly_chart``.
+
+Keys also cover the payload encoding (``crime_charts.PAYLOAD_ENCODING`` and
+``PAYLOAD_PRECISION``), since it changes the spec.
+
+Bump ``FIGURE_VERSION`` when chart code changes so stale specs are not
+served.
+"""
+
+import hashlib
+import importlib.metadata
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from crime_charts import PAYLOAD_ENCODING, PAYLOAD_PRECISION
+from crime_data import DATA_DIR
+from crime_lazy import lazy_import
+
+pio = lazy_import("plotly.io")
+
+FIGURE_VERSION = 5
+FIGURE_DIR = os.environ.get("CRIME_FIGURE_DIR", os.path.join(DATA_DIR, "figures"))
+FIGURE_ENTRIES = int(os.environ.get("CRIME_FIGURE_ENTRIES", 64))
+FIGURE_BYTES = int(os.environ.get("CRIME_FIGURE_BYTES", 256 * 2 ** 20))
+
+
+def _plotly_version():
+    try:
+        return importlib.metadata.version("plotly")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+PLOTLY_VERSION = _plotly_version()
+
+
+def figure_key(name, data_key, **params):
+    """Cache key for chart ``name`` of dataset ``data_key`` with ``params``."""
+    payload = json.dumps(
+        [name, data_key, params, FIGURE_VERSION, PLOTLY_VERSION, PAYLOAD_ENCODING, PAYLOAD_PRECISION],
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class FigureEntry:
+    """A serialized figure plus the layout size ``st.plotly_chart`` would read from it."""
+
+    __slots__ = ("spec", "width", "height")
+
+    def __init__(self, spec, width=None, height=None):
+        self.spec = spec
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def from_figure(cls, fig):
+        return cls(pio.to_json(fig, validate=False), fig.layout.width, fig.layout.height)
+
+    def dumps(self):
+        return json.dumps({"width": self.width, "height": self.height}) + "\n" + self.spec
+
+    @classmethod
+    def loads(cls, text):
+        header, spec = text.split("\n", 1)
+        return cls(spec, **json.loads(header))
+
+
+class FigureCache:
+    """In-memory LRU of figure specs backed by a size-bounded directory."""
+
+    def __init__(self, directory=FIGURE_DIR, entries=FIGURE_ENTRIES, max_bytes=FIGURE_BYTES):
+        self.directory = directory
+        self.entries = entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> FigureEntry, least recently used first
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Cached entry for ``key`` (memory, then disk), or None."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as fh:
+                entry = FigureEntry.loads(fh.read())
+            os.utime(path)  # mark as recently used for disk eviction
+        except (OSError, ValueError, TypeError):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        self._remember(key, entry)
+        path = self._path(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(entry.dumps())
+            os.replace(tmp, path)
+            self._trim()
+        except OSError:
+            pass  # read-only deployment: the in-memory LRU still applies
+        return entry
+
+    def _trim(self):
+        files = []
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if item.name.endswith(".json"):
+                    info = item.stat()
+                    files.append((info.st_mtime, info.st_size, item.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def fetch(self, key, build):
+        """``(entry, hit)`` for ``key``, building and storing the figure on a miss.
+
+        A None ``key`` disables caching for this call.
+        """
+        entry = self.get(key) if key is not None else None
+        if entry is not None:
+            return entry, True
+        entry = FigureEntry.from_figure(build())
+        if key is not None:
+            self.put(key, entry)
+        return entry, False
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+
+figure_cache = FigureCache()
+
+
+# ---------------------------------------------------------
+# RENDERING
+# ---------------------------------------------------------
+def _chart_width(use_container_width, width):
+    if use_container_width is None:
+        return width
+    return "stretch" if use_container_width else "content"
+
+
+def show_figure(entry, target=None, use_container_width=None, width="stretch", height="content",
+                theme="streamlit", config=None, key=None, on_select="ignore",
+                selection_mode=("points", "box", "lasso")):
+    """Draw a cached spec like ``st.plotly_chart`` does, without re-serializing it.
+
+    With ``on_select="rerun"`` the chart is a widget and the selection event
+    is returned, as from ``st.plotly_chart``.
+    """
+    target = target or st
+    width = _chart_width(use_container_width, width)
+    try:
+        from streamlit.elements.lib.form_utils import current_form_id
+        from streamlit.elements.lib.layout_utils import LayoutConfig
+        from streamlit.elements.lib.utils import compute_and_register_element_id, to_key
+        from streamlit.elements.plotly_chart import (
+            PlotlyChartSelectionSerde, _resolve_content_height, _resolve_content_width, parse_selection_mode,
+        )
+        from streamlit.elements.lib.policies import check_widget_policies
+        from streamlit.proto.PlotlyChart_pb2 import PlotlyChart as PlotlyChartProto
+        from streamlit.runtime.scriptrunner_utils.script_run_context import get_script_run_ctx
+        from streamlit.runtime.state import register_widget
+        dg = st._main if target is st else target
+    except (ImportError, AttributeError):
+        return target.plotly_chart(
+            pio.from_json(entry.spec), width=width, height=height, theme=theme, config=config, key=key,
+            on_select=on_select, selection_mode=selection_mode,
+        )
+
+    key = to_key(key)
+    selectable = on_select != "ignore"
+    if selectable:
+        check_widget_policies(dg, key, on_change=None, default_value=None, writes_allowed=False,
+                              enable_check_callback_rules=False)
+    proto = PlotlyChartProto()
+    proto.theme = theme or ""
+    proto.form_id = current_form_id(dg)
+    proto.spec = entry.spec
+    proto.config = json.dumps(config or {})
+    proto.id = compute_and_register_element_id(
+        "plotly_chart", user_key=key, key_as_main_identity=False, dg=dg,
+        plotly_spec=proto.spec, plotly_config=proto.config, selection_mode=selection_mode,
+        is_selection_activated=selectable, theme=theme, width=width, height=height, alt=None,
+    )
+    layout = {"layout": {"width": entry.width, "height": entry.height}}
+    layout_config = LayoutConfig(
+        width=_resolve_content_width(width, layout), height=_resolve_content_height(height, layout),
+    )
+    if not selectable:
+        return dg._enqueue("plotly_chart", proto, layout_config=layout_config)
+    proto.selection_mode.extend(parse_selection_mode(selection_mode))
+    serde = PlotlyChartSelectionSerde()
+    state = register_widget(proto.id, on_change_handler=None, deserializer=serde.deserialize,
+                            serializer=serde.serialize, ctx=get_script_run_ctx(), value_type="string_value")
+    dg._enqueue("plotly_chart", proto, layout_config=layout_config)
+    return state.value
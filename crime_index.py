@@ -0,0 +1,221 @@
+# =========================================================
+# 🗂️ Filter Indexes & Cross-Filtering for the Crime Dashboard
+# =========================================================
+"""Resolve dimension filters from indexes built once per dataset version.
+
+A ``FilterIndex`` is built once per dataset digest, for the dimensions every
+page can filter on:
+
+* categorical dimensions (``state``, ``city_cat``, ``age``) keep, for each
+  value, the sorted row positions holding it — a sparse bitmap — plus the
+  category code of every row;
+* numeric dimensions (``income``, ``poverty``) keep the row order that sorts
+  the column, so a ``(low, high)`` range is two binary searches.
+
+``select(where)`` takes the same conditions as the dataframe backends (a
+value, a list of values, or a ``(low, high)`` range per column).  It starts
+from the most selective condition's positions and checks the other
+conditions on those rows only, so a query costs O(log n + matching rows)
+rather than a boolean mask over every row.
+
+``cross_filter(index)`` draws the shared filter sidebar.  The selection
+is kept in ``st.session_state`` and survives page switches, so every page
+(and every chart on it) shows the same slice of the data.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from crime_data import dataset_digest, load_crime_data
+
+CATEGORICAL_DIMENSIONS = ['state', 'city_cat', 'age']
+NUMERIC_DIMENSIONS = ['income', 'poverty']
+FILTER_LABELS = {
+    'state': "State",
+    'city_cat': "City category",
+    'age': "Age group",
+    'income': "Income",
+    'poverty': "Poverty %",
+}
+SELECTION_KEY = "cross_filter"
+MAX_INDEXES = 4
+
+_lock = threading.Lock()
+_indexes = {}  # digest -> FilterIndex
+
+
+class FilterIndex:
+    """Per-value row positions and sorted orders for the filter dimensions."""
+
+    def __init__(self, df, categorical=CATEGORICAL_DIMENSIONS, numeric=NUMERIC_DIMENSIONS):
+        self.n_rows = len(df)
+        self._positions = {}  # dimension -> {value: sorted row positions}
+        self._codes = {}      # dimension -> (code per row, categories)
+        self._sorted = {}     # dimension -> (sorted values, row order, values)
+        for name in categorical:
+            column = df[name] if isinstance(df[name].dtype, pd.CategoricalDtype) else df[name].astype("category")
+            codes = column.cat.codes.to_numpy()
+            categories = list(column.cat.categories)
+            # A stable sort keeps positions ascending within each code.
+            order = np.argsort(codes, kind="stable").astype(np.int64)
+            bounds = np.searchsorted(codes[order], np.arange(len(categories) + 1))
+            self._positions[name] = {
+                value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(categories)
+            }
+            self._codes[name] = (codes, categories)
+        for name in numeric:
+            values = np.asarray(df[name], dtype=float)
+            order = np.argsort(values, kind="stable").astype(np.int64)
+            self._sorted[name] = (values[order], order, values)
+
+    @property
+    def dimensions(self):
+        return list(self._positions) + list(self._sorted)
+
+    def is_numeric(self, name):
+        return name in self._sorted
+
+    def values(self, name):
+        """Distinct values of a categorical dimension."""
+        return list(self._codes[name][1])
+
+    def bounds(self, name):
+        """``(min, max)`` of a numeric dimension, ignoring missing values."""
+        ordered = self._sorted[name][0]
+        finite = ordered[~np.isnan(ordered)]
+        return (float(finite[0]), float(finite[-1])) if len(finite) else (0.0, 0.0)
+
+    def count(self, name, condition):
+        """Rows matching one condition, without materialising them."""
+        if name in self._sorted:
+            low, high = self._range(name, condition)
+            return high - low
+        return sum(len(self._positions[name].get(value, ())) for value in _as_values(condition))
+
+    def _range(self, name, condition):
+        ordered = self._sorted[name][0]
+        low, high = condition
+        return int(np.searchsorted(ordered, low, side="left")), int(np.searchsorted(ordered, high, side="right"))
+
+    def _candidates(self, name, condition):
+        if name in self._sorted:
+            low, high = self._range(name, condition)
+            return np.sort(self._sorted[name][1][low:high])
+        parts = [self._positions[name].get(value, np.empty(0, dtype=np.int64)) for value in _as_values(condition)]
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+    def _matches(self, name, condition, rows):
+        if name in self._sorted:
+            values = self._sorted[name][2][rows]
+            low, high = condition
+            return (values >= low) & (values <= high)
+        codes, categories = self._codes[name]
+        wanted = [categories.index(value) for value in _as_values(condition) if value in categories]
+        return np.isin(codes[rows], wanted)
+
+    def select(self, where):
+        """Sorted row positions matching every condition, or None when ``where`` is empty."""
+        conditions = [(name, condition) for name, condition in (where or {}).items() if condition is not None]
+        if not conditions:
+            return None
+        conditions.sort(key=lambda item: self.count(*item))
+        name, condition = conditions[0]
+        rows = self._candidates(name, condition)
+        for name, condition in conditions[1:]:
+            if not len(rows):
+                break
+            rows = rows[self._matches(name, condition, rows)]
+        return rows
+
+
+def _as_values(condition):
+    return list(condition) if isinstance(condition, (list, set, frozenset)) else [condition]
+
+
+def intersect(rows, other):
+    """Intersection of two sorted position arrays; None stands for every row."""
+    if rows is None:
+        return other
+    if other is None:
+        return rows
+    return np.intersect1d(rows, other, assume_unique=True)
+
+
+def filter_index(source=None):
+    """``FilterIndex`` of the current dataset, built once per digest."""
+    digest = dataset_digest(source)
+    with _lock:
+        index = _indexes.get(digest)
+    if index is None:
+        index = FilterIndex(load_crime_data(columns=CATEGORICAL_DIMENSIONS + NUMERIC_DIMENSIONS, source=source))
+        with _lock:
+            _indexes[digest] = index
+            while len(_indexes) > MAX_INDEXES:
+                _indexes.pop(next(iter(_indexes)))
+    return index
+
+
+# ---------------------------------------------------------
+# CROSS-FILTER SIDEBAR
+# ---------------------------------------------------------
+def _widget_value(key, default):
+    # Widget state is dropped on page switches; restore it from the shared selection.
+    if key not in st.session_state:
+        st.session_state[key] = st.session_state.get(f"_{key}", default)
+    return key
+
+
+def _reset(index):
+    for name in index.dimensions:
+        st.session_state.pop(f"filter_{name}", None)
+        st.session_state.pop(f"_filter_{name}", None)
+    st.session_state.pop(SELECTION_KEY, None)
+
+
+def filter_sidebar(index):
+    """Draw the shared filters in the sidebar; return the active ``where`` conditions."""
+    where = {}
+    with st.sidebar:
+        st.markdown("### 🗂️ Cross-filter")
+        for name in index.dimensions:
+            key = f"filter_{name}"
+            if index.is_numeric(name):
+                low, high = index.bounds(name)
+                if low >= high:
+                    continue
+                chosen = st.slider(FILTER_LABELS.get(name, name), low, high, key=_widget_value(key, (low, high)))
+                if tuple(chosen) != (low, high):
+                    where[name] = tuple(chosen)
+            else:
+                chosen = st.multiselect(FILTER_LABELS.get(name, name), index.values(name), key=_widget_value(key, []),
+                                        placeholder="All")
+                if chosen:
+                    where[name] = list(chosen)
+            st.session_state[f"_{key}"] = chosen
+        st.button("Reset filters", on_click=_reset, args=(index,), disabled=not where)
+    st.session_state[SELECTION_KEY] = where
+    return where
+
+
+def cross_filter(index):
+    """Filter sidebar plus the matching row positions.
+
+    Returns ``(rows, where)``; ``rows`` is None when nothing is selected.
+    Stops the page when no row matches.
+    """
+    where = filter_sidebar(index)
+    rows = index.select(where)
+    if rows is not None:
+        if not len(rows):
+            st.warning("No rows match the current filters — widen or reset them in the sidebar.")
+            st.stop()
+        st.sidebar.caption(f"{len(rows):,} of {index.n_rows:,} rows selected")
+    return rows, where
+
+
+def take(df, rows):
+    """Rows of ``df`` at ``rows``, or ``df`` itself for no selection."""
+    return df if rows is None else df.iloc[rows]
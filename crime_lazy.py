@@ -0,0 +1,136 @@
+# =========================================================
+# 💤 Lazy Imports & Import Profiler for the Crime Dashboard
+# =========================================================
+"""Defer heavy libraries until a section actually needs them.
+
+``lazy_import("sklearn.cluster")`` returns a stand-in module that performs
+the real import on first attribute access, so pages and helpers can keep
+module-level names (``px.scatter``, ``sklearn_cluster.KMeans``) while the
+landing page renders before scikit-learn, SciPy or Plotly are loaded.
+
+Every deferred import is timed.  ``mark_first_paint()`` records the time from
+the first script run to the page's first content and, unless
+``CRIME_WARMUP=0``, starts a daemon thread that preloads ``WARMUP_MODULES``
+in the background.  ``import_report()`` returns both for the performance
+panel.
+"""
+
+import importlib
+import os
+import sys
+import threading
+import time
+
+START = time.perf_counter()
+WARMUP = os.environ.get("CRIME_WARMUP", "1") == "1"
+WARMUP_MODULES = [
+    "plotly.express",
+    "plotly.graph_objects",
+    "sklearn.preprocessing",
+    "sklearn.cluster",
+    "sklearn.decomposition",
+    "sklearn.metrics",
+    "scipy.stats",
+]
+
+_lock = threading.Lock()
+# Held while a module is first imported: two threads importing different parts
+# of one package (sklearn.cluster and sklearn.preprocessing) can otherwise each
+# see the other's half-initialised sklearn.base.
+_import_lock = threading.RLock()
+_import_times = {}   # module -> {"seconds", "thread", "at"}
+_first_paint = None
+_warmup_thread = None
+
+
+def timed_import(name):
+    """Import ``name`` and record how long it took (first time only).
+
+    Always goes through ``importlib`` so a module that another thread is
+    still initialising is waited for rather than returned half-built, and
+    first imports run one at a time.
+    """
+    if name in sys.modules:
+        return importlib.import_module(name)
+    with _import_lock:
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        seconds = time.perf_counter() - start
+    with _lock:
+        _import_times.setdefault(name, {
+            "seconds": round(seconds, 4),
+            "thread": threading.current_thread().name,
+            "at": round(start - START, 4),
+        })
+    return module
+
+
+class LazyModule:
+    """Module stand-in that imports the real module on first attribute access."""
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = timed_import(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+
+
+def lazy_import(name):
+    """Return a ``LazyModule`` for ``name``; nothing is imported yet."""
+    return LazyModule(name)
+
+
+# ---------------------------------------------------------
+# FIRST PAINT & WARM-UP
+# ---------------------------------------------------------
+def _warmup(modules):
+    for name in modules:
+        try:
+            timed_import(name)
+        except ImportError:
+            continue
+
+
+def start_warmup(modules=None):
+    """Preload ``modules`` on a daemon thread (once per process)."""
+    global _warmup_thread
+    with _lock:
+        if _warmup_thread is not None:
+            return _warmup_thread
+        _warmup_thread = threading.Thread(
+            target=_warmup, args=(modules or WARMUP_MODULES,), name="crime-warmup", daemon=True
+        )
+    _warmup_thread.start()
+    return _warmup_thread
+
+
+def mark_first_paint():
+    """Record time-to-first-paint once per process and kick off the warm-up."""
+    global _first_paint
+    with _lock:
+        if _first_paint is None:
+            _first_paint = round(time.perf_counter() - START, 4)
+    if WARMUP:
+        start_warmup()
+
+
+def import_report():
+    """Time-to-first-paint and every profiled import, for logs and the panel."""
+    with _lock:
+        imports = sorted(
+            ({"module": name, **info} for name, info in _import_times.items()),
+            key=lambda item: item["at"],
+        )
+        return {"first_paint_seconds": _first_paint, "imports": imports}
@@ -0,0 +1,317 @@
+# =========================================================
+# 🤖 Clustering & Model Helpers for the Crime Dashboard
+# =========================================================
+"""Model fitting shared by the dashboard pages.
+
+The elbow sweep fits one k-means model per k.  Those fits are independent, so
+they run concurrently on a process pool and their results are memoized by a
+hash of the scaled matrix: a rerun with unchanged data costs nothing.  The
+memo keeps the ``CRIME_SWEEP_ENTRIES`` most recently used fits (default 256,
+one per k), so cross-filter selections cannot grow it without bound.
+
+``fit_clusters`` offers two engines for the final clustering: ``"exact"``
+(full-batch ``KMeans``) and ``"minibatch"``, which streams over chunks so that
+scaler statistics and centroids are accumulated with ``partial_fit`` and
+memory stays bounded by the chunk size.
+
+``fit_pca`` likewise chooses between exact, randomized and incremental PCA
+from the row count and available memory, and ``write_projection`` streams
+``PC1``/``PC2`` chunk by chunk into an Arrow file in the snapshot store.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from crime_lazy import lazy_import
+from crime_progress import checkpoint
+
+# scikit-learn and pyarrow load on first use so pages render before them.
+pa = lazy_import("pyarrow")
+sklearn_cluster = lazy_import("sklearn.cluster")
+sklearn_decomposition = lazy_import("sklearn.decomposition")
+sklearn_metrics = lazy_import("sklearn.metrics")
+sklearn_preprocessing = lazy_import("sklearn.preprocessing")
+
+RANDOM_STATE = 42
+DEFAULT_K_RANGE = range(2, 10)
+DEFAULT_N_INIT = 10
+SILHOUETTE_SAMPLE = 10_000
+CHUNK_SIZE = 100_000
+MINIBATCH_ROWS = 500_000
+CLUSTER_ENGINES = {"exact": "Exact (KMeans)", "minibatch": "Mini-batch (streaming)"}
+RANDOMIZED_PCA_ROWS = 1_000_000
+PCA_ENGINES = {
+    "auto": "Auto",
+    "exact": "Exact (full SVD)",
+    "randomized": "Randomized SVD",
+    "incremental": "Incremental (chunked)",
+}
+MAX_WORKERS = int(os.environ.get("CRIME_MODEL_WORKERS", 0)) or min(8, os.cpu_count() or 1)
+SWEEP_ENTRIES = int(os.environ.get("CRIME_SWEEP_ENTRIES", 256))
+
+_lock = threading.Lock()
+_pool = None
+# (digest, k, n_init, silhouette) -> (inertia, silhouette), least recently used first
+_sweep_cache = OrderedDict()
+
+
+def array_digest(X):
+    """Stable content hash of a numeric matrix (shape, dtype and values)."""
+    X = np.ascontiguousarray(X)
+    h = hashlib.sha256()
+    h.update(repr((X.shape, X.dtype.str)).encode())
+    h.update(X.tobytes())
+    return h.hexdigest()
+
+
+def _get_pool():
+    # "spawn" keeps workers independent of the threads Streamlit runs in.
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+# ---------------------------------------------------------
+# ELBOW SWEEP
+# ---------------------------------------------------------
+def fit_k(X, k, n_init=DEFAULT_N_INIT, silhouette=False):
+    """Fit one k-means model; return ``(k, inertia, silhouette or None)``."""
+    model = sklearn_cluster.KMeans(n_clusters=k, random_state=RANDOM_STATE, n_init=n_init).fit(X)
+    score = None
+    if silhouette:
+        sample = min(len(X), SILHOUETTE_SAMPLE)
+        score = float(sklearn_metrics.silhouette_score(
+            X, model.labels_, sample_size=sample, random_state=RANDOM_STATE
+        ))
+    return k, float(model.inertia_), score
+
+
+def elbow_sweep(X, k_range=DEFAULT_K_RANGE, n_init=DEFAULT_N_INIT, silhouette=False, parallel=True):
+    """Yield ``(k, inertia, silhouette)`` for every k, in completion order.
+
+    Cached k values are yielded immediately; the rest are fitted concurrently
+    and yielded as each one finishes so callers can draw progressively.
+    """
+    digest = array_digest(X)
+    pending = []
+    for k in k_range:
+        key = (digest, k, n_init, silhouette)
+        with _lock:
+            cached = _sweep_cache.get(key)
+            if cached is not None:
+                _sweep_cache.move_to_end(key)
+        if cached is not None:
+            yield (k,) + cached
+        else:
+            pending.append(k)
+    if not pending:
+        return
+
+    if parallel and len(pending) > 1 and MAX_WORKERS > 1:
+        pool = _get_pool()
+        futures = [pool.submit(fit_k, X, k, n_init, silhouette) for k in pending]
+        results = (future.result() for future in as_completed(futures))
+    else:
+        results = (fit_k(X, k, n_init, silhouette) for k in pending)
+
+    for k, inertia, score in results:
+        key = (digest, k, n_init, silhouette)
+        with _lock:
+            _sweep_cache[key] = (inertia, score)
+            _sweep_cache.move_to_end(key)
+            while len(_sweep_cache) > SWEEP_ENTRIES:
+                _sweep_cache.popitem(last=False)
+        yield k, inertia, score
+
+
+# ---------------------------------------------------------
+# CLUSTERING ENGINES
+# ---------------------------------------------------------
+ClusterFit = namedtuple("ClusterFit", "engine labels centers inertia fit_seconds scaler")
+
+
+def array_chunks(X, chunk_size=CHUNK_SIZE):
+    """Re-iterable chunk source over an in-memory array.
+
+    Engines call the returned function once per pass, so a source backed by a
+    file reader can stand in for it without changing the engines.  Every
+    chunk is a ``crime_progress.checkpoint``, so a cancelled background run
+    stops streaming engines between chunks.
+    """
+    def chunks():
+        for start in range(0, len(X), chunk_size):
+            checkpoint()
+            yield X[start:start + chunk_size]
+
+    return chunks
+
+
+def default_engine(n_rows):
+    return "minibatch" if n_rows > MINIBATCH_ROWS else "exact"
+
+
+def fit_streaming_scaler(chunks):
+    """Accumulate ``StandardScaler`` mean/variance over every chunk."""
+    scaler = sklearn_preprocessing.StandardScaler()
+    for chunk in chunks():
+        scaler.partial_fit(chunk)
+    return scaler
+
+
+def fit_clusters(chunks, n_clusters, engine="exact", n_init=DEFAULT_N_INIT, epochs=1, batch_size=4096):
+    """Scale and cluster the raw feature chunks; return a ``ClusterFit``."""
+    start = time.perf_counter()
+    if engine == "exact":
+        X = np.concatenate(list(chunks()))
+        scaler = sklearn_preprocessing.StandardScaler().fit(X)
+        model = sklearn_cluster.KMeans(n_clusters=n_clusters, random_state=RANDOM_STATE, n_init=n_init)
+        labels = model.fit_predict(scaler.transform(X))
+        inertia = float(model.inertia_)
+    elif engine == "minibatch":
+        scaler = fit_streaming_scaler(chunks)
+        model = sklearn_cluster.MiniBatchKMeans(
+            n_clusters=n_clusters, random_state=RANDOM_STATE, n_init=n_init, batch_size=batch_size
+        )
+        for _ in range(epochs):
+            for chunk in chunks():
+                X_chunk = scaler.transform(chunk)
+                for start_row in range(0, len(X_chunk), batch_size):
+                    model.partial_fit(X_chunk[start_row:start_row + batch_size])
+        parts, inertia = [], 0.0
+        for chunk in chunks():
+            X_chunk = scaler.transform(chunk)
+            chunk_labels = model.predict(X_chunk)
+            inertia += float(((X_chunk - model.cluster_centers_[chunk_labels]) ** 2).sum())
+            parts.append(chunk_labels.astype(np.int32))
+        labels = np.concatenate(parts)
+    else:
+        raise ValueError(f"Unknown clustering engine: {engine!r}")
+    return ClusterFit(engine, labels, model.cluster_centers_, inertia, time.perf_counter() - start, scaler)
+
+
+def nearest_centers(X_scaled, centers):
+    """Label rows by their nearest centroid; also return the squared distances."""
+    distances = ((X_scaled[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    labels = distances.argmin(axis=1)
+    return labels, distances[np.arange(len(labels)), labels]
+
+
+# ---------------------------------------------------------
+# PCA ENGINES
+# ---------------------------------------------------------
+PcaFit = namedtuple("PcaFit", "engine model explained_variance_ratio fit_seconds")
+
+
+def available_memory():
+    """Bytes of physical memory currently free, or None if unknown."""
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def choose_pca_engine(n_rows, n_features, free_bytes=None):
+    """Pick a PCA engine from the data size and the memory available.
+
+    A full SVD holds a few float64 copies of the matrix, so the exact and
+    randomized solvers are only used when that comfortably fits in memory.
+    """
+    free_bytes = available_memory() if free_bytes is None else free_bytes
+    matrix_bytes = n_rows * n_features * 8
+    if free_bytes is not None and matrix_bytes * 4 > free_bytes:
+        return "incremental"
+    if n_rows > RANDOMIZED_PCA_ROWS:
+        return "randomized"
+    return "exact"
+
+
+def scaled_chunks(chunks, scaler):
+    """Wrap a raw chunk source so that every chunk comes out scaled."""
+    return lambda: (scaler.transform(chunk) for chunk in chunks())
+
+
+def fit_pca(chunks, n_rows, n_features, n_components=2, engine="auto"):
+    """Fit PCA on a (scaled) chunk source and return a ``PcaFit``."""
+    if engine == "auto":
+        engine = choose_pca_engine(n_rows, n_features)
+    start = time.perf_counter()
+    if engine == "incremental":
+        model = sklearn_decomposition.IncrementalPCA(n_components=n_components)
+        for chunk in chunks():
+            model.partial_fit(chunk)
+    elif engine in ("exact", "randomized"):
+        solver = "full" if engine == "exact" else "randomized"
+        model = sklearn_decomposition.PCA(n_components=n_components, svd_solver=solver, random_state=RANDOM_STATE)
+        model.fit(np.concatenate(list(chunks())))
+    else:
+        raise ValueError(f"Unknown PCA engine: {engine!r}")
+    return PcaFit(engine, model, model.explained_variance_ratio_, time.perf_counter() - start)
+
+
+def scatter_moments(chunks):
+    """Row count, column sums and the d x d scatter matrix ``X.T @ X`` in one pass."""
+    n, total, scatter = 0, None, None
+    for chunk in chunks():
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if total is None:
+            total = np.zeros(chunk.shape[1])
+            scatter = np.zeros((chunk.shape[1], chunk.shape[1]))
+        n += len(chunk)
+        total += chunk.sum(axis=0)
+        scatter += chunk.T @ chunk
+    return n, total, scatter
+
+
+def explained_variance_from_moments(n, total, scatter):
+    mean = total / n
+    covariance = (scatter - n * np.outer(mean, mean)) / (n - 1)
+    eigenvalues = np.sort(np.linalg.eigvalsh(covariance))[::-1]
+    return eigenvalues / eigenvalues.sum()
+
+
+def exact_explained_variance(chunks):
+    """Exact explained-variance ratios from a one-pass covariance.
+
+    Only the d x d scatter matrix is kept in memory, so this checks any
+    engine against exact PCA without materialising the data.
+    """
+    return explained_variance_from_moments(*scatter_moments(chunks))
+
+
+def pca_diagnostics(pca_fit, chunks):
+    """Compare an engine's explained variance with exact PCA."""
+    exact = exact_explained_variance(chunks)[:len(pca_fit.explained_variance_ratio)]
+    return {
+        "engine": pca_fit.engine,
+        "explained_variance_ratio": [float(v) for v in pca_fit.explained_variance_ratio],
+        "exact_explained_variance_ratio": [float(v) for v in exact],
+        "max_abs_error": float(np.max(np.abs(pca_fit.explained_variance_ratio - exact))),
+    }
+
+
+def write_projection(chunks, model, path, names=("PC1", "PC2")):
+    """Stream the PCA projection of every chunk into an Arrow IPC file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    schema = pa.schema([(name, pa.float64()) for name in names])
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            for chunk in chunks():
+                projected = model.transform(chunk)
+                writer.write_batch(pa.record_batch(
+                    [pa.array(projected[:, i]) for i in range(len(names))], schema=schema
+                ))
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,203 @@
+# =========================================================
+# ⏱️ Performance Instrumentation for the Crime Dashboard
+# =========================================================
+"""Time and memory-track named page sections, per rerun.
+
+Each page creates a ``PagePerf`` at the top and wraps its work::
+
+    perf = PagePerf("Objectives1")
+    with perf.section("load"):
+        df = load_crime_data(...)
+    perf.plotly_chart("elbow", fig, use_container_width=True)
+    perf.cached_chart("radar", figure_key("radar", digest), build_radar, use_container_width=True)
+    ...
+    perf.finish()
+
+The sidebar toggle is off by default (``CRIME_PERF=1`` turns it on).  When
+it is off, ``section`` returns a shared no-op context and ``plotly_chart``
+calls straight through, so the overhead is a flag check.  When it is on,
+every section records wall time, chart sections also record the serialized
+figure size (and, for ``cached_chart``, the payload encoding and whether the
+figure cache hit), and ``finish`` shows the breakdown in the
+sidebar and appends one JSON line per rerun to ``CRIME_PERF_LOG`` together
+with the import profiler's time-to-first-paint and deferred import timings.
+
+Memory tracing is a separate opt-in (``CRIME_PERF_MEMORY=1``): it adds
+``process_peak_kb``, the peak ``tracemalloc`` allocation while the section
+was open.  tracemalloc is process wide, so the figure includes whatever
+other sessions allocated meanwhile, and every allocation in the process
+pays for the tracing, inflating the recorded times.  It runs only while a
+measured section is open.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+import streamlit as st
+
+from crime_charts import PAYLOAD_ENCODING
+from crime_figures import figure_cache, show_figure
+from crime_lazy import import_report
+
+PERF_DEFAULT = os.environ.get("CRIME_PERF", "0") == "1"
+PERF_MEMORY = os.environ.get("CRIME_PERF_MEMORY", "0") == "1"
+PERF_LOG = os.environ.get(
+    "CRIME_PERF_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "perf_log.jsonl"),
+)
+
+_NULL = contextlib.nullcontext()
+_log_lock = threading.Lock()
+_trace_lock = threading.Lock()
+_tracers = 0             # open top-level sections across sessions
+_started_tracing = False  # whether tracemalloc was started here (not by ``-X tracemalloc``)
+
+
+def _start_tracing():
+    global _tracers, _started_tracing
+    with _trace_lock:
+        if _tracers == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracers += 1
+
+
+def _stop_tracing():
+    global _tracers, _started_tracing
+    with _trace_lock:
+        _tracers -= 1
+        if _tracers == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+class PagePerf:
+    """Per-rerun section recorder for one page."""
+
+    def __init__(self, page):
+        self.page = page
+        self.enabled = st.sidebar.toggle("⏱️ Performance panel", value=PERF_DEFAULT, key="perf_panel")
+        self.records = []
+        self._depth = 0
+        self._thread = threading.current_thread()
+        self._started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def _timed(self, name, extra=None):
+        if not PERF_MEMORY:
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.record(name, time.perf_counter() - start, **(extra or {}))
+            return
+        if self._depth == 0:
+            _start_tracing()
+            tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            record = {
+                "section": name,
+                "seconds": round(seconds, 5),
+                "process_peak_kb": round(max(tracemalloc.get_traced_memory()[1] - base, 0) / 1024, 1),
+            }
+            record.update(extra or {})
+            self.records.append(record)
+            self._depth -= 1
+            if self._depth == 0:
+                _stop_tracing()
+
+    def section(self, name):
+        """Context manager timing ``name``; a shared no-op when disabled.
+
+        Outside the script thread (background tasks) only wall time is kept,
+        even with memory tracing on.
+        """
+        if not self.enabled:
+            return _NULL
+        return self._timed(name) if threading.current_thread() is self._thread else self._wall_time(name)
+
+    @contextlib.contextmanager
+    def _wall_time(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, thread="background")
+
+    def plotly_chart(self, name, fig, target=None, **kwargs):
+        """``st.plotly_chart`` (or ``target.plotly_chart``) that records payload size."""
+        target = target or st
+        if not self.enabled:
+            return target.plotly_chart(fig, **kwargs)
+        with self._timed(f"chart:{name}", {"payload_bytes": len(fig.to_json())}):
+            return target.plotly_chart(fig, **kwargs)
+
+    def cached_chart(self, name, cache_key, build, target=None, **kwargs):
+        """Draw the figure cached under ``cache_key``, calling ``build()`` only on a miss.
+
+        ``cache_key`` comes from ``crime_figures.figure_key``; None disables
+        caching.  ``kwargs`` go to ``show_figure`` (``key``, ``on_select``, ...).
+        """
+        return self.show_entry(name, *self.fetch(cache_key, build), target, **kwargs)
+
+    @staticmethod
+    def fetch(cache_key, build):
+        """``(entry, hit, build seconds)`` of a cached figure; safe to call from background tasks."""
+        start = time.perf_counter()
+        entry, hit = figure_cache.fetch(cache_key, build)
+        return entry, hit, time.perf_counter() - start
+
+    def show_entry(self, name, entry, hit, build_seconds, target=None, **kwargs):
+        """Draw a figure entry fetched elsewhere (e.g. by a background task) and record it."""
+        if not self.enabled:
+            return show_figure(entry, target, **kwargs)
+        extra = {"payload_bytes": len(entry.spec), "payload_encoding": PAYLOAD_ENCODING,
+                 "figure_cache": "hit" if hit else "miss", "build_seconds": round(build_seconds, 5)}
+        with self._timed(f"chart:{name}", extra):
+            return show_figure(entry, target, **kwargs)
+
+    def record(self, name, seconds, **extra):
+        """Record a section timed elsewhere (e.g. a background task)."""
+        if self.enabled:
+            self.records.append({"section": name, "seconds": round(seconds, 5), **extra})
+
+    def finish(self):
+        """Show the breakdown in the sidebar and append it to the log."""
+        if not self.enabled:
+            return
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "page": self.page,
+            "total_seconds": round(time.perf_counter() - self._started, 5),
+            "sections": self.records,
+            "imports": import_report(),
+        }
+        with st.sidebar.expander("⏱️ Rerun breakdown", expanded=True):
+            st.caption(f"Total script time: {entry['total_seconds']:.3f}s")
+            st.dataframe(self.records, use_container_width=True, hide_index=True)
+            first_paint = entry["imports"]["first_paint_seconds"]
+            if first_paint is not None:
+                st.caption(f"Time to first paint (first run): {first_paint:.3f}s")
+            if entry["imports"]["imports"]:
+                st.dataframe(entry["imports"]["imports"], use_container_width=True, hide_index=True)
+        append_log(entry)
+
+
+def append_log(entry, path=None):
+    path = path or PERF_LOG
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with _log_lock, open(path, "a") as fh:
+            fh.write(json.dumps(entry) + "\n")
+    except OSError:
+        pass
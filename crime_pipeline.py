@@ -0,0 +1,386 @@
+# =========================================================
+# 🏗️ Offline Precompute Pipeline for the Crime Dashboard
+# =========================================================
+"""Materialise every page's analytics artifacts ahead of time.
+
+    python -m crime_pipeline build [--source SOURCE] [--force]
+    python -m crime_pipeline append ROWS_CSV [--source PATH]
+    python -m crime_pipeline list
+
+Artifacts are Arrow tables written to ``data/artifacts/<dataset digest>/``
+together with a ``manifest.json`` that records each artifact's version and
+metadata (fit time, inertia, explained variance, ...).  A build only
+recomputes artifacts that are missing for the current dataset digest or whose
+``ARTIFACT_VERSIONS`` entry has changed, so an unchanged dataset builds in
+no time.  Pages call ``load_artifact`` and fall back to computing live when
+an artifact has not been built.
+
+The number of clusters comes from ``crime_selection.select_k`` (elbow,
+silhouette and gap statistic on a k-means coreset); only that k is fitted on
+every row.
+
+``append`` adds new rows to the local dataset file and writes the artifacts
+of the new version from an ``IncrementalState`` (see ``crime_delta``), which
+absorbs the rows in O(batch) and only refits the clusters and PCA on drift.
+Without a refit the per-row artifacts (``pca``, ``clusters``) gain a segment
+holding just the new rows, which the manifest lists after the previous
+version's segments.  The elbow sweep and the k selection are carried over,
+and the previous version's files that the new one does not use are removed.
+"""
+
+import argparse
+import json
+import os
+
+import pandas as pd
+
+from crime_cube import AggregationCube
+from crime_data import (
+    DATA_DIR, append_rows, append_segment, dataset_digest, load_crime_data, local_source, read_segments,
+    remove_files, stream_summary, write_snapshot,
+)
+from crime_delta import N_CLUSTERS, IncrementalState, load_state, remove_state, save_state
+from crime_models import (
+    DEFAULT_K_RANGE, DEFAULT_N_INIT, array_chunks, default_engine, elbow_sweep, fit_clusters,
+    fit_pca, fit_streaming_scaler, pca_diagnostics,
+)
+from crime_regression import fit_ols_batch
+from crime_schema import CRIME_FEATURES, MALE_LABELS, TREND_PREDICTORS, TREND_TARGET, apply_schema
+from crime_selection import select_k
+
+ARTIFACT_DIR = os.environ.get("CRIME_ARTIFACT_DIR", os.path.join(DATA_DIR, "artifacts"))
+
+# One row per dataset row; an append adds a segment with the new rows.
+ROW_ARTIFACTS = ("pca", "clusters")
+# Bump an entry when its builder changes so the next build recomputes it.
+ARTIFACT_VERSIONS = {
+    "elbow": 1,
+    "k_selection": 1,
+    "pca": 1,
+    "clusters": 2,
+    "cluster_profile": 2,
+    "trendlines": 2,
+    "male_means": 2,
+    "age_means": 1,
+}
+
+
+# ---------------------------------------------------------
+# BUILDERS
+# ---------------------------------------------------------
+class BuildContext:
+    """Dataset plus intermediate results shared between builders.
+
+    For a streamed source ``df`` is the row sample and ``summary`` holds the
+    online statistics over every row; builders of aggregate artifacts use it.
+    """
+
+    def __init__(self, df, summary=None):
+        self.df = df
+        self.summary = summary
+        self.chunks = array_chunks(df[CRIME_FEATURES].to_numpy())
+        self._cluster_fit = None
+        self._k_selection = None
+        self._X_scaled = None
+        self._demographic_cube = None
+
+    @property
+    def k_selection(self):
+        if self._k_selection is None:
+            self._k_selection = select_k(self.X_scaled, DEFAULT_K_RANGE, strata=self.df['city_cat'])
+        return self._k_selection
+
+    @property
+    def cluster_fit(self):
+        if self._cluster_fit is None:
+            self._cluster_fit = fit_clusters(
+                self.chunks, n_clusters=self.k_selection.k, engine=default_engine(len(self.df))
+            )
+        return self._cluster_fit
+
+    @property
+    def demographic_cube(self):
+        if self._demographic_cube is None:
+            self._demographic_cube = AggregationCube(self.df, CRIME_FEATURES, {
+                'male_category': pd.qcut(self.df['male'], q=3, labels=MALE_LABELS),
+                'age': self.df['age'],
+            })
+        return self._demographic_cube
+
+    @property
+    def X_scaled(self):
+        if self._X_scaled is None:
+            self._X_scaled = fit_streaming_scaler(self.chunks).transform(self.df[CRIME_FEATURES].to_numpy())
+        return self._X_scaled
+
+
+def build_elbow(ctx):
+    rows = sorted(elbow_sweep(ctx.X_scaled, DEFAULT_K_RANGE, DEFAULT_N_INIT))
+    return pd.DataFrame(rows, columns=['k', 'wcss', 'silhouette']).drop(columns='silhouette'), {
+        "k_range": [DEFAULT_K_RANGE.start, DEFAULT_K_RANGE.stop - 1],
+        "n_init": DEFAULT_N_INIT,
+    }
+
+
+def build_k_selection(ctx):
+    selection = ctx.k_selection
+    return selection.scores, {
+        "k": selection.k,
+        "picks": selection.picks,
+        "method": selection.method,
+        "sample_size": selection.sample_size,
+        "replicates": selection.replicates,
+        "seconds": selection.seconds,
+        "k_range": [DEFAULT_K_RANGE.start, DEFAULT_K_RANGE.stop - 1],
+    }
+
+
+def build_pca(ctx):
+    X_scaled = ctx.X_scaled
+    source = array_chunks(X_scaled)
+    pca_fit = fit_pca(source, n_rows=len(X_scaled), n_features=len(CRIME_FEATURES))
+    projected = pca_fit.model.transform(X_scaled)
+    meta = pca_diagnostics(pca_fit, source)
+    meta["fit_seconds"] = pca_fit.fit_seconds
+    return pd.DataFrame({'PC1': projected[:, 0], 'PC2': projected[:, 1]}), meta
+
+
+def build_clusters(ctx):
+    fit = ctx.cluster_fit
+    return pd.DataFrame({'crime_cluster': fit.labels}), {
+        "n_clusters": len(fit.centers),
+        "engine": fit.engine,
+        "inertia": fit.inertia,
+        "fit_seconds": fit.fit_seconds,
+    }
+
+
+def build_cluster_profile(ctx):
+    return AggregationCube(ctx.df, CRIME_FEATURES, {'crime_cluster': ctx.cluster_fit.labels}).melted('crime_cluster'), {}
+
+
+def build_trendlines(ctx):
+    """OLS fit of offense count on each predictor, overall and per city_cat."""
+    if ctx.summary is not None:
+        return ctx.summary.trendlines(), {"target": TREND_TARGET}
+    return fit_ols_batch(ctx.df, TREND_PREDICTORS, [TREND_TARGET], group='city_cat'), {"target": TREND_TARGET}
+
+
+def build_male_means(ctx):
+    if ctx.summary is not None:
+        return ctx.summary.male_means(), {}
+    return ctx.demographic_cube.melted('male_category'), {}
+
+
+def build_age_means(ctx):
+    if ctx.summary is not None:
+        return ctx.summary.means('age'), {}
+    return ctx.demographic_cube.means('age'), {}
+
+
+BUILDERS = {
+    "elbow": build_elbow,
+    "k_selection": build_k_selection,
+    "pca": build_pca,
+    "clusters": build_clusters,
+    "cluster_profile": build_cluster_profile,
+    "trendlines": build_trendlines,
+    "male_means": build_male_means,
+    "age_means": build_age_means,
+}
+
+
+# ---------------------------------------------------------
+# STORAGE
+# ---------------------------------------------------------
+def artifact_dir(digest):
+    return os.path.join(ARTIFACT_DIR, digest)
+
+
+def read_manifest(digest):
+    path = os.path.join(artifact_dir(digest), "manifest.json")
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(digest, manifest):
+    path = os.path.join(artifact_dir(digest), "manifest.json")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def artifact_parts(digest, manifest, name):
+    """Files of artifact ``name``: its segments, oldest first, or its one file."""
+    segments = manifest[name].get("segments")
+    if segments:
+        return [os.path.join(ARTIFACT_DIR, part) for part in segments]
+    return [os.path.join(artifact_dir(digest), f"{name}.arrow")]
+
+
+def _is_current(manifest, digest, name):
+    entry = manifest.get(name)
+    return (
+        entry is not None
+        and entry.get("version") == ARTIFACT_VERSIONS[name]
+        and all(os.path.exists(path) for path in artifact_parts(digest, manifest, name))
+    )
+
+
+def build(source=None, force=False, names=None):
+    """Build every stale artifact for the current dataset; return their names."""
+    digest = dataset_digest(source)
+    manifest = read_manifest(digest)
+    stale = [n for n in (names or BUILDERS) if force or not _is_current(manifest, digest, n)]
+    if not stale:
+        return []
+
+    os.makedirs(artifact_dir(digest), exist_ok=True)
+    ctx = BuildContext(load_crime_data(source=source), stream_summary(source))
+    for name in stale:
+        frame, meta = BUILDERS[name](ctx)
+        _write_artifact(digest, manifest, name, frame, meta)
+    return stale
+
+
+def _write_artifact(digest, manifest, name, frame, meta):
+    write_snapshot(frame, os.path.join(artifact_dir(digest), f"{name}.arrow"))
+    manifest[name] = {"version": ARTIFACT_VERSIONS[name], "rows": len(frame), "meta": meta}
+    write_manifest(digest, manifest)
+
+
+def _append_artifact(digest, manifest, name, frame, meta, parts, rows):
+    """Store ``frame`` as the segment of ``name`` after the previous version's ``parts``."""
+    parts = append_segment(parts, frame, os.path.join(artifact_dir(digest), f"{name}.arrow"))
+    manifest[name] = {
+        "version": ARTIFACT_VERSIONS[name], "rows": rows + len(frame), "meta": meta,
+        "segments": [os.path.relpath(part, ARTIFACT_DIR) for part in parts],
+    }
+    write_manifest(digest, manifest)
+
+
+def _remove_superseded(old, old_manifest, digest, manifest):
+    """Delete the artifacts of version ``old`` that version ``digest`` does not read."""
+    keep = {path for name in manifest for path in artifact_parts(digest, manifest, name)}
+    directory = artifact_dir(old)
+    try:
+        paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+    except OSError:
+        paths = []
+    remove_files(path for path in paths if path not in keep)
+    # Compacted segments may have emptied the directories of earlier versions too.
+    directories = {directory} | {
+        os.path.dirname(path) for name in old_manifest for path in artifact_parts(old, old_manifest, name)
+    }
+    for path in directories:
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass  # still holds segments the new version reads
+
+
+def append(rows, source=None):
+    """Append ``rows`` to the local dataset and write the new version's artifacts.
+
+    Returns ``(new digest, report)`` where the report comes from
+    ``IncrementalState.append``.  The state is saved under the new digest so
+    the next append starts from it; the previous version's state and unused
+    artifacts are removed.
+    """
+    if rows.empty:
+        raise ValueError("no rows to append")
+    source = source or local_source()
+    old = dataset_digest(source)
+    state = load_state(old)
+    old_manifest = read_manifest(old)
+    if state is None:
+        _, selection = load_artifact("k_selection", old)
+        state = IncrementalState(
+            load_crime_data(source=source), stream_summary(source),
+            n_clusters=selection["k"] if selection else N_CLUSTERS,
+        )
+    _, digest = append_rows(rows, source)
+
+    def history():
+        return load_crime_data(columns=CRIME_FEATURES, source=source)
+
+    report = state.append(rows, history)
+    if stream_summary(source) is not None and not report["refit"]:
+        # The row sample was resampled; label all of it (its size is bounded).
+        state.relabel(history())
+
+    os.makedirs(artifact_dir(digest), exist_ok=True)
+    manifest = read_manifest(digest)
+    for name, (frame, meta) in state.artifacts().items():
+        if name not in ROW_ARTIFACTS or not state.rows_appended:
+            _write_artifact(digest, manifest, name, frame, meta)
+        elif _is_current(old_manifest, old, name):
+            _append_artifact(digest, manifest, name, frame, meta,
+                             artifact_parts(old, old_manifest, name), old_manifest[name]["rows"])
+        # else: the previous rows' artifact is missing; pages compute it live.
+    for name in ("elbow", "k_selection"):
+        if _is_current(old_manifest, old, name):
+            frame = read_segments(artifact_parts(old, old_manifest, name))
+            _write_artifact(digest, manifest, name, frame, {**old_manifest[name]["meta"], "dataset": old})
+    save_state(digest, state)
+    remove_state(old)
+    _remove_superseded(old, old_manifest, digest, manifest)
+    return digest, report
+
+
+def load_artifact(name, digest=None):
+    """Return ``(frame, meta)`` for a current artifact, or ``(None, None)``."""
+    try:
+        digest = digest or dataset_digest()
+    except RuntimeError:
+        return None, None
+    manifest = read_manifest(digest)
+    if not _is_current(manifest, digest, name):
+        return None, None
+    frame = read_segments(artifact_parts(digest, manifest, name))
+    return apply_schema(frame, infer=False), manifest[name]["meta"]
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m crime_pipeline", description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="compute stale artifacts for the current dataset")
+    build_cmd.add_argument("--source", help="URL or CSV path (default: configured sources)")
+    build_cmd.add_argument("--force", action="store_true", help="rebuild every artifact")
+    build_cmd.add_argument("artifacts", nargs="*", help=f"subset to build ({', '.join(BUILDERS)})")
+    append_cmd = sub.add_parser("append", help="append rows from a CSV and update artifacts incrementally")
+    append_cmd.add_argument("rows", help="CSV file with the new rows (same columns as the dataset)")
+    append_cmd.add_argument("--source", help="local dataset CSV to append to (default: first local source)")
+    list_cmd = sub.add_parser("list", help="show artifacts for the current dataset")
+    list_cmd.add_argument("--source", help="URL or CSV path (default: configured sources)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        unknown = sorted(set(args.artifacts) - set(BUILDERS))
+        if unknown:
+            parser.error(f"unknown artifacts: {', '.join(unknown)}")
+        built = build(args.source, force=args.force, names=args.artifacts or None)
+        print(f"built: {', '.join(built)}" if built else "all artifacts up to date")
+    elif args.command == "append":
+        digest, report = append(pd.read_csv(args.rows), args.source)
+        print(f"dataset {digest}")
+        for key, value in report.items():
+            print(f"  {key:<12} {value}")
+    elif args.command == "list":
+        digest = dataset_digest(args.source)
+        manifest = read_manifest(digest)
+        print(f"dataset {digest}")
+        for name in BUILDERS:
+            state = "current" if _is_current(manifest, digest, name) else "missing/stale"
+            print(f"  {name:<16} {state}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+# =========================================================
+# ⏳ Progressive Rendering & Background Work for the Crime Dashboard
+# =========================================================
+"""Paint cheap content first; fill slow sections in as they finish.
+
+Streamlit runs a page top to bottom, so a slow fit leaves everything below
+it blank.  A page instead creates one ``BackgroundRun`` per script run and:
+
+* ``submit(name, fn, *args)`` hands slow work to a shared thread pool
+  (``CRIME_BACKGROUND_WORKERS``, default 4).  Arguments that are other
+  ``Task``s are replaced by their results, and the task only starts once
+  they are done, so chains (k selection → k-means) never hold a worker
+  while they wait;
+* ``render(tasks, draw, label)`` reserves a spot on the page and shows a
+  placeholder there; ``chart(...)`` does the same for a cached figure,
+  building it in the background on a cache miss;
+* after the cheap content (previews, KPIs, insight text) has been written,
+  ``drain()`` calls each ``draw`` in its spot as soon as its tasks are done.
+  A task or ``draw`` that raises shows the error in its own spot; the other
+  sections still fill in;
+* a long task can ``publish(value)`` partial results (e.g. the elbow points
+  fitted so far); while a section waits, its ``preview(value)`` redraws the
+  placeholder with the latest one.
+
+A new run of the same session (a widget change, a rerun, navigating to
+another page) cancels the previous run's tasks: those not yet started are
+dropped, and running ones stop at their next ``checkpoint()``.  While it
+waits, ``drain`` updates the placeholders with the elapsed time, which
+also lets Streamlit interrupt the run; an interrupted ``drain`` cancels its
+own tasks.
+"""
+
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+
+from crime_lazy import lazy_import
+
+# The model modules use ``checkpoint`` outside Streamlit too (pipeline CLI).
+st = lazy_import("streamlit")
+
+BACKGROUND_WORKERS = int(os.environ.get("CRIME_BACKGROUND_WORKERS", 4))
+HEARTBEAT_SECONDS = 0.25
+RUN_KEY = "_background_run"
+
+_lock = threading.Lock()
+_pool = None
+_local = threading.local()
+_published = itertools.count(1)  # stamps, so the newest partial result wins
+
+
+class Cancelled(Exception):
+    """Raised in a background task whose run was cancelled."""
+
+
+def checkpoint():
+    """Raise ``Cancelled`` if the background run executing this code was cancelled.
+
+    A no-op outside background tasks, so long loops can call it freely.
+    """
+    token = getattr(_local, "token", None)
+    if token is not None and token.is_set():
+        raise Cancelled()
+
+
+def publish(value):
+    """Make ``value`` the partial result of the background task executing this code.
+
+    A no-op outside background tasks.
+    """
+    task = getattr(_local, "task", None)
+    if task is not None:
+        task.progress = (next(_published), value)
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="crime-background")
+        return _pool
+
+
+def _script_context():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    return get_script_run_ctx(suppress_warning=True)
+
+
+def _attach_context(ctx):
+    # Cached functions called from the task look up the session's context.
+    # Pool threads are reused, so every task attaches its own run's context.
+    if ctx is None:
+        return
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+    except ImportError:
+        return
+    add_script_run_ctx(threading.current_thread(), ctx)
+
+
+class Task:
+    """One background computation; ``result()`` blocks until it is done."""
+
+    def __init__(self, name, deps):
+        self.name = name
+        self.deps = deps
+        self.future = Future()
+        self.seconds = None
+        self.progress = None  # (stamp, value) last published by the task
+
+    def done(self):
+        return self.future.done()
+
+    def result(self):
+        return self.future.result()
+
+
+class _Deferred:
+    __slots__ = ("tasks", "draw", "label", "container", "placeholder", "preview", "shown")
+
+    def __init__(self, tasks, draw, label, container, placeholder, preview):
+        self.tasks = tasks
+        self.draw = draw
+        self.label = label
+        self.container = container
+        self.placeholder = placeholder
+        self.preview = preview
+        self.shown = None  # stamp of the partial result in the placeholder
+
+    def progress(self):
+        """Newest ``(stamp, value)`` published by its tasks or their dependencies, or None."""
+        published = [task.progress for task in self.tasks + [dep for task in self.tasks for dep in task.deps]
+                     if task.progress is not None]
+        return max(published, key=lambda item: item[0], default=None)
+
+
+class BackgroundRun:
+    """Background tasks and deferred sections of one script run."""
+
+    def __init__(self, perf=None):
+        self.perf = perf
+        self.tasks = []
+        self._token = threading.Event()
+        self._deferred = []
+        self._ctx = _script_context()
+        previous = st.session_state.get(RUN_KEY)
+        if previous is not None:
+            previous.cancel()
+        st.session_state[RUN_KEY] = self
+
+    # -----------------------------------------------------
+    # TASKS
+    # -----------------------------------------------------
+    def submit(self, name, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in the background once every ``Task`` argument is done."""
+        deps = [value for value in (*args, *kwargs.values()) if isinstance(value, Task)]
+        task = Task(name, deps)
+        self.tasks.append(task)
+        if not deps:
+            _get_pool().submit(self._run, task, fn, args, kwargs)
+            return task
+        remaining = [len(deps)]
+        counter = threading.Lock()
+
+        def dep_done(_):
+            with counter:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                _get_pool().submit(self._run, task, fn, args, kwargs)
+
+        for dep in deps:
+            dep.future.add_done_callback(dep_done)
+        return task
+
+    def _run(self, task, fn, args, kwargs):
+        if not task.future.set_running_or_notify_cancel():
+            return
+        start = time.perf_counter()
+        _local.token, _local.task = self._token, task
+        _attach_context(self._ctx)
+        try:
+            checkpoint()
+            args = [value.result() if isinstance(value, Task) else value for value in args]
+            kwargs = {key: value.result() if isinstance(value, Task) else value for key, value in kwargs.items()}
+            result = fn(*args, **kwargs)
+        except BaseException as exc:
+            task.future.set_exception(exc)
+        else:
+            task.future.set_result(result)
+        finally:
+            task.seconds = time.perf_counter() - start
+            _local.token = _local.task = None
+
+    def cancel(self):
+        """Drop tasks not started yet and ask running ones to stop."""
+        self._token.set()
+        for task in self.tasks:
+            task.future.cancel()
+
+    # -----------------------------------------------------
+    # DEFERRED SECTIONS
+    # -----------------------------------------------------
+    def render(self, tasks, draw, label, preview=None):
+        """Reserve a spot here; ``drain`` calls ``draw(*results)`` in it once ``tasks`` are done.
+
+        Until then ``preview(value)``, if given, is drawn in the spot with the
+        latest value ``publish``ed by ``tasks`` or the tasks they depend on.
+        """
+        tasks = list(tasks) if isinstance(tasks, (list, tuple)) else [tasks]
+        container = st.container()
+        placeholder = container.empty()
+        placeholder.info(f"⏳ {label}…")
+        self._deferred.append(_Deferred(tasks, draw, label, container, placeholder, preview))
+
+    def chart(self, name, cache_key, build, label, deps=(), then=None, preview=None, **kwargs):
+        """Cached chart whose figure is fetched, or built by ``build(*deps)``, in the background.
+
+        ``kwargs`` go to ``show_figure``; ``then(event)``, if given, is called
+        below the chart with what ``show_figure`` returned (the selection,
+        with ``on_select``).  ``preview`` is passed to ``render``.  Requires
+        the run's ``perf``.
+        """
+        def fetch(*results):
+            return self.perf.fetch(cache_key, lambda: build(*results))
+
+        def draw(fetched):
+            event = self.perf.show_entry(name, *fetched, **kwargs)
+            if then is not None:
+                then(event)
+
+        task = self.submit(f"chart:{name}", fetch, *deps)
+        self.render(task, draw, label, preview)
+        return task
+
+    def drain(self):
+        """Draw every deferred section, each as soon as its tasks are done."""
+        start = time.perf_counter()
+        try:
+            while self._deferred:
+                # Sections whose tasks are done, in page order.
+                ready = next((item for item in self._deferred if all(task.done() for task in item.tasks)), None)
+                if ready is None:
+                    pending = [task.future for item in self._deferred for task in item.tasks if not task.done()]
+                    wait_futures(pending, timeout=HEARTBEAT_SECONDS, return_when=FIRST_COMPLETED)
+                    self._heartbeat(start)
+                    continue
+                self._deferred.remove(ready)
+                ready.placeholder.empty()
+                with ready.container:
+                    try:
+                        ready.draw(*[task.result() for task in ready.tasks])
+                    except Exception as exc:
+                        # A failed task or chart only costs its own section.
+                        st.error(f"⚠️ {ready.label} failed.")
+                        st.exception(exc)
+        except BaseException:
+            # Rerun or page switch (Streamlit's control-flow exceptions are
+            # not ``Exception``s): nothing will draw the remaining results.
+            self.cancel()
+            raise
+        if self.perf is not None:
+            for task in self.tasks:
+                self.perf.record(f"background:{task.name}", task.seconds or 0.0)
+            self.perf.record("background:drain", time.perf_counter() - start)
+
+    def _heartbeat(self, start):
+        elapsed = time.perf_counter() - start
+        for item in self._deferred:
+            if all(task.done() for task in item.tasks):
+                continue
+            progress = item.progress() if item.preview is not None else None
+            if progress is None:
+                item.placeholder.info(f"⏳ {item.label}… {elapsed:.1f}s")
+            elif progress[0] != item.shown:
+                # Redrawn only when a new partial result arrives.
+                item.shown = progress[0]
+                with item.placeholder.container():
+                    st.info(f"⏳ {item.label}… {elapsed:.1f}s")
+                    try:
+                        item.preview(progress[1])
+                    except Exception:
+                        item.preview = None  # the final draw reports any real error
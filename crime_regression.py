@@ -0,0 +1,228 @@
+# =========================================================
+# 📐 Batched Regression Engine for the Crime Dashboard
+# =========================================================
+"""Simple linear regressions for every predictor × target × group at once.
+
+``px.scatter(trendline='ols')`` runs a separate statsmodels fit per chart and
+per colour group.  ``fit_ols_batch`` instead reduces each (predictor, target)
+pair to per-group sufficient statistics with ``np.bincount`` — one vectorised
+pass over the rows covers every group — and derives slopes, intercepts, R²
+and confidence intervals in closed form.  Results are memoized by a hash of
+the columns involved, so adding predictors such as ``age``, ``male`` or the
+education columns adds columns to one batch rather than a fit per chart.
+Every cross-filter selection is a new key, so the memo is an LRU of
+``CRIME_REGRESSION_ENTRIES`` results (default 32).
+
+``OlsAccumulator`` keeps the same per-group moments for data that arrives in
+batches and merges them pairwise, so a stream of chunks gives the same fits
+without holding the rows.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from crime_lazy import lazy_import
+
+scipy_stats = lazy_import("scipy.stats")
+
+ALL_GROUP = 'all'
+RESULT_COLUMNS = [
+    'predictor', 'target', 'group', 'n', 'slope', 'intercept', 'r2',
+    'slope_ci_low', 'slope_ci_high', 'intercept_ci_low', 'intercept_ci_high', 'x_min', 'x_max',
+]
+
+CACHE_ENTRIES = int(os.environ.get("CRIME_REGRESSION_ENTRIES", 32))
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # key -> result frame, least recently used first
+
+
+def frame_digest(df, columns):
+    """Content hash of ``df[columns]`` used to key the regression cache."""
+    hashed = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    return hashlib.sha256(repr(list(columns)).encode() + hashed.tobytes()).hexdigest()
+
+
+def _group_codes(df, group):
+    if group is None:
+        return np.zeros(len(df), dtype=np.intp), []
+    codes, uniques = pd.factorize(df[group], sort=True)
+    return codes, [str(u) for u in uniques]
+
+
+def _pair_moments(x, y, codes, n_groups):
+    """Count, means, centred sums of squares/products and x range per group.
+
+    Slot ``n_groups`` holds the overall moments.
+    """
+    valid = ~(np.isnan(x) | np.isnan(y)) & (codes >= 0)
+    x, y, codes = x[valid], y[valid], codes[valid]
+    codes = np.concatenate([codes, np.full(len(codes), n_groups)])
+    x, y = np.concatenate([x, x]), np.concatenate([y, y])
+    size = n_groups + 1
+
+    n = np.bincount(codes, minlength=size).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = np.bincount(codes, weights=x, minlength=size) / n
+        y_mean = np.bincount(codes, weights=y, minlength=size) / n
+        dx, dy = x - x_mean[codes], y - y_mean[codes]
+    x_min = np.full(size, np.nan)
+    x_max = np.full(size, np.nan)
+    np.fmin.at(x_min, codes, x)
+    np.fmax.at(x_max, codes, x)
+    return {
+        'n': n, 'x_mean': x_mean, 'y_mean': y_mean,
+        'sxx': np.bincount(codes, weights=dx * dx, minlength=size),
+        'syy': np.bincount(codes, weights=dy * dy, minlength=size),
+        'sxy': np.bincount(codes, weights=dx * dy, minlength=size),
+        'x_min': x_min, 'x_max': x_max,
+    }
+
+
+def _merge_moments(a, b):
+    """Combine moments of two disjoint row sets (Chan et al.'s pairwise update)."""
+    n = a['n'] + b['n']
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = np.where(n > 0, b['n'] / n, 0.0)
+        cross = np.where(n > 0, a['n'] * b['n'] / n, 0.0)
+    ax, ay = np.nan_to_num(a['x_mean']), np.nan_to_num(a['y_mean'])
+    dx = np.nan_to_num(b['x_mean']) - ax
+    dy = np.nan_to_num(b['y_mean']) - ay
+    x_mean, y_mean = ax + dx * weight, ay + dy * weight
+    return {
+        'n': n,
+        'x_mean': np.where(n > 0, x_mean, np.nan), 'y_mean': np.where(n > 0, y_mean, np.nan),
+        'sxx': a['sxx'] + b['sxx'] + dx * dx * cross,
+        'syy': a['syy'] + b['syy'] + dy * dy * cross,
+        'sxy': a['sxy'] + b['sxy'] + dx * dy * cross,
+        'x_min': np.fmin(a['x_min'], b['x_min']), 'x_max': np.fmax(a['x_max'], b['x_max']),
+    }
+
+
+def _empty_moments(size):
+    return {
+        'n': np.zeros(size), 'x_mean': np.full(size, np.nan), 'y_mean': np.full(size, np.nan),
+        'sxx': np.zeros(size), 'syy': np.zeros(size), 'sxy': np.zeros(size),
+        'x_min': np.full(size, np.nan), 'x_max': np.full(size, np.nan),
+    }
+
+
+def _pair_fit(moments, confidence):
+    """Closed-form OLS slope, intercept, R² and confidence intervals from moments."""
+    n, x_mean, y_mean = moments['n'], moments['x_mean'], moments['y_mean']
+    sxx, syy, sxy = moments['sxx'], moments['syy'], moments['sxy']
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = sxy / sxx
+        intercept = y_mean - slope * x_mean
+        r2 = np.where(syy > 0, sxy * sxy / (sxx * syy), np.nan)
+        dof = n - 2
+        sse = np.maximum(syy - slope * sxy, 0.0)
+        s2 = sse / dof
+        se_slope = np.sqrt(s2 / sxx)
+        se_intercept = np.sqrt(s2 * (1 / n + x_mean ** 2 / sxx))
+        t_crit = scipy_stats.t.ppf(0.5 + confidence / 2, np.maximum(dof, 1))
+    return {
+        'n': n.astype(int), 'slope': slope, 'intercept': intercept, 'r2': r2,
+        'slope_ci_low': slope - t_crit * se_slope, 'slope_ci_high': slope + t_crit * se_slope,
+        'intercept_ci_low': intercept - t_crit * se_intercept,
+        'intercept_ci_high': intercept + t_crit * se_intercept,
+        'x_min': moments['x_min'], 'x_max': moments['x_max'],
+    }
+
+
+def _result_frame(fits, labels):
+    """``RESULT_COLUMNS`` frame from ``{(predictor, target): fit}``; drops groups under two rows."""
+    frames = []
+    for (predictor, target), fit in fits.items():
+        frame = pd.DataFrame(fit)
+        frame.insert(0, 'group', labels)
+        frame.insert(0, 'target', target)
+        frame.insert(0, 'predictor', predictor)
+        frames.append(frame[frame['n'] >= 2])
+    return pd.concat(frames, ignore_index=True)[RESULT_COLUMNS]
+
+
+def fit_ols_batch(df, predictors, targets, group=None, confidence=0.95):
+    """Fit ``target ~ predictor`` for every combination, overall and per group.
+
+    Returns one row per (predictor, target, group) with the columns in
+    ``RESULT_COLUMNS``; the overall fit uses ``group == 'all'``.  Groups with
+    fewer than two rows are dropped.
+    """
+    columns = list(dict.fromkeys(list(predictors) + list(targets) + ([group] if group else [])))
+    key = (frame_digest(df, columns), tuple(predictors), tuple(targets), group, confidence)
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+    if cached is not None:
+        return cached.copy()
+
+    codes, group_names = _group_codes(df, group)
+    fits = {}
+    for predictor in predictors:
+        x = df[predictor].to_numpy(dtype=float)
+        for target in targets:
+            moments = _pair_moments(x, df[target].to_numpy(dtype=float), codes, len(group_names))
+            fits[predictor, target] = _pair_fit(moments, confidence)
+    result = _result_frame(fits, group_names + [ALL_GROUP])
+
+    with _lock:
+        _cache[key] = result
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return result.copy()
+
+
+class OlsAccumulator:
+    """``fit_ols_batch`` over a stream of row batches.
+
+    ``update`` folds a batch into per-group moments with a numerically stable
+    pairwise merge, so memory holds a few numbers per group and ``fit``
+    returns the same table ``fit_ols_batch`` would give on all the rows.
+    """
+
+    def __init__(self, predictors, targets, group=None):
+        self.predictors, self.targets, self.group = list(predictors), list(targets), group
+        self.groups = []
+        self._moments = {(p, t): _empty_moments(1) for p in self.predictors for t in self.targets}
+
+    def _grow(self, names):
+        new = [name for name in names if name not in self.groups]
+        if not new:
+            return
+        # Keep group slots sorted like ``fit_ols_batch``; the overall slot stays last.
+        order = sorted(self.groups + new)
+        position = [order.index(name) for name in self.groups] + [len(order)]
+        for key, moments in self._moments.items():
+            grown = _empty_moments(len(order) + 1)
+            for field, values in moments.items():
+                grown[field][position] = values
+            self._moments[key] = grown
+        self.groups = order
+
+    def update(self, df):
+        """Fold the rows of ``df`` into the running moments."""
+        codes, names = _group_codes(df, self.group)
+        self._grow(names)
+        slots = np.array([self.groups.index(name) for name in names] + [len(self.groups)], dtype=np.intp)
+        for predictor in self.predictors:
+            x = df[predictor].to_numpy(dtype=float)
+            for target in self.targets:
+                batch = _pair_moments(x, df[target].to_numpy(dtype=float), codes, len(names))
+                total = self._moments[predictor, target]
+                current = {field: values[slots] for field, values in total.items()}
+                for field, values in _merge_moments(current, batch).items():
+                    total[field][slots] = values
+        return self
+
+    def fit(self, confidence=0.95):
+        """The ``RESULT_COLUMNS`` table for every row seen so far."""
+        fits = {key: _pair_fit(moments, confidence) for key, moments in self._moments.items()}
+        return _result_frame(fits, self.groups + [ALL_GROUP])
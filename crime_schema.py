@@ -0,0 +1,128 @@
+# =========================================================
+# 🗜️ Compact Column Schema for the Crime Dashboard
+# =========================================================
+"""Explicit, memory-compact dtypes for the crime dataframe.
+
+``pd.read_csv`` infers ``float64``/``int64``/``object`` for every column.
+``apply_schema`` maps each known column to the narrowest type that holds it:
+
+* crime scores, rates, income and education shares → ``float32``;
+* counts → the smallest integer type that fits the observed range;
+* low-cardinality labels and bins (``state``, ``city_cat``, ``age`` and the
+  derived ``male_category``/``crime_cluster``) → ``category``.
+
+Conversions are checked rather than assumed: a column that would lose
+values (float32 overflow, missing or fractional values in an integer column)
+keeps its original dtype.  Columns outside ``SCHEMA`` get an inferred kind;
+strings among them only become categoricals when their values repeat.
+``memory_report`` lists the bytes saved per column.
+
+The scaler, PCA and K-Means keep ``float32`` inputs in ``float32``; code that
+accumulates sums (``AggregationCube``, ``fit_ols_batch``) widens to
+``float64`` explicitly in its own buffers, never in the frame.
+"""
+
+import numpy as np
+import pandas as pd
+
+FLOAT = "float32"
+INTEGER = "integer"
+CATEGORY = "category"
+
+CRIME_FEATURES = ['violent_crime', 'property_crime', 'whitecollar_crime', 'social_crime']
+EDUCATION_COLS = ['high_school_below', 'high_school', 'some_college', 'bachelors_degree']
+TREND_PREDICTORS = ['income', 'poverty']
+TREND_TARGET = 'offense_count'
+MALE_LABELS = ['Low-Male', 'Balanced-Gender', 'High-Male']
+
+SCHEMA = {
+    'state': CATEGORY,
+    'city_cat': CATEGORY,
+    'age': CATEGORY,
+    'male_category': CATEGORY,
+    'crime_cluster': CATEGORY,
+    'offense_count': INTEGER,
+    'income': FLOAT,
+    'poverty': FLOAT,
+    'male': FLOAT,
+    **{col: FLOAT for col in CRIME_FEATURES + EDUCATION_COLS},
+}
+
+# Bump when SCHEMA or the conversion rules change, so cached snapshots are rebuilt.
+SCHEMA_VERSION = 1
+# A categorical only pays off when values repeat; above this share of
+# distinct values the column is left as it is.
+MAX_CATEGORY_RATIO = 0.5
+
+
+def _to_float32(series):
+    if not pd.api.types.is_numeric_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    values = series.to_numpy(dtype=float)
+    narrowed = values.astype(np.float32)
+    if not np.array_equal(np.isfinite(values), np.isfinite(narrowed)):
+        return series  # would overflow float32
+    return pd.Series(narrowed, index=series.index, name=series.name)
+
+
+def _to_integer(series):
+    if not pd.api.types.is_numeric_dtype(series) or series.isna().any():
+        return series
+    values = series.to_numpy()
+    if not np.array_equal(values, np.round(values)):
+        return series
+    return pd.to_numeric(series, downcast="integer")
+
+
+def _to_category(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.remove_unused_categories()
+    return series.astype(CATEGORY)
+
+
+CONVERTERS = {FLOAT: _to_float32, INTEGER: _to_integer, CATEGORY: _to_category}
+
+
+def compact_column(series, kind):
+    """Convert one column to the schema ``kind``, or return it unchanged if lossy."""
+    return CONVERTERS[kind](series)
+
+
+def infer_kind(series):
+    """Schema kind for a column not listed in ``SCHEMA`` (None keeps it as is)."""
+    if pd.api.types.is_float_dtype(series):
+        return FLOAT
+    if pd.api.types.is_integer_dtype(series):
+        return INTEGER
+    if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+        if series.nunique(dropna=True) <= max(MAX_CATEGORY_RATIO * len(series), 1):
+            return CATEGORY
+    return None
+
+
+def apply_schema(df, schema=None, infer=True):
+    """Return ``df`` with every column converted to its compact dtype.
+
+    Columns missing from ``schema`` get an inferred kind, or are left
+    untouched when ``infer`` is False.
+    """
+    schema = SCHEMA if schema is None else schema
+    columns = {}
+    for name in df.columns:
+        kind = schema.get(name) or (infer_kind(df[name]) if infer else None)
+        columns[name] = df[name] if kind is None else compact_column(df[name], kind)
+    return pd.DataFrame(columns, index=df.index)
+
+
+def memory_report(before, after):
+    """Bytes per column before and after ``apply_schema``, largest saving first."""
+    rows = []
+    for name in after.columns:
+        old = int(before[name].memory_usage(index=False, deep=True))
+        new = int(after[name].memory_usage(index=False, deep=True))
+        rows.append({
+            'column': name, 'dtype_before': str(before[name].dtype), 'dtype_after': str(after[name].dtype),
+            'bytes_before': old, 'bytes_after': new, 'saved_bytes': old - new,
+            'saved_pct': round(100 * (old - new) / old, 1) if old else 0.0,
+        })
+    return pd.DataFrame(rows).sort_values('saved_bytes', ascending=False, ignore_index=True)
@@ -0,0 +1,248 @@
+# =========================================================
+# 🎯 Subsampled Model Selection (k) for the Crime Dashboard
+# =========================================================
+"""Choose the number of clusters from a bounded sample of the data.
+
+An exact elbow sweep fits one k-means model per k on every row, so its cost
+grows with the dataset.  ``select_k`` instead scores every k on
+``replicates`` independent samples of at most ``sample_size`` rows
+(``CRIME_SELECTION_SAMPLE``, default 4,000), drawn in one of two ways:
+
+* ``coreset``    — a lightweight k-means coreset (Bachem et al., 2018):
+  rows are drawn with probability ½·1/n + ½·d(x, mean)²/Σd² and weighted by
+  the inverse, so weighted k-means on the sample estimates the full WCSS;
+* ``stratified`` — a uniform sample per stratum (e.g. ``city_cat``), sized
+  in proportion to it and weighted by the stratum's sampling rate.
+
+For each k, the spread across replicates gives a standard error next to each
+estimate (a matrix no larger than ``sample_size`` is scored once, exactly):
+
+* ``wcss``       — the within-cluster sum of squares, scaled to every row;
+* ``silhouette`` — the mean silhouette of a uniform sub-sample labelled by
+  the replicate's centroids;
+* ``gap``        — Tibshirani's gap statistic against ``n_refs`` uniform
+  reference sets in the sample's bounding box; ``gap_se`` is its
+  simulation error.
+
+Each criterion picks a k: the elbow is the point furthest below the chord
+of the normalised WCSS curve, silhouette the smallest k within one standard
+error of the best score, gap the smallest k with gap(k) ≥ gap(k+1) −
+gap_se(k+1).  The chosen k is the one most criteria agree on, the gap
+statistic breaking ties.  Only that k is then fitted on every row.
+
+Apart from one O(n) pass to draw the samples, the cost depends on the sample
+size and the k range, not on the row count.  Results are memoized per matrix
+digest and parameters; the memo keeps the ``CRIME_SELECTION_ENTRIES`` most
+recently used selections (default 32).  Each k is a ``crime_progress.checkpoint``, so a
+cancelled background run stops between fits.
+"""
+
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from crime_lazy import lazy_import
+from crime_models import DEFAULT_K_RANGE, RANDOM_STATE, array_digest
+from crime_progress import checkpoint
+
+sklearn_cluster = lazy_import("sklearn.cluster")
+sklearn_metrics = lazy_import("sklearn.metrics")
+
+SELECTION_SAMPLE = int(os.environ.get("CRIME_SELECTION_SAMPLE", 4_000))
+SELECTION_METHODS = {"coreset": "k-means coreset", "stratified": "Stratified subsample"}
+REPLICATES = 3
+GAP_REFERENCES = 3
+SELECTION_N_INIT = 3
+SILHOUETTE_ROWS = 1_500
+SELECTION_ENTRIES = int(os.environ.get("CRIME_SELECTION_ENTRIES", 32))
+
+KSelection = namedtuple("KSelection", "k picks scores method sample_size replicates seconds")
+
+_lock = threading.Lock()
+_selection_cache = OrderedDict()  # (digest, params) -> KSelection, least recently used first
+
+
+# ---------------------------------------------------------
+# SAMPLES
+# ---------------------------------------------------------
+def coreset_sample(X, size, rng):
+    """``(rows, weights)`` of a lightweight k-means coreset of ``X``."""
+    X = np.asarray(X, dtype=np.float64)
+    n = len(X)
+    if n <= size:
+        return X, np.ones(n)
+    distances = ((X - X.mean(axis=0)) ** 2).sum(axis=1)
+    total = distances.sum()
+    q = 0.5 / n + (0.5 * distances / total if total > 0 else 0.5 / n)
+    picked = rng.choice(n, size=size, replace=True, p=q / q.sum())
+    return X[picked], 1.0 / (size * q[picked])
+
+
+def stratified_sample(X, size, rng, strata=None):
+    """``(rows, weights)`` of a proportional per-stratum uniform sample of ``X``."""
+    X = np.asarray(X, dtype=np.float64)
+    n = len(X)
+    if n <= size:
+        return X, np.ones(n)
+    strata = np.zeros(n, dtype=np.int64) if strata is None else pd.factorize(np.asarray(strata))[0]
+    picked, weights = [], []
+    for code in np.unique(strata):
+        members = np.flatnonzero(strata == code)
+        take = max(1, int(round(size * len(members) / n)))
+        chosen = rng.choice(members, size=min(take, len(members)), replace=False)
+        picked.append(chosen)
+        weights.append(np.full(len(chosen), len(members) / len(chosen)))
+    picked = np.concatenate(picked)
+    return X[picked], np.concatenate(weights)
+
+
+# ---------------------------------------------------------
+# SCORES
+# ---------------------------------------------------------
+def _fit(X, k, weights=None, n_init=SELECTION_N_INIT, seed=RANDOM_STATE):
+    return sklearn_cluster.KMeans(n_clusters=k, n_init=n_init, random_state=seed).fit(X, sample_weight=weights)
+
+
+def score_replicate(sample, weights, k_range, n_refs=GAP_REFERENCES, n_init=SELECTION_N_INIT, seed=RANDOM_STATE):
+    """``{k: (wcss, silhouette, gap, gap_se)}`` for one sample.
+
+    WCSS is the weighted inertia (an estimate over every row); the gap
+    compares the mean per-row dispersion with that of uniform references.
+    """
+    rng = np.random.default_rng(seed)
+    low, high = sample.min(axis=0), sample.max(axis=0)
+    references = [rng.uniform(low, high, size=sample.shape) for _ in range(n_refs)]
+    uniform = rng.choice(len(sample), size=min(len(sample), SILHOUETTE_ROWS), replace=False)
+    scores = {}
+    for k in k_range:
+        checkpoint()
+        model = _fit(sample, k, weights, n_init, seed)
+        wcss = float(model.inertia_)
+        labels = model.labels_[uniform]
+        silhouette = (
+            float(sklearn_metrics.silhouette_score(sample[uniform], labels))
+            if 1 < len(np.unique(labels)) < len(uniform) else np.nan
+        )
+        log_w = np.log(wcss / weights.sum())
+        log_ref = np.array([np.log(_fit(ref, k, None, 1, seed).inertia_ / len(ref)) for ref in references])
+        gap_se = float(log_ref.std() * np.sqrt(1 + 1 / n_refs))
+        scores[k] = (wcss, silhouette, float(log_ref.mean() - log_w), gap_se)
+    return scores
+
+
+def _se(values):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    return float(values.std(ddof=1) / np.sqrt(len(values))) if len(values) > 1 else 0.0
+
+
+# ---------------------------------------------------------
+# PICKS
+# ---------------------------------------------------------
+def elbow_pick(ks, wcss):
+    """k furthest below the chord of the normalised WCSS curve (kneedle)."""
+    ks, wcss = np.asarray(ks, dtype=float), np.asarray(wcss, dtype=float)
+    if len(ks) < 3 or wcss[0] == wcss[-1]:
+        return int(ks[0])
+    x = (ks - ks[0]) / (ks[-1] - ks[0])
+    y = (wcss - wcss[-1]) / (wcss[0] - wcss[-1])
+    return int(ks[np.argmax((1 - x) - y)])
+
+
+def silhouette_pick(ks, silhouette, silhouette_se):
+    """Smallest k whose silhouette is within one standard error of the best."""
+    silhouette = np.asarray(silhouette, dtype=float)
+    if np.all(np.isnan(silhouette)):
+        return None
+    best = np.nanargmax(silhouette)
+    threshold = silhouette[best] - silhouette_se[best]
+    return int(next(k for k, s in zip(ks, silhouette) if s >= threshold))
+
+
+def gap_pick(ks, gap, gap_se):
+    """Smallest k with gap(k) ≥ gap(k+1) − se(k+1); the best gap when none qualifies."""
+    for i in range(len(ks) - 1):
+        if gap[i] >= gap[i + 1] - gap_se[i + 1]:
+            return int(ks[i])
+    return int(ks[int(np.argmax(gap))])
+
+
+def consensus(picks):
+    """The k most criteria agree on; the gap statistic breaks ties."""
+    votes = Counter(k for k in picks.values() if k is not None)
+    top = max(votes.values())
+    tied = [k for k, count in votes.items() if count == top]
+    return picks["gap"] if picks.get("gap") in tied else min(tied)
+
+
+# ---------------------------------------------------------
+# SELECTION
+# ---------------------------------------------------------
+def select_k(X, k_range=DEFAULT_K_RANGE, method="coreset", sample_size=SELECTION_SAMPLE,
+             replicates=REPLICATES, n_refs=GAP_REFERENCES, strata=None, random_state=RANDOM_STATE):
+    """Estimate elbow, silhouette and gap on samples of ``X``; pick k.
+
+    ``X`` is the scaled feature matrix; ``strata`` (one label per row) is
+    used by the ``stratified`` method.  Returns a ``KSelection`` whose
+    ``scores`` frame has one row per k with each estimate and its standard
+    error.
+    """
+    k_range = [k for k in k_range if k >= 2]
+    params = (tuple(k_range), method, sample_size, replicates, n_refs, random_state)
+    digest = array_digest(X)
+    if strata is not None:
+        params += (array_digest(pd.factorize(np.asarray(strata))[0]),)
+    key = (digest, params)
+    with _lock:
+        cached = _selection_cache.get(key)
+        if cached is not None:
+            _selection_cache.move_to_end(key)
+            return cached
+
+    start = time.perf_counter()
+    if len(X) <= sample_size:
+        replicates = 1  # every replicate would be the whole matrix
+    rng = np.random.default_rng(random_state)
+    per_k = {k: [] for k in k_range}
+    for r in range(replicates):
+        if method == "stratified":
+            sample, weights = stratified_sample(X, sample_size, rng, strata)
+        else:
+            sample, weights = coreset_sample(X, sample_size, rng)
+        for k, values in score_replicate(sample, weights, k_range, n_refs, seed=random_state + r).items():
+            per_k[k].append(values)
+
+    rows = []
+    for k in k_range:
+        wcss, silhouette, gap, gap_se = (np.array(column, dtype=float) for column in zip(*per_k[k]))
+        rows.append({
+            'k': k,
+            'wcss': float(wcss.mean()), 'wcss_se': _se(wcss),
+            'silhouette': float(np.nanmean(silhouette)) if not np.all(np.isnan(silhouette)) else np.nan,
+            'silhouette_se': _se(silhouette),
+            'gap': float(gap.mean()),
+            # Simulation error of the references plus the spread across samples.
+            'gap_se': float(np.sqrt(np.mean(gap_se ** 2) + _se(gap) ** 2)),
+        })
+    scores = pd.DataFrame(rows)
+    ks = scores['k'].tolist()
+    picks = {
+        "elbow": elbow_pick(ks, scores['wcss']),
+        "silhouette": silhouette_pick(ks, scores['silhouette'].to_numpy(), scores['silhouette_se'].to_numpy()),
+        "gap": gap_pick(ks, scores['gap'].to_numpy(), scores['gap_se'].to_numpy()),
+    }
+    selection = KSelection(
+        k=consensus(picks), picks=picks, scores=scores, method=method,
+        sample_size=min(sample_size, len(X)), replicates=replicates,
+        seconds=round(time.perf_counter() - start, 4),
+    )
+    with _lock:
+        _selection_cache[key] = selection
+        _selection_cache.move_to_end(key)
+        while len(_selection_cache) > SELECTION_ENTRIES:
+            _selection_cache.popitem(last=False)
+    return selection
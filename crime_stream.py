@@ -0,0 +1,201 @@
+# =========================================================
+# 🌊 Streaming Ingestion & Online Statistics for the Crime Dashboard
+# =========================================================
+"""One pass over a dataset too large for a single pandas frame.
+
+``summarize`` reads the CSV in chunks of ``STREAM_CHUNK_ROWS`` rows (with the
+``crime_schema`` dtypes) and folds every chunk into a ``StreamSummary``:
+
+* ``scaler``  — running mean/variance of the crime features
+  (``StandardScaler.partial_fit``);
+* ``cube``    — per-group count/sum/sum of squares of the crime features by
+  ``age``, ``state``, ``city_cat`` and quantised ``male`` (``AggregationCube``);
+* ``male``    — a ``QuantileSketch`` of the male-population share, whose
+  tertiles regroup the cube into the ``pd.qcut`` categories;
+* ``ols``     — the trendline moments per ``city_cat`` (``OlsAccumulator``);
+* ``sample``  — a uniform ``Reservoir`` of rows for scatter and violin plots.
+
+Memory is bounded by the chunk size, the sample size and the number of
+groups, not by the number of rows.  The pass also hashes the bytes it reads,
+so the digest matches the one ``crime_data`` computes for in-memory loads.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from crime_cube import AggregationCube
+from crime_lazy import lazy_import
+from crime_regression import OlsAccumulator
+from crime_schema import CRIME_FEATURES, MALE_LABELS, TREND_PREDICTORS, TREND_TARGET, apply_schema
+
+sklearn_preprocessing = lazy_import("sklearn.preprocessing")
+
+STREAM_CHUNK_ROWS = int(os.environ.get("CRIME_STREAM_CHUNK", 200_000))
+SAMPLE_ROWS = int(os.environ.get("CRIME_STREAM_SAMPLE", 50_000))
+PROFILE_DIMENSIONS = ['age', 'state', 'city_cat']
+RANDOM_STATE = 42
+
+
+class QuantileSketch:
+    """Mergeable histogram of values rounded to ``resolution``.
+
+    Quantiles use the same linear interpolation as ``np.quantile`` over the
+    rounded values, so they are exact for data recorded at ``resolution``
+    (the dataset's shares have two decimals) and within half a bin
+    otherwise.  Past ``max_bins`` distinct values the resolution doubles.
+    """
+
+    def __init__(self, resolution=0.01, max_bins=100_000):
+        self.resolution = resolution
+        self.max_bins = max_bins
+        self._counts = pd.Series(dtype=float)
+
+    def quantize(self, values):
+        values = np.asarray(values, dtype=float)
+        return np.round(values / self.resolution) * self.resolution
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        keys, counts = np.unique(np.round(values / self.resolution).astype(np.int64), return_counts=True)
+        self._counts = self._counts.add(pd.Series(counts, index=keys, dtype=float), fill_value=0)
+        while len(self._counts) > self.max_bins:
+            self.resolution *= 2
+            coarse = np.round(self._counts.index.to_numpy() / 2).astype(np.int64)
+            self._counts = self._counts.groupby(coarse).sum()
+        return self
+
+    @property
+    def count(self):
+        return int(self._counts.sum())
+
+    def quantiles(self, qs):
+        """Values at the fractions ``qs`` (linear interpolation, like ``np.quantile``)."""
+        counts = self._counts.sort_index()
+        values = counts.index.to_numpy() * self.resolution
+        cumulative = np.cumsum(counts.to_numpy())
+        positions = np.asarray(qs, dtype=float) * (cumulative[-1] - 1)
+        low, high = np.floor(positions), np.ceil(positions)
+        low_values = values[np.searchsorted(cumulative, low, side="right")]
+        high_values = values[np.searchsorted(cumulative, high, side="right")]
+        return low_values + (high_values - low_values) * (positions - low)
+
+
+class Reservoir:
+    """Uniform sample of at most ``size`` rows from a stream of frames.
+
+    Every row gets a random key and the ``size`` smallest keys are kept, which
+    is a uniform sample without replacement and vectorises per chunk.
+    """
+
+    def __init__(self, size=SAMPLE_ROWS, random_state=RANDOM_STATE):
+        self.size = size
+        self._rng = np.random.default_rng(random_state)
+        self._frame = None
+        self._keys = np.empty(0)
+        self._seen = 0
+
+    def _smallest(self, frame, keys):
+        if len(frame) <= self.size:
+            return frame, keys
+        keep = np.argpartition(keys, self.size)[:self.size]
+        return frame.iloc[keep], keys[keep]
+
+    def update(self, chunk):
+        chunk = chunk.set_axis(pd.RangeIndex(self._seen, self._seen + len(chunk)))
+        self._seen += len(chunk)
+        chunk, keys = self._smallest(chunk, self._rng.random(len(chunk)))
+        if self._frame is not None:
+            chunk, keys = pd.concat([self._frame, chunk]), np.concatenate([self._keys, keys])
+        self._frame, self._keys = self._smallest(chunk, keys)
+        return self
+
+    @property
+    def frame(self):
+        """The sampled rows in stream order."""
+        if self._frame is None:
+            return pd.DataFrame()
+        return apply_schema(self._frame.sort_index(), infer=False).reset_index(drop=True)
+
+
+class StreamSummary:
+    """Online statistics the pages render from when the data is streamed."""
+
+    def __init__(self, sample_rows=SAMPLE_ROWS):
+        self.n_rows = 0
+        self.scaler = sklearn_preprocessing.StandardScaler()
+        self.cube = None
+        self.male = QuantileSketch()
+        self.ols = OlsAccumulator(TREND_PREDICTORS, [TREND_TARGET], group='city_cat')
+        self.sample = Reservoir(sample_rows)
+
+    def update(self, chunk):
+        """Fold one chunk (with schema dtypes) into every accumulator."""
+        self.n_rows += len(chunk)
+        self.scaler.partial_fit(chunk[CRIME_FEATURES])
+        dimensions = {name: chunk[name] for name in PROFILE_DIMENSIONS}
+        dimensions['male'] = self.male.quantize(chunk['male'])
+        cube = AggregationCube(chunk, CRIME_FEATURES, dimensions)
+        self.cube = cube if self.cube is None else self.cube.merge(cube)
+        self.male.update(chunk['male'])
+        self.ols.update(chunk)
+        self.sample.update(chunk)
+        return self
+
+    def means(self, name):
+        """Per-group crime means over every streamed row (``groupby(name).mean()``)."""
+        return apply_schema(self.cube.means(name), infer=False)
+
+    def male_means(self, labels=MALE_LABELS):
+        """Long-format crime means per male-population tertile, as drawn by the gender chart."""
+        edges = self.male.quantiles(np.linspace(0, 1, len(labels) + 1)[1:-1])
+        bins = np.concatenate([[-np.inf], edges, [np.inf]])
+        self.cube.regroup('male', 'male_category', lambda keys: pd.cut(np.asarray(keys, dtype=float), bins, labels=labels))
+        return self.cube.melted('male_category')
+
+    def trendlines(self, confidence=0.95):
+        return self.ols.fit(confidence)
+
+    def caption(self, shown_rows):
+        return (
+            f"🌊 Streaming mode — {self.n_rows:,} rows were read in chunks. Profiles, scaling and trendlines "
+            f"use every row; point charts show a uniform sample of {shown_rows:,} rows."
+        )
+
+
+class HashingReader:
+    """Binary file wrapper that hashes every byte read through it."""
+
+    def __init__(self, handle, hasher=None):
+        self._handle = handle
+        self._hash = hasher or hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self._handle.read(size)
+        self._hash.update(data)
+        return data
+
+    def drain(self, block=1 << 20):
+        while self.read(block):
+            pass
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def summarize(handle, chunk_size=STREAM_CHUNK_ROWS, sample_rows=SAMPLE_ROWS, hasher=None):
+    """Stream the CSV in ``handle`` once; return ``(sha256 digest, StreamSummary)``.
+
+    Pass a ``hashlib`` object as ``hasher`` to keep the hash state (e.g. to
+    extend it when rows are appended later).
+    """
+    reader = HashingReader(handle, hasher)
+    summary = StreamSummary(sample_rows)
+    with pd.read_csv(reader, chunksize=chunk_size) as chunks:
+        for chunk in chunks:
+            summary.update(apply_schema(chunk, infer=False))
+    reader.drain()
+    return reader.hexdigest(), summary
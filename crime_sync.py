@@ -0,0 +1,277 @@
+# =========================================================
+# 🔄 Conditional Sync of the Remote Crime Dataset
+# =========================================================
+"""Keep a verified local copy of the remote CSV and revalidate it cheaply.
+
+``DatasetSync(url).sync()`` maintains ``<name>.<url hash>.csv`` under
+``CRIME_SYNC_DIR`` (default ``data/sync``), with a JSON sidecar holding the
+source's ``ETag``, ``Last-Modified``, size and sha256:
+
+* the request carries ``If-None-Match`` / ``If-Modified-Since`` from the
+  sidecar, so an unchanged source answers ``304 Not Modified`` and nothing
+  is downloaded;
+* a ``200`` body is streamed to a temporary file while it is hashed, then
+  checked: its length against ``Content-Length``, its sha256 against a
+  ``Repr-Digest`` / ``Digest`` header, a pinned ``CRIME_DATA_SHA256`` or a
+  ``CRIME_DATA_CHECKSUM_URL`` when available, and its header row against the
+  crime feature columns;
+* a verified download replaces the local copy with ``os.replace`` (the
+  sidecar follows), so readers never see a partial file;
+* when the source is unreachable, answers with an error or fails the
+  checks, the last good copy is served and the source is not retried for
+  ``retry_after`` seconds.
+
+The result reports the sha256 of the copy being served and whether it
+changed.  ``crime_data`` keys every cache (snapshots, figures, pipeline
+artifacts, fitted models) by that digest, so they are invalidated only when
+the content really changes — not by a new ``ETag``, a ``Last-Modified`` bump
+or an identical re-upload.
+
+The copy is verified against its sidecar once per process; a mismatch (e.g.
+a file edited by hand) drops the validators, so the next sync downloads it
+again in full.
+"""
+
+import base64
+import binascii
+import csv
+import hashlib
+import http.client
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+
+from crime_schema import CRIME_FEATURES
+
+SYNC_DIR = os.environ.get(
+    "CRIME_SYNC_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sync")
+)
+EXPECTED_SHA256 = os.environ.get("CRIME_DATA_SHA256") or None
+CHECKSUM_URL = os.environ.get("CRIME_DATA_CHECKSUM_URL") or None
+REQUIRED_COLUMNS = CRIME_FEATURES
+CHUNK_BYTES = 1 << 20
+
+SyncResult = namedtuple("SyncResult", "path sha256 status changed error")
+# status: "downloaded" (new content), "not_modified" (304), "unchanged" (200 with the same
+# content), or "stale" (the last good copy, served because the source failed)
+
+_lock = threading.Lock()
+_syncs = {}  # url -> DatasetSync
+
+
+class SyncError(OSError):
+    """The source could not be synced and there is no good local copy to serve."""
+
+
+class ChecksumError(ValueError):
+    """A downloaded body failed verification."""
+
+
+def file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_BYTES), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def header_sha256(headers):
+    """sha256 (hex) announced by a ``Repr-Digest`` or ``Digest`` header, or None."""
+    for name in ("Repr-Digest", "Digest"):
+        value = headers.get(name)
+        if not value:
+            continue
+        for item in value.split(","):
+            algorithm, _, encoded = item.strip().partition("=")
+            if algorithm.strip().lower() == "sha-256":
+                try:
+                    return base64.b64decode(encoded.strip().strip(":")).hex()
+                except (ValueError, binascii.Error):
+                    return None
+    return None
+
+
+def _mirror_name(url):
+    name = os.path.basename(urllib.parse.urlparse(url).path) or "dataset.csv"
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(url.encode()).hexdigest()[:12]}{ext or '.csv'}"
+
+
+class DatasetSync:
+    """Verified local copy of one remote CSV, refreshed with conditional requests."""
+
+    def __init__(self, url, directory=SYNC_DIR, timeout=15, retry_after=60,
+                 expected_sha256=EXPECTED_SHA256, checksum_url=CHECKSUM_URL):
+        self.url = url
+        self.path = os.path.join(directory, _mirror_name(url))
+        self.meta_path = f"{self.path}.json"
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.expected_sha256 = expected_sha256
+        self.checksum_url = checksum_url
+        self._lock = threading.Lock()
+        self._failed_at = None
+        self._verified = False
+
+    # -----------------------------------------------------
+    # LOCAL COPY
+    # -----------------------------------------------------
+    def _read_meta(self):
+        try:
+            with open(self.meta_path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, meta):
+        tmp = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(meta, fh, indent=2)
+        os.replace(tmp, self.meta_path)
+
+    def writable(self):
+        """Whether the local copy can be kept here (False on read-only deployments)."""
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError:
+            return False
+        return os.access(directory, os.W_OK)
+
+    def last_good(self):
+        """Sidecar of the local copy if the copy is present and matches it, else None."""
+        meta = self._read_meta()
+        if not meta.get("sha256") or not os.path.exists(self.path):
+            return None
+        if not self._verified:
+            if os.path.getsize(self.path) != meta.get("size") or file_sha256(self.path) != meta["sha256"]:
+                return None
+            self._verified = True
+        return meta
+
+    # -----------------------------------------------------
+    # SYNC
+    # -----------------------------------------------------
+    def sync(self, force=False):
+        """Revalidate the local copy; returns a ``SyncResult``.
+
+        ``force`` skips the retry back-off after a failure.  Raises
+        ``SyncError`` when the source fails and there is no good copy.
+        """
+        with self._lock:
+            good = self.last_good()
+            now = time.monotonic()
+            if not force and good is not None and self._failed_at is not None \
+                    and now - self._failed_at < self.retry_after:
+                return SyncResult(self.path, good["sha256"], "stale", False, "source failed recently; retry pending")
+            try:
+                result = self._revalidate(good)
+            except (OSError, ValueError, http.client.HTTPException) as exc:
+                self._failed_at = now
+                if good is None:
+                    raise SyncError(f"{self.url}: {exc}") from exc
+                return SyncResult(self.path, good["sha256"], "stale", False, str(exc))
+            self._failed_at = None
+            return result
+
+    def _revalidate(self, good):
+        request = urllib.request.Request(self.url)
+        if good is not None:
+            if good.get("etag"):
+                request.add_header("If-None-Match", good["etag"])
+            if good.get("last_modified"):
+                request.add_header("If-Modified-Since", good["last_modified"])
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as exc:
+            if exc.code == 304 and good is not None:
+                try:
+                    self._write_meta({**good, "checked_at": time.time()})
+                except OSError:
+                    pass  # the validators still hold; only the check time is lost
+                return SyncResult(self.path, good["sha256"], "not_modified", False, None)
+            raise
+        with response:
+            digest, size = self._download(response)
+            meta = {
+                "url": self.url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "sha256": digest,
+                "size": size,
+                "fetched_at": time.time(),
+                "checked_at": time.time(),
+            }
+        if good is not None and good["sha256"] == digest:
+            # New validators, same bytes: keep the copy and everything derived from it.
+            os.remove(self._tmp_path())
+            self._write_meta(meta)
+            return SyncResult(self.path, digest, "unchanged", False, None)
+        # Swap the copy first: a crash before the sidecar is written leaves a
+        # mismatch, which ``last_good`` rejects, forcing a full download.
+        os.replace(self._tmp_path(), self.path)
+        self._write_meta(meta)
+        self._verified = True
+        return SyncResult(self.path, digest, "downloaded", True, None)
+
+    def _tmp_path(self):
+        return f"{self.path}.{os.getpid()}.{threading.get_ident()}.part"
+
+    def _download(self, response):
+        """Stream the body to the temporary file, verifying it; returns ``(sha256, size)``."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self._tmp_path()
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp, "wb") as fh:
+                for chunk in iter(lambda: response.read(CHUNK_BYTES), b""):
+                    hasher.update(chunk)
+                    fh.write(chunk)
+                    size += len(chunk)
+            digest = hasher.hexdigest()
+            self._verify(tmp, response.headers, digest, size)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        return digest, size
+
+    def _verify(self, tmp, headers, digest, size):
+        length = headers.get("Content-Length")
+        if length is not None and int(length) != size:
+            raise ChecksumError(f"truncated download: {size} of {length} bytes")
+        for label, expected in [("server digest", header_sha256(headers)),
+                                ("pinned sha256", self.expected_sha256),
+                                ("checksum file", self._published_sha256())]:
+            if expected is not None and expected.lower() != digest:
+                raise ChecksumError(f"sha256 {digest} does not match the {label} {expected}")
+        with open(tmp, newline="", encoding="utf-8", errors="replace") as fh:
+            header = next(csv.reader(fh), [])
+        missing = [column for column in REQUIRED_COLUMNS if column not in header]
+        if missing:
+            raise ChecksumError(f"downloaded file lacks columns: {', '.join(missing)}")
+
+    def _published_sha256(self):
+        """First token of ``checksum_url`` (``sha256sum`` format), or None."""
+        if self.checksum_url is None:
+            return None
+        with urllib.request.urlopen(self.checksum_url, timeout=self.timeout) as response:
+            text = response.read().decode("utf-8", errors="replace").split()
+        return text[0] if text else None
+
+
+def dataset_sync(url, **kwargs):
+    """The process-wide ``DatasetSync`` of ``url``."""
+    with _lock:
+        sync = _syncs.get(url)
+        if sync is None:
+            sync = _syncs[url] = DatasetSync(url, **kwargs)
+        return sync
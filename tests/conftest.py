@@ -0,0 +1,37 @@
+"""Shared test setup: a small synthetic dataset and private cache directories.
+
+The ``crime_*`` modules read their locations from the environment at import
+time, so they are pointed at a temporary directory here, before any test
+module imports them.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from crime_benchmark import synthetic_crime_frame  # noqa: E402
+
+WORKDIR = tempfile.mkdtemp(prefix="crime-tests-")
+DATASET = os.path.join(WORKDIR, "df_crime_cleaned.csv")
+os.environ.update({
+    "CRIME_DATA_SOURCE": DATASET,
+    "CRIME_DATA_PATH": DATASET,
+    "CRIME_SNAPSHOT_DIR": os.path.join(WORKDIR, "snapshots"),
+    "CRIME_ARTIFACT_DIR": os.path.join(WORKDIR, "artifacts"),
+    "CRIME_FIGURE_DIR": os.path.join(WORKDIR, "figures"),
+    "CRIME_SYNC_DIR": os.path.join(WORKDIR, "sync"),
+    "CRIME_PERF_LOG": os.path.join(WORKDIR, "perf_log.jsonl"),
+    "CRIME_WARMUP": "0",
+})
+synthetic_crime_frame(2_000, seed=7).to_csv(DATASET, index=False)
+
+
+@pytest.fixture
+def dataset():
+    """Path of the synthetic dataset CSV shared by the tests."""
+    return DATASET
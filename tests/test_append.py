@@ -0,0 +1,62 @@
+import os
+import shutil
+
+import pandas as pd
+
+from crime_benchmark import synthetic_crime_frame
+from crime_data import (
+    append_rows, dataset_digest, dataset_snapshot, invalidate_cache, load_crime_data, read_snapshot, segments_path,
+)
+
+
+def test_append_twice_writes_no_empty_rows(dataset, tmp_path):
+    path = str(tmp_path / "df_crime_cleaned.csv")
+    shutil.copy(dataset, path)
+    before = len(pd.read_csv(path))
+    try:
+        dataset_digest(path)
+        for seed in (1, 2):
+            old, new = append_rows(synthetic_crime_frame(5, seed=seed), path)
+            assert old != new
+
+        with open(path, "rb") as fh:
+            lines = fh.read().split(b"\n")
+        assert lines[-1] == b""  # file ends with a newline
+        assert all(line.strip() for line in lines[:-1]), "blank line in the dataset CSV"
+        assert len(pd.read_csv(path, skip_blank_lines=False)) == before + 10
+        assert len(load_crime_data(source=path)) == before + 10
+    finally:
+        invalidate_cache(path)
+
+
+def test_append_adds_missing_final_newline(dataset, tmp_path):
+    path = str(tmp_path / "df_crime_cleaned.csv")
+    with open(dataset, "rb") as src, open(path, "wb") as dst:
+        dst.write(src.read().rstrip(b"\n"))
+    try:
+        append_rows(synthetic_crime_frame(3, seed=3), path)
+        frame = pd.read_csv(path, skip_blank_lines=False)
+        assert len(frame) == len(pd.read_csv(dataset)) + 3
+        assert not frame.isna().all(axis=1).any()
+    finally:
+        invalidate_cache(path)
+
+
+def test_append_stores_only_the_new_rows(dataset, tmp_path):
+    path = str(tmp_path / "df_crime_cleaned.csv")
+    shutil.copy(dataset, path)
+    try:
+        base = dataset_snapshot(path)
+        _, first = append_rows(synthetic_crime_frame(5, seed=4), path)
+        _, second = append_rows(synthetic_crime_frame(7, seed=5), path)
+
+        parts = dataset_snapshot(path)
+        assert parts[0] == base and len(parts) == 3
+        assert [len(read_snapshot(part)) for part in parts[1:]] == [5, 7]
+        assert not os.path.exists(segments_path(first))  # superseded by the second append
+        invalidate_cache()
+        assert dataset_digest(path) == second
+        assert dataset_snapshot(path) == parts  # found again from its segment list, not re-ingested
+        assert len(load_crime_data(source=path)) == len(pd.read_csv(path))
+    finally:
+        invalidate_cache(path)
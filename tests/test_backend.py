@@ -0,0 +1,19 @@
+import sys
+
+import pytest
+
+from crime_backend import available_backends, compare_backends, get_backend
+
+pytestmark = pytest.mark.skipif("polars" not in available_backends(), reason="polars is not installed")
+
+
+def test_polars_matches_pandas():
+    report = compare_backends("polars", "pandas")
+    assert len(report)
+    assert report["equal"].all(), report[~report["equal"]].to_string(index=False)
+
+
+def test_get_backend_imports_polars_eagerly():
+    get_backend("polars")
+    # Fully initialised before any background task can use it.
+    assert hasattr(sys.modules["polars"], "DataFrame")
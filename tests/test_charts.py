@@ -0,0 +1,92 @@
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from crime_benchmark import synthetic_crime_frame
+from crime_charts import (
+    adaptive_scatter, distribution_summary, point_details, typed_array, violin_summary_figure,
+)
+from crime_schema import apply_schema
+
+
+def test_summary_matches_a_direct_kde():
+    values = np.random.default_rng(0).normal(3.0, 2.0, 5_000)
+    stats = distribution_summary(values)
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    assert (stats["q1"], stats["median"], stats["q3"]) == (q1, median, q3)
+    bandwidth = 0.9 * min(values.std(), (q3 - q1) / 1.349) * len(values) ** -0.2
+    direct = np.exp(-0.5 * ((stats["grid"][:, None] - values[None]) / bandwidth) ** 2).sum(axis=1)
+    direct /= direct.sum() * (stats["grid"][1] - stats["grid"][0])
+    np.testing.assert_allclose(stats["density"], direct, atol=0.01 * direct.max())
+
+
+def test_empty_values():
+    stats = distribution_summary([np.nan])
+    assert np.isnan([stats[name] for name in ("q1", "median", "q3", "lowerfence", "upperfence")]).all()
+    assert len(stats["grid"]) == len(stats["density"]) == 0
+
+
+@pytest.mark.parametrize("values", [[2.5], [2.5] * 100], ids=["one value", "constant"])
+def test_degenerate_values_give_a_centred_kernel(values):
+    # The kernel spans the whole grid here, longer than the grid itself.
+    stats = distribution_summary(values, grid_size=65)
+    assert stats["q1"] == stats["median"] == stats["q3"] == stats["lowerfence"] == stats["upperfence"] == 2.5
+    grid, density = stats["grid"], stats["density"]
+    assert len(grid) == len(density) == 65
+    np.testing.assert_allclose(density, density[::-1])
+    assert abs(grid[density.argmax()] - 2.5) <= grid[1] - grid[0]
+    assert density.sum() * (grid[1] - grid[0]) == pytest.approx(1.0)
+
+
+def test_violin_of_an_empty_column():
+    df = pd.DataFrame({"score": [np.nan, np.nan], "group": [1.0, 2.0]})
+    fig = violin_summary_figure(df, ["score"], ["group"], "Group", "Score", "violin", encoding="full")
+    assert len(fig.data) == 2
+
+
+def decode(array):
+    return np.frombuffer(base64.b64decode(array["bdata"]), dtype=array["dtype"])
+
+
+def test_compact_points_carry_typed_row_ids():
+    # Every other row, so row ids are index labels rather than positions.
+    df = apply_schema(synthetic_crime_frame(400, seed=5)).iloc[::2]
+    kwargs = dict(color='city_cat', hover_data=['state', 'age', 'poverty'])
+    full, _ = adaptive_scatter(df, 'income', 'violent_crime', encoding='full', **kwargs)
+    compact, mode = adaptive_scatter(df, 'income', 'violent_crime', encoding='compact', **kwargs)
+    spec = json.loads(compact.to_json())
+
+    assert mode == "svg" and len(compact.to_json()) < len(full.to_json())
+    ids, xs = [], []
+    for trace in spec["data"]:
+        assert trace["x"]["dtype"] == "f4" and "select for details" in trace["hovertemplate"]
+        ids.extend(decode(trace["customdata"]).tolist())
+        xs.extend(decode(trace["x"]).tolist())
+    assert sorted(ids) == df.index.tolist()
+    np.testing.assert_array_equal(xs, df.loc[ids, 'income'].to_numpy())
+    assert not any(f'"{state}"' in compact.to_json() for state in df['state'].unique())
+    assert all(f'"{state}"' in full.to_json() for state in df['state'].unique())
+
+
+def test_typed_array_picks_the_narrowest_type():
+    assert typed_array(np.array([0, 200])).dtype == np.uint8
+    assert typed_array(np.array([-300, 5])).dtype == np.int16
+    assert typed_array(np.array([0, 70_000])).dtype == np.uint32
+    assert typed_array(np.array([0.5, 1.5])).dtype == np.float32
+    assert typed_array(np.array([0.5]), precision="float64").dtype == np.float64
+    assert typed_array(["a", "b"]) == ["a", "b"]
+
+
+def test_point_details_looks_up_the_selected_rows():
+    df = apply_schema(synthetic_crime_frame(50, seed=5)).iloc[10:]
+    event = {"selection": {"points": [
+        {"customdata": [12]}, {"customdata": 30}, {"customdata": [12]}, {"customdata": [3]}, {"x": 1.0},
+    ]}}
+    details = point_details(df, event, ['state', 'income', 'not_a_column'])
+    assert details.index.tolist() == [12, 30]  # deduplicated, rows outside df dropped
+    assert details.columns.tolist() == ['state', 'income']
+    pd.testing.assert_frame_equal(details, df.loc[[12, 30], ['state', 'income']])
+    assert point_details(df, None, ['state']).empty
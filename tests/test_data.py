@@ -0,0 +1,33 @@
+import numpy as np
+
+from crime_data import dataset_digest, load_crime_data, shared_matrix
+
+
+def test_sessions_share_the_mapped_columns(dataset):
+    first, second = load_crime_data(source=dataset), load_crime_data(source=dataset)
+    assert np.shares_memory(first['income'].to_numpy(), second['income'].to_numpy())
+
+    # Copy-on-write: a page's edits and derived columns stay in its own copy.
+    original = second.loc[0, 'income']
+    first.loc[0, 'income'] = -1.0
+    first['derived'] = 1
+    fresh = load_crime_data(source=dataset)
+    assert fresh.loc[0, 'income'] == original and 'derived' not in fresh.columns
+    assert np.shares_memory(fresh['income'].to_numpy(), second['income'].to_numpy())
+
+
+def test_shared_matrix_is_computed_once(dataset):
+    key = dataset_digest(dataset)
+    calls = []
+    X = np.arange(12, dtype=np.float32).reshape(4, 3)
+
+    def compute():
+        calls.append(1)
+        return X
+
+    first = shared_matrix(key, "test_matrix", compute)
+    second = shared_matrix(key, "test_matrix", compute)
+    assert calls == [1]
+    np.testing.assert_array_equal(first, X)
+    np.testing.assert_array_equal(second, X)
+    assert not second.flags.writeable
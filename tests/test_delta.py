@@ -0,0 +1,70 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from crime_benchmark import synthetic_crime_frame
+from crime_delta import IncrementalState
+from crime_schema import CRIME_FEATURES, apply_schema
+
+
+def rows(n, seed, scale=1.0):
+    frame = apply_schema(synthetic_crime_frame(n, seed=seed))
+    frame[CRIME_FEATURES] = frame[CRIME_FEATURES] * np.float32(scale)
+    return frame
+
+
+def no_history():
+    pytest.fail("history() is only needed for a refit")
+
+
+def test_append_labels_rows_against_existing_centroids():
+    state = IncrementalState(rows(1_500, seed=1))
+    centers = state.cluster_fit.centers.copy()
+    batch = rows(100, seed=2)
+
+    report = state.append(batch, no_history)
+
+    assert not report["refit"] and state.rows_appended
+    assert report["rows"] == 100 and state.n_rows == 1_600
+    X_scaled = state.cluster_fit.scaler.transform(batch[CRIME_FEATURES].to_numpy(dtype=np.float32))
+    expected = ((X_scaled[:, None, :] - centers[None]) ** 2).sum(axis=2).argmin(axis=1)
+    np.testing.assert_array_equal(state.row_labels, expected)
+    np.testing.assert_array_equal(state.cluster_fit.centers, centers)
+    assert report["labels"] == np.bincount(expected, minlength=state.n_clusters).tolist()
+    assert len(state.row_projection) == 100
+    profile, _ = state.artifacts()["cluster_profile"]
+    assert len(profile) == state.n_clusters * len(CRIME_FEATURES)
+
+
+def test_drift_triggers_a_refit_on_every_row():
+    history = rows(1_500, seed=1)
+    state = IncrementalState(history)
+    batch = rows(1_000, seed=3, scale=4.0)
+    calls = []
+
+    def all_rows():
+        calls.append(1)
+        return np.concatenate([history[CRIME_FEATURES], batch[CRIME_FEATURES]])
+
+    report = state.append(batch, all_rows)
+
+    assert report["refit"] and report["drift"] > state.drift_threshold
+    assert calls == [1] and state.refits == 1
+    assert not state.rows_appended and len(state.row_labels) == 2_500
+    assert state.drift() == 0.0
+
+
+def test_saved_state_does_not_grow_with_the_history():
+    state = IncrementalState(rows(1_500, seed=1))
+    batch = rows(200, seed=2)
+    state.append(batch, no_history)
+    size = len(pickle.dumps(state))
+    # Same values again: only the row count grows, so any per-row storage would show.
+    for _ in range(10):
+        state.append(batch, no_history)
+
+    restored = pickle.loads(pickle.dumps(state))
+    assert len(pickle.dumps(state)) < size + 1_000
+    assert restored.row_labels is None and restored.n_rows == 3_700
+    assert restored.append(rows(50, seed=30), no_history)["rows"] == 50
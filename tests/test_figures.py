@@ -0,0 +1,52 @@
+import json
+
+import plotly.basedatatypes
+import plotly.io
+from streamlit.testing.v1 import AppTest
+
+
+def chart_page():
+    import plotly.graph_objects as go
+    import streamlit as st
+
+    from crime_figures import figure_cache, figure_key, show_figure
+
+    entry, _ = figure_cache.fetch(
+        figure_key("test_chart", "digest"),
+        lambda: go.Figure(go.Scatter(x=[1, 2, 3], y=[3, 1, 2], mode="markers")),
+    )
+    event = show_figure(entry, key="test_chart", on_select="rerun")
+    st.write(f"selected {len(event.selection.points)}")
+
+
+def count_calls(monkeypatch):
+    calls = {"Figure": 0, "to_json": 0}
+    figure_init, to_json = plotly.basedatatypes.BaseFigure.__init__, plotly.io.to_json
+
+    def counted_init(self, *args, **kwargs):
+        calls["Figure"] += 1
+        figure_init(self, *args, **kwargs)
+
+    def counted_to_json(*args, **kwargs):
+        calls["to_json"] += 1
+        return to_json(*args, **kwargs)
+
+    monkeypatch.setattr(plotly.basedatatypes.BaseFigure, "__init__", counted_init)
+    monkeypatch.setattr(plotly.io, "to_json", counted_to_json)
+    return calls
+
+
+def test_cache_hit_sends_the_stored_spec(monkeypatch):
+    calls = count_calls(monkeypatch)
+    at = AppTest.from_function(chart_page, default_timeout=30).run()
+    assert not at.exception
+    assert calls["Figure"] > 0 and calls["to_json"] > 0  # the miss builds and serializes once
+
+    calls.update(Figure=0, to_json=0)
+    at.run()
+    assert not at.exception
+    assert calls == {"Figure": 0, "to_json": 0}
+    chart = at.get("plotly_chart")[0]
+    assert json.loads(chart.proto.spec)["data"][0]["y"] == [3, 1, 2]
+    assert list(chart.proto.selection_mode)  # drawn as a selectable widget
+    assert at.markdown[0].value == "selected 0"
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from crime_backend import get_backend
+from crime_benchmark import synthetic_crime_frame
+from crime_index import FilterIndex
+from crime_schema import apply_schema
+
+FRAME = apply_schema(synthetic_crime_frame(5_000, seed=11))
+STATES = FRAME['state'].value_counts().index[:3].tolist()
+INCOME = tuple(FRAME['income'].quantile([0.2, 0.7]))
+POVERTY = tuple(FRAME['poverty'].quantile([0.1, 0.5]))
+AGE = sorted(FRAME['age'].unique())[0]
+
+
+def mask(df, where):
+    keep = np.ones(len(df), dtype=bool)
+    for column, condition in where.items():
+        if isinstance(condition, tuple):
+            keep &= df[column].between(*condition).to_numpy()
+        elif isinstance(condition, list):
+            keep &= df[column].isin(condition).to_numpy()
+        else:
+            keep &= (df[column] == condition).to_numpy()
+    return np.flatnonzero(keep)
+
+
+@pytest.mark.parametrize("where", [
+    {'state': STATES},
+    {'state': STATES[0]},
+    {'income': INCOME},
+    {'state': STATES, 'income': INCOME},
+    {'state': STATES, 'city_cat': [FRAME['city_cat'].iloc[0]], 'poverty': POVERTY},
+    {'age': AGE, 'income': INCOME, 'poverty': POVERTY},
+    {'state': ['No such state']},
+    {'income': (-2.0, -1.0), 'state': STATES},
+], ids=lambda where: "+".join(where))
+def test_select_matches_a_boolean_mask(where):
+    rows = FilterIndex(FRAME).select(where)
+    np.testing.assert_array_equal(rows, mask(FRAME, where))
+
+
+def test_backend_scan_uses_the_same_rows(dataset):
+    where = {'income': INCOME, 'state': STATES}
+    df = apply_schema(pd.read_csv(dataset))
+    scanned = get_backend("pandas").scan(['state', 'income', 'violent_crime'], where=where, source=dataset)
+    expected = df.iloc[mask(df, where)][['state', 'income', 'violent_crime']].reset_index(drop=True)
+    pd.testing.assert_frame_equal(scanned.reset_index(drop=True), expected)
+
+
+def filter_page():
+    import streamlit as st
+
+    from crime_index import cross_filter, filter_index
+
+    rows, where = cross_filter(filter_index())
+    st.session_state["rows"] = None if rows is None else rows.tolist()
+
+
+def test_cross_filter_sidebar_selects_the_masked_rows(dataset):
+    df = apply_schema(pd.read_csv(dataset))
+    states = df['state'].value_counts().index[:2].tolist()
+    at = AppTest.from_function(filter_page, default_timeout=30).run()
+    assert at.session_state["rows"] is None
+    at.sidebar.multiselect(key="filter_state").set_value(states).run()
+    low, high = at.sidebar.slider(key="filter_income").value
+    income = (low + (high - low) / 4, high)
+    at.sidebar.slider(key="filter_income").set_value(income).run()
+    assert not at.exception
+    expected = mask(df, {'state': states, 'income': income}).tolist()
+    assert at.session_state["rows"] == expected and expected
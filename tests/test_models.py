@@ -0,0 +1,29 @@
+import numpy as np
+
+import crime_models
+from crime_models import elbow_sweep
+
+
+def test_sweep_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(crime_models, "SWEEP_ENTRIES", 4)
+    crime_models._sweep_cache.clear()
+    rng = np.random.default_rng(0)
+    # One matrix per cross-filter selection; each sweep adds one entry per k.
+    selections = [rng.normal(size=(40, 2)) for _ in range(3)]
+    for X in selections:
+        list(elbow_sweep(X, range(2, 4), n_init=1, parallel=False))
+    assert len(crime_models._sweep_cache) == 4
+    # A hit makes its entries the most recently used, so the next miss evicts others.
+    list(elbow_sweep(selections[1], range(2, 4), n_init=1, parallel=False))
+    list(elbow_sweep(rng.normal(size=(40, 2)), range(2, 4), n_init=1, parallel=False))
+    digests = {key[0] for key in crime_models._sweep_cache}
+    assert crime_models.array_digest(selections[1]) in digests
+    assert crime_models.array_digest(selections[2]) not in digests
+
+
+def test_sweep_results_are_memoized():
+    X = np.random.default_rng(1).normal(size=(60, 3))
+    first = sorted(elbow_sweep(X, range(2, 5), n_init=2, parallel=False))
+    assert sorted(elbow_sweep(X, range(2, 5), n_init=2, parallel=False)) == first
+    assert [k for k, _, _ in first] == [2, 3, 4]
+    assert first[0][1] > first[-1][1]  # WCSS falls as k grows
@@ -0,0 +1,46 @@
+import tracemalloc
+
+from streamlit.testing.v1 import AppTest
+
+import crime_perf
+
+
+def perf_page():
+    import tracemalloc
+
+    import streamlit as st
+
+    from crime_perf import PagePerf
+
+    perf = PagePerf("test")
+    with perf.section("outer"):
+        st.session_state["tracing_inside"] = tracemalloc.is_tracing()
+        with perf.section("inner"):
+            data = [bytes(1024) for _ in range(256)]
+    st.session_state["tracing_after"] = tracemalloc.is_tracing()
+    st.session_state["records"] = perf.records
+    del data
+    perf.finish()
+
+
+def test_timing_does_not_trace_memory():
+    at = AppTest.from_function(perf_page, default_timeout=30)
+    at.run()
+    at.sidebar.toggle[0].set_value(True).run()
+    assert at.session_state["tracing_inside"] is False
+    records = at.session_state["records"]
+    assert [r["section"] for r in records] == ["inner", "outer"]
+    assert all("process_peak_kb" not in r for r in records)
+
+
+def test_tracemalloc_runs_only_inside_measured_sections(monkeypatch):
+    monkeypatch.setattr(crime_perf, "PERF_MEMORY", True)
+    at = AppTest.from_function(perf_page, default_timeout=30)
+    at.run()
+    at.sidebar.toggle[0].set_value(True).run()
+    assert at.session_state["tracing_inside"] is True
+    assert at.session_state["tracing_after"] is False
+    inner = next(r for r in at.session_state["records"] if r["section"] == "inner")
+    assert inner["process_peak_kb"] >= 256
+    at.sidebar.toggle[0].set_value(False).run()
+    assert not tracemalloc.is_tracing()
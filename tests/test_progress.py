@@ -0,0 +1,60 @@
+from streamlit.testing.v1 import AppTest
+
+
+def progress_page():
+    import streamlit as st
+
+    from crime_progress import BackgroundRun
+
+    def fail():
+        raise RuntimeError("boom")
+
+    bg = BackgroundRun()
+    first = bg.submit("first", lambda: 1)
+    failed = bg.submit("failed", fail)
+    bg.render(first, lambda value: st.write(f"first {value}"), "First section")
+    bg.render(failed, lambda value: st.write("never drawn"), "Failing section")
+    bg.render(bg.submit("after", lambda a: a + 1, first), lambda value: st.write(f"after {value}"), "Last section")
+    bg.render([], lambda: st.write(1 / 0), "Failing draw")
+    st.write("text")
+    bg.drain()
+
+
+def test_failed_sections_do_not_blank_the_page():
+    at = AppTest.from_function(progress_page, default_timeout=30).run()
+    # Both failures are shown in their sections, not raised out of the page.
+    assert sorted(e.message for e in at.exception) == ["boom", "division by zero"]
+    texts = [m.value for m in at.markdown]
+    assert "first 1" in texts and "after 2" in texts and "text" in texts
+    assert "never drawn" not in texts
+    errors = [e.value for e in at.error]
+    assert any("Failing section" in e for e in errors) and any("Failing draw" in e for e in errors)
+    assert not [i.value for i in at.info if i.value.startswith("⏳")]
+
+
+def publishing_page():
+    import time
+
+    import streamlit as st
+
+    from crime_progress import BackgroundRun, publish
+
+    def sweep():
+        for k in range(3):
+            publish(k)
+            time.sleep(0.6)
+        return 3
+
+    bg = BackgroundRun()
+    after = bg.submit("after", lambda value: value, bg.submit("sweep", sweep))
+    bg.render(after, lambda value: st.write(f"done {value}"), "Sweep",
+              preview=lambda value: st.session_state.setdefault("previews", []).append(value))
+    bg.drain()
+
+
+def test_sections_preview_published_partial_results():
+    at = AppTest.from_function(publishing_page, default_timeout=30).run()
+    assert not at.exception
+    # Each partial result is drawn once, then replaced by the final draw.
+    assert at.session_state["previews"] == [0, 1, 2]
+    assert [m.value for m in at.markdown] == ["done 3"]
@@ -0,0 +1,41 @@
+import numpy as np
+
+import crime_regression
+from crime_benchmark import synthetic_crime_frame
+from crime_regression import OlsAccumulator, fit_ols_batch
+
+
+def test_fits_match_numpy_polyfit():
+    df = synthetic_crime_frame(500, seed=1)
+    result = fit_ols_batch(df, ['income', 'poverty'], ['offense_count'], group='city_cat')
+    for (predictor, group), row in result.set_index(['predictor', 'group']).iterrows():
+        rows = df if group == 'all' else df[df['city_cat'].astype(str) == group]
+        slope, intercept = np.polyfit(rows[predictor], rows['offense_count'], 1)
+        assert np.isclose(row['slope'], slope) and np.isclose(row['intercept'], intercept)
+
+
+def test_streamed_fit_matches_batch():
+    df = synthetic_crime_frame(900, seed=2)
+    accumulator = OlsAccumulator(['income'], ['offense_count'], group='city_cat')
+    for start in range(0, len(df), 250):
+        accumulator.update(df.iloc[start:start + 250])
+    streamed = accumulator.fit()
+    batch = fit_ols_batch(df, ['income'], ['offense_count'], group='city_cat')
+    np.testing.assert_allclose(streamed['slope'], batch['slope'])
+    np.testing.assert_allclose(streamed['r2'], batch['r2'])
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(crime_regression, "CACHE_ENTRIES", 3)
+    crime_regression._cache.clear()
+    df = synthetic_crime_frame(200, seed=3)
+    selections = [df.iloc[start:start + 100] for start in range(0, 100, 10)]
+    for rows in selections:
+        fit_ols_batch(rows, ['income'], ['offense_count'])
+    assert len(crime_regression._cache) == 3
+    oldest_kept = next(iter(crime_regression._cache))
+    # A hit makes an entry the most recently used, so the next miss evicts another one.
+    fit_ols_batch(selections[-3], ['income'], ['offense_count'])
+    fit_ols_batch(df.iloc[150:], ['income'], ['offense_count'])
+    assert len(crime_regression._cache) == 3
+    assert oldest_kept in crime_regression._cache
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import crime_selection
+from crime_selection import select_k
+
+
+def test_selection_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(crime_selection, "SELECTION_ENTRIES", 2)
+    crime_selection._selection_cache.clear()
+    rng = np.random.default_rng(0)
+    selections = [rng.normal(size=(120, 2)) for _ in range(3)]
+    for X in selections:
+        select_k(X, range(2, 4), n_refs=1)
+    assert len(crime_selection._selection_cache) == 2
+    oldest_kept = next(iter(crime_selection._selection_cache))
+    # A hit makes an entry the most recently used, so the next miss evicts another one.
+    assert select_k(selections[1], range(2, 4), n_refs=1) is crime_selection._selection_cache[oldest_kept]
+    select_k(rng.normal(size=(120, 2)), range(2, 4), n_refs=1)
+    assert oldest_kept in crime_selection._selection_cache
+    assert len(crime_selection._selection_cache) == 2
+
+
+def blobs(n=20_000, centers=4, seed=0):
+    rng = np.random.default_rng(seed)
+    middles = rng.uniform(-20, 20, size=(centers, 3))
+    labels = rng.integers(centers, size=n)
+    return middles[labels] + rng.normal(size=(n, 3)), labels
+
+
+@pytest.mark.parametrize("method", ["coreset", "stratified"])
+def test_chosen_k_is_stable_across_replicates(method):
+    X, labels = blobs()
+    strata = labels % 2 if method == "stratified" else None
+    chosen = [
+        select_k(X, range(2, 8), method=method, sample_size=1_500, n_refs=2, strata=strata, random_state=seed)
+        for seed in (1, 2, 3)
+    ]
+    assert [selection.k for selection in chosen] == [4, 4, 4]
+    assert all(selection.replicates == 3 and selection.sample_size == 1_500 for selection in chosen)
+    # The replicates agree with each other, and their scaled WCSS estimates the full fit.
+    full = crime_selection._fit(X, 4, n_init=1).inertia_
+    for selection in chosen:
+        scores = selection.scores.set_index('k')
+        assert scores.loc[4, 'wcss_se'] < 0.05 * scores.loc[4, 'wcss']
+        assert scores.loc[4, 'wcss'] == pytest.approx(full, rel=0.1)
+        assert scores.loc[4, 'silhouette'] == scores['silhouette'].max()
@@ -0,0 +1,54 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from crime_regression import fit_ols_batch
+from crime_schema import CRIME_FEATURES, MALE_LABELS, TREND_PREDICTORS, TREND_TARGET, apply_schema
+from crime_stream import summarize
+
+
+def streamed(dataset):
+    with open(dataset, "rb") as fh:
+        return summarize(fh, chunk_size=300, sample_rows=100)
+
+
+def test_streamed_statistics_match_pandas(dataset):
+    digest, summary = streamed(dataset)
+    df = apply_schema(pd.read_csv(dataset), infer=False)
+
+    with open(dataset, "rb") as fh:
+        assert digest == hashlib.sha256(fh.read()).hexdigest()
+    assert summary.n_rows == len(df)
+    np.testing.assert_allclose(summary.scaler.mean_, df[CRIME_FEATURES].mean(), rtol=1e-6)
+    np.testing.assert_allclose(summary.scaler.var_, df[CRIME_FEATURES].var(ddof=0), rtol=1e-5)
+
+    expected = df.groupby('state', observed=True)[CRIME_FEATURES].mean().reset_index()
+    means = summary.means('state').sort_values('state').reset_index(drop=True)
+    assert means['state'].tolist() == expected['state'].tolist()
+    np.testing.assert_allclose(means[CRIME_FEATURES], expected[CRIME_FEATURES], rtol=1e-5)
+
+    male = df.assign(male_category=pd.qcut(df['male'], q=len(MALE_LABELS), labels=MALE_LABELS))
+    expected = male.groupby('male_category', observed=True)[CRIME_FEATURES].mean()
+    melted = summary.male_means().pivot_table(index='male_category', columns='Crime Type',
+                                               values='Average Crime Score', observed=True)
+    np.testing.assert_allclose(melted.loc[expected.index, CRIME_FEATURES], expected, rtol=1e-5)
+
+
+def test_streamed_trendlines_and_sample(dataset):
+    _, summary = streamed(dataset)
+    df = apply_schema(pd.read_csv(dataset), infer=False)
+
+    columns = ['predictor', 'target', 'group']
+    batch = fit_ols_batch(df, TREND_PREDICTORS, [TREND_TARGET], group='city_cat')
+    fits = summary.trendlines().merge(batch, on=columns, suffixes=("", "_batch"))
+    assert len(fits) == len(batch)
+    np.testing.assert_allclose(fits['slope'], fits['slope_batch'], rtol=1e-6)
+    np.testing.assert_allclose(fits['intercept'], fits['intercept_batch'], rtol=1e-6)
+
+    sample = summary.sample.frame
+    assert len(sample) == 100
+    # Every sampled row is a row of the dataset, drawn without repeats.
+    key = ['state', 'age', 'income'] + CRIME_FEATURES
+    assert not sample.duplicated(key).any()
+    assert len(sample[key].merge(df[key].drop_duplicates(), on=key)) == 100
@@ -0,0 +1,144 @@
+import base64
+import hashlib
+import http.server
+import socket
+import threading
+import time
+
+import pytest
+
+from crime_sync import DatasetSync, SyncError
+
+BODY = b"city,violent_crime,property_crime,whitecollar_crime,social_crime\na,1,2,3,4\n"
+
+
+class StandIn:
+    """What the stand-in server answers; tests change it between syncs."""
+
+    def __init__(self):
+        self.body = BODY
+        self.etag = '"v1"'
+        self.digest = None      # sha256 announced in Repr-Digest (default: the body's)
+        self.length = None      # Content-Length (default: the body's)
+        self.requests = []      # (If-None-Match, If-Modified-Since) per request
+
+    def handler(self):
+        state = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                state.requests.append((self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")))
+                if self.headers.get("If-None-Match") == state.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                digest = state.digest or hashlib.sha256(state.body).digest()
+                self.send_response(200)
+                self.send_header("ETag", state.etag)
+                self.send_header("Last-Modified", "Sat, 17 Oct 2026 10:00:00 GMT")
+                self.send_header("Repr-Digest", f"sha-256=:{base64.b64encode(digest).decode()}:")
+                self.send_header("Content-Length", str(state.length or len(state.body)))
+                self.end_headers()
+                self.wfile.write(state.body)
+                self.close_connection = True
+
+        return Handler
+
+
+@pytest.fixture
+def server():
+    state = StandIn()
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), state.handler())
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    state.url = f"http://127.0.0.1:{httpd.server_port}/df_crime_cleaned.csv"
+    yield state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_sync(url, tmp_path, **kwargs):
+    kwargs.setdefault("retry_after", 0)
+    return DatasetSync(url, directory=str(tmp_path), timeout=5, expected_sha256=None, checksum_url=None, **kwargs)
+
+
+def read(result):
+    with open(result.path, "rb") as fh:
+        return fh.read()
+
+
+def test_revalidates_with_if_none_match(server, tmp_path):
+    sync = make_sync(server.url, tmp_path)
+    first = sync.sync()
+    assert (first.status, first.changed) == ("downloaded", True)
+    assert read(first) == BODY and first.sha256 == hashlib.sha256(BODY).hexdigest()
+
+    second = sync.sync()
+    assert (second.status, second.changed, second.sha256) == ("not_modified", False, first.sha256)
+    assert server.requests[-1] == ('"v1"', "Sat, 17 Oct 2026 10:00:00 GMT")
+
+
+def test_changed_body_is_downloaded(server, tmp_path):
+    sync = make_sync(server.url, tmp_path)
+    first = sync.sync()
+    server.body, server.etag = BODY + b"b,5,6,7,8\n", '"v2"'
+    result = sync.sync()
+    assert (result.status, result.changed) == ("downloaded", True)
+    assert result.sha256 != first.sha256 and read(result) == server.body
+
+
+def test_same_bytes_under_new_etag_are_unchanged(server, tmp_path):
+    sync = make_sync(server.url, tmp_path)
+    first = sync.sync()
+    server.etag = '"v1-regenerated"'
+    result = sync.sync()
+    assert (result.status, result.changed, result.sha256) == ("unchanged", False, first.sha256)
+    assert sync.last_good()["etag"] == '"v1-regenerated"'
+
+
+@pytest.mark.parametrize("corruption", ["truncated", "bad_digest", "missing_columns"])
+def test_rejected_download_serves_last_good_copy(server, tmp_path, corruption):
+    sync = make_sync(server.url, tmp_path)
+    good = sync.sync()
+    server.etag = '"v2"'
+    if corruption == "truncated":
+        server.body, server.length = BODY + b"b,5,6,7,8\n", len(BODY) + 100
+    elif corruption == "bad_digest":
+        server.body, server.digest = BODY + b"b,5,6,7,8\n", hashlib.sha256(b"something else").digest()
+    else:
+        server.body = b"city,income\na,1\n"
+
+    result = sync.sync()
+    assert (result.status, result.changed, result.sha256) == ("stale", False, good.sha256)
+    assert result.error
+    assert read(result) == BODY
+    assert not [name for name in tmp_path.iterdir() if name.suffix == ".part"]
+
+
+def test_outage_without_local_copy_raises(tmp_path):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    sync = make_sync(f"http://127.0.0.1:{port}/df_crime_cleaned.csv", tmp_path)
+    with pytest.raises(SyncError):
+        sync.sync()
+
+
+def test_failed_source_is_not_retried_until_retry_after(server, tmp_path):
+    sync = make_sync(server.url, tmp_path, retry_after=0.5)
+    good = sync.sync()
+    server.etag, server.body = '"v2"', b"city,income\na,1\n"
+    assert sync.sync().status == "stale"
+    requests = len(server.requests)
+
+    backed_off = sync.sync()
+    assert (backed_off.status, backed_off.sha256) == ("stale", good.sha256)
+    assert len(server.requests) == requests  # no request during the back-off
+
+    server.body = BODY + b"b,5,6,7,8\n"
+    time.sleep(0.6)
+    assert sync.sync().status == "downloaded"
+    assert len(server.requests) == requests + 1